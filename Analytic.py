@@ -0,0 +1,230 @@
+'''
+Analytic
+
+This module gives the exact steady state report quantities of the queues the simulator can be configured as, so that
+capacity planning questions with a closed form answer do not need a simulation, and simulation results can be checked
+against theory.
+
+solve(model, arrivalRate, averageServiceTime, capacity, servers) returns a Solution for one of the models
+    "M/M/1"   - rho/(1 - rho) requests in the system
+    "M/M/1/K" - finite capacity K
+    "M/D/1"   - deterministic service, Pollaczek-Khinchine formula
+    "M/D/1/K" - deterministic service and finite capacity K, from the embedded Markov chain at departures
+    "M/M/c"   - c servers, Erlang C
+    "M/M/c/K" - c servers and finite capacity K (Erlang B when K = c)
+Results are cached by parameter tuple, so repeated lookups cost a dictionary access. jacksonNetwork solves open
+networks of M/M/c stations and priorityQueue the classes of an M/G/1 queue with priorities.
+
+The names of the Solution fields follow the Monitor: waiting time is the time spent in the queue and queuing time is
+the time spent in the system.
+'''
+from __future__ import division #Required for floating point division.
+from collections import namedtuple, OrderedDict
+from math import exp, log
+import numpy
+
+Solution = namedtuple("Solution", ["requestsWaiting", "requestsInSystem", "waitingTime", "queuingTime",
+                                   "rejectionProbability", "waitingProbability", "utilization"])
+
+# Map from Solution fields to the Monitor summary quantities they predict.
+SUMMARY_NAMES = {"requestsWaiting": "averageRequestsWaiting",
+                 "requestsInSystem": "averageRequestsInSystem",
+                 "waitingTime": "averageWaitingTime",
+                 "queuingTime": "averageQueuingTime",
+                 "rejectionProbability": "rejectionProbability",
+                 "waitingProbability": "waitingProbability",
+                 "utilization": "averageServerUtilization"}
+
+# Number of solutions kept by solve.
+CACHE_SIZE = 4096
+
+def lruCache(maxSize):
+    '''
+    Decorator that remembers the results of the last maxSize distinct argument tuples.
+    '''
+    def decorate(function):
+        cache = OrderedDict()
+        def cachedFunction(*arguments):
+            try:
+                result = cache.pop(arguments)
+            except KeyError:
+                result = function(*arguments)
+                if len(cache) >= maxSize:
+                    cache.popitem(last=False)
+            cache[arguments] = result
+            return result
+        cachedFunction.cache = cache
+        cachedFunction.__doc__ = function.__doc__
+        return cachedFunction
+    return decorate
+
+def erlangB(servers, offeredLoad):
+    '''
+    Returns the probability that a request finds all servers busy and is lost in an M/M/c/c system with
+    offeredLoad = arrivalRate*averageServiceTime.
+    '''
+    blocking = 1.0
+    for c in range(1, servers + 1):
+        blocking = offeredLoad*blocking/(c + offeredLoad*blocking)
+    return blocking
+
+def erlangC(servers, offeredLoad):
+    '''
+    Returns the probability that a request has to wait in an M/M/c system with offeredLoad = arrivalRate*averageServiceTime.
+    '''
+    if offeredLoad >= servers:
+        raise ValueError("The system is unstable: offered load %s with %s servers" % (offeredLoad, servers))
+    blocking = erlangB(servers, offeredLoad)
+    return servers*blocking/(servers - offeredLoad*(1 - blocking))
+
+def mm1(arrivalRate, averageServiceTime):
+    return mmc(arrivalRate, averageServiceTime, 1)
+
+def md1(arrivalRate, averageServiceTime):
+    rho = arrivalRate*averageServiceTime
+    if rho >= 1:
+        raise ValueError("The system is unstable: rho = %s" % rho)
+    # Pollaczek-Khinchine with E[S**2] = averageServiceTime**2.
+    waitingTime = arrivalRate*averageServiceTime**2/(2*(1 - rho))
+    queuingTime = waitingTime + averageServiceTime
+    return Solution(arrivalRate*waitingTime, arrivalRate*queuingTime, waitingTime, queuingTime, 0.0, rho, rho)
+
+def mmc(arrivalRate, averageServiceTime, servers):
+    offeredLoad = arrivalRate*averageServiceTime
+    waitingProbability = erlangC(servers, offeredLoad)
+    waitingTime = waitingProbability*averageServiceTime/(servers - offeredLoad)
+    queuingTime = waitingTime + averageServiceTime
+    return Solution(arrivalRate*waitingTime, arrivalRate*queuingTime, waitingTime, queuingTime, 0.0,
+                    waitingProbability, offeredLoad/servers)
+
+def finiteCapacitySolution(arrivalRate, averageServiceTime, servers, probabilities):
+    '''
+    Returns the Solution of a system with finite capacity len(probabilities) - 1 in which a request is in the system with
+    probability probabilities[n] when n requests are in the system.
+    '''
+    capacity = len(probabilities) - 1
+    rejectionProbability = probabilities[capacity]
+    requestsInSystem = sum(n*p for n, p in enumerate(probabilities))
+    requestsWaiting = sum((n - servers)*p for n, p in enumerate(probabilities) if n > servers)
+    acceptedRate = arrivalRate*(1 - rejectionProbability)
+    # Arrivals see time averages (PASTA), so an accepted request waits if it finds at least `servers` requests.
+    waitingProbability = sum(probabilities[servers:capacity])/(1 - rejectionProbability)
+    return Solution(requestsWaiting, requestsInSystem, requestsWaiting/acceptedRate, requestsInSystem/acceptedRate,
+                    rejectionProbability, waitingProbability, acceptedRate*averageServiceTime/servers)
+
+def mmck(arrivalRate, averageServiceTime, capacity, servers):
+    # Birth death process: p[n] is proportional to prod over k <= n of arrivalRate*averageServiceTime/min(k, servers).
+    # Work with logarithms so large capacities do not overflow.
+    logTerms = [0.0]
+    for n in range(1, capacity + 1):
+        logTerms.append(logTerms[-1] + log(arrivalRate*averageServiceTime/min(n, servers)))
+    largest = max(logTerms)
+    terms = [exp(term - largest) for term in logTerms]
+    total = sum(terms)
+    return finiteCapacitySolution(arrivalRate, averageServiceTime, servers, [term/total for term in terms])
+
+def md1k(arrivalRate, averageServiceTime, capacity):
+    rho = arrivalRate*averageServiceTime
+    # a[k] is the probability of k births during one (deterministic) service time.
+    a = [exp(-rho)]
+    for k in range(1, capacity):
+        a.append(a[-1]*rho/k)
+    # Embedded Markov chain of the number of requests left behind by a death, which is at most capacity - 1.
+    size = capacity
+    transitions = numpy.zeros((size, size))
+    for i in range(size):
+        start = max(i - 1, 0)
+        for j in range(start, size - 1):
+            transitions[i, j] = a[j - start]
+        transitions[i, size - 1] = 1 - transitions[i, :size - 1].sum()
+    # Solve pi = pi*P with the probabilities summing to 1.
+    equations = transitions.T - numpy.eye(size)
+    equations[-1, :] = 1
+    rightHandSide = numpy.zeros(size)
+    rightHandSide[-1] = 1
+    departureProbabilities = numpy.linalg.solve(equations, rightHandSide)
+    # Convert to time averages (Gross and Harris, M/G/1/K).
+    scale = departureProbabilities[0] + rho
+    probabilities = [p/scale for p in departureProbabilities]
+    probabilities.append(max(1 - 1/scale, 0.0))
+    return finiteCapacitySolution(arrivalRate, averageServiceTime, 1, probabilities)
+
+def solve(model, arrivalRate, averageServiceTime, capacity=None, servers=1):
+    '''
+    Returns the Solution of model (see the module documentation) with the given parameters.
+    Raises ValueError for unknown models, missing parameters and unstable systems without a capacity.
+    '''
+    return cachedSolve(model, arrivalRate, averageServiceTime, capacity, servers)
+
+@lruCache(CACHE_SIZE)
+def cachedSolve(model, arrivalRate, averageServiceTime, capacity, servers):
+    if model == "M/M/1":
+        return mm1(arrivalRate, averageServiceTime)
+    if model == "M/D/1":
+        return md1(arrivalRate, averageServiceTime)
+    if model == "M/M/c":
+        return mmc(arrivalRate, averageServiceTime, servers)
+    if capacity is None:
+        raise ValueError("Model " + model + " needs a capacity")
+    if model == "M/M/1/K":
+        return mmck(arrivalRate, averageServiceTime, capacity, 1)
+    if model == "M/D/1/K":
+        return md1k(arrivalRate, averageServiceTime, capacity)
+    if model == "M/M/c/K":
+        return mmck(arrivalRate, averageServiceTime, capacity, servers)
+    raise ValueError("Unknown model " + model)
+
+def getNetworkArrivalRates(externalArrivalRates, routing):
+    '''
+    Returns the total arrival rate of every station of an open network, the solution of the traffic equations
+    rates = externalArrivalRates + rates*routing, where routing[i][j] is the probability that a request leaving
+    station i goes to station j.
+    '''
+    routing = numpy.asarray(routing, dtype=float)
+    return numpy.linalg.solve(numpy.eye(len(routing)) - routing.T, numpy.asarray(externalArrivalRates, dtype=float))
+
+def jacksonNetwork(externalArrivalRates, routing, averageServiceTimes, servers=None):
+    '''
+    Returns (solutions, sojournTime) for an open Jackson network of M/M/c stations without capacity limits:
+    solutions[i] is the Solution of station i, which behaves like an M/M/c queue with the arrival rate given by
+    getNetworkArrivalRates (Jackson's theorem), and sojournTime is the mean time a request spends in the network.
+    servers[i] is the number of servers of station i, by default 1.
+    '''
+    if servers is None:
+        servers = [1]*len(averageServiceTimes)
+    arrivalRates = getNetworkArrivalRates(externalArrivalRates, routing)
+    solutions = [solve("M/M/c", arrivalRate, averageServiceTime, servers=c)
+                 for arrivalRate, averageServiceTime, c in zip(arrivalRates.tolist(), averageServiceTimes, servers)]
+    # Little's law for the whole network.
+    sojournTime = sum(solution.requestsInSystem for solution in solutions)/sum(externalArrivalRates)
+    return solutions, sojournTime
+
+def priorityQueue(arrivalRates, averageServiceTimes, secondMoments):
+    '''
+    Returns the mean waiting time of every class of a single server non-preemptive priority queue with Poisson
+    arrivals (M/G/1, Cobham's formula): class k, with arrival rate arrivalRates[k] and service time of mean
+    averageServiceTimes[k] and second moment secondMoments[k], waits W0/((1 - s(k - 1))(1 - s(k))), where W0 is the
+    mean residual service time and s(k) the load of classes 0 to k. Class 0 has the highest priority. The second
+    moment is 2*mean**2 for exponential and mean**2 for deterministic service.
+    '''
+    residualTime = sum(rate*moment for rate, moment in zip(arrivalRates, secondMoments))/2
+    waitingTimes = []
+    load = 0.0
+    for rate, averageServiceTime in zip(arrivalRates, averageServiceTimes):
+        higherLoad = load
+        load += rate*averageServiceTime
+        waitingTimes.append(residualTime/((1 - higherLoad)*(1 - load)))
+    return waitingTimes
+
+def getRelativeErrors(summary, solution):
+    '''
+    Returns a dictionary from Monitor summary quantity to the relative difference between its simulated value in
+    summary and its exact value in solution, for every quantity both have (the summary of a run that monitored nothing
+    has None for its quantities).
+    '''
+    errors = {}
+    for field, name in SUMMARY_NAMES.items():
+        exact = getattr(solution, field)
+        if summary.get(name) is not None and exact != 0:
+            errors[name] = (summary[name] - exact)/exact
+    return errors
@@ -0,0 +1,157 @@
+'''
+Arrivals
+
+This module generates arrivals whose rate changes with time, such as traffic with daily peaks, as a non-homogeneous
+Poisson process with rate function rate(t):
+
+    arrivals = NonHomogeneousPoisson(lambda t: 50 + 30*numpy.sin(2*numpy.pi*t/86400), numpy.linspace(0, 86400, 97),
+                                     period=86400)
+    controller = QueueEngine.Controller(arrivals, Exponential(100), 3*86400, timeWeighted=True, windowLength=300)
+
+A NonHomogeneousPoisson can be used wherever the Controller takes a distribution of interarrival times. The arrival
+times are drawn by Lewis-Shedler thinning: candidate times are drawn from a Poisson process whose rate is a
+piecewise constant envelope above rate(t), and a candidate at t is kept with probability rate(t)/envelope(t). The
+envelope is constant between successive breakpoints, at the largest rate in the interval, so the closer the
+breakpoints the fewer candidates are thrown away. The candidates of a whole block are drawn at once by inverting the
+cumulative envelope, which is piecewise linear, with numpy.interp, so generation is vectorized like the other
+distributions.
+
+The windows of a Monitor (see Monitor.getWindowSeries) give the queue lengths and waiting times of every part of the
+period, such as every 5 minutes of the day.
+'''
+from __future__ import division #Required for floating point division.
+import numpy
+
+# The envelope of an interval is the largest of this many evenly spaced rates in it (including both ends), raised by
+# ENVELOPE_MARGIN to cover peaks between them.
+ENVELOPE_SAMPLES = 33
+ENVELOPE_MARGIN = 0.01
+
+class NonHomogeneousPoisson:
+    '''
+    Interarrival times of a Poisson process with rate function rate, which takes a NumPy array of times since the
+    start of the simulation and returns their rates. The envelope is constant between successive breakpoints, which
+    start at 0; envelope gives its values, by default the sampled maximum of rate (see ENVELOPE_SAMPLES). If period is
+    given the rate must repeat with that period, which is the last breakpoint; otherwise the rate after the last
+    breakpoint is taken to be the rate there. A rate above the envelope raises ValueError.
+
+    A NonHomogeneousPoisson keeps the time of the last arrival it generated, so every Controller needs its own, and
+    its state is not part of a checkpoint.
+    '''
+    def __init__(self, rate, breakpoints, period=None, envelope=None):
+        self.rate = rate
+        self.breakpoints = numpy.asarray(breakpoints, dtype=float)
+        if self.breakpoints[0] != 0 or numpy.any(numpy.diff(self.breakpoints) <= 0):
+            raise ValueError("The breakpoints must increase from 0")
+        if period is not None and period != self.breakpoints[-1]:
+            raise ValueError("The last breakpoint must be the period")
+        self.period = period
+        if envelope is None:
+            samples = numpy.linspace(self.breakpoints[:-1], self.breakpoints[1:], ENVELOPE_SAMPLES).T
+            envelope = (1 + ENVELOPE_MARGIN)*numpy.asarray(rate(samples.ravel())).reshape(samples.shape).max(axis=1)
+        envelope = numpy.asarray(envelope, dtype=float)
+        if period is None:
+            # The constant rate after the last breakpoint.
+            envelope = numpy.append(envelope, float(rate(self.breakpoints[-1:])[0]))
+        self.envelope = envelope
+        # cumulativeEnvelope[i] is the integral of the envelope from 0 to breakpoints[i].
+        self.cumulativeEnvelope = numpy.concatenate([[0.0], numpy.cumsum(envelope[:len(self.breakpoints) - 1]*
+                                                                          numpy.diff(self.breakpoints))])
+        self.restart()
+
+    def restart(self):
+        '''
+        Starts again from time 0.
+        '''
+        self.lastTime = 0.0 # The time of the last arrival,
+        self.lastPosition = 0.0 # and the integral of the envelope up to it.
+        self.numCandidates = 0
+        self.numAccepted = 0
+
+    def getEnvelopeTimes(self, positions):
+        '''
+        Returns the times at which the integral of the envelope reaches positions, the inverse of the cumulative
+        envelope.
+        '''
+        cumulative = self.cumulativeEnvelope
+        if self.period is not None:
+            periods, positions = numpy.divmod(positions, cumulative[-1])
+            return periods*self.period + numpy.interp(positions, cumulative, self.breakpoints)
+        times = numpy.interp(positions, cumulative, self.breakpoints)
+        beyond = positions > cumulative[-1]
+        if numpy.any(beyond):
+            if self.envelope[-1] > 0:
+                times[beyond] = self.breakpoints[-1] + (positions[beyond] - cumulative[-1])/self.envelope[-1]
+            else:
+                times[beyond] = numpy.inf
+        return times
+
+    def getEnvelope(self, times):
+        if self.period is not None:
+            times = numpy.mod(times, self.period)
+        return self.envelope[numpy.searchsorted(self.breakpoints, times, side="right") - 1]
+
+    def getAcceptanceRate(self):
+        '''
+        Returns the fraction of candidate arrivals kept so far.
+        '''
+        return self.numAccepted/self.numCandidates
+
+    def mean(self):
+        '''
+        Returns the mean interarrival time over a period, or between 0 and the last breakpoint.
+        '''
+        times = numpy.linspace(0, self.breakpoints[-1], ENVELOPE_SAMPLES*(len(self.breakpoints) - 1) + 1)
+        return self.breakpoints[-1]/numpy.trapz(self.rate(times), times)
+
+    def generate(self, randomState, size):
+        '''
+        Returns the next size interarrival times.
+        '''
+        arrivalTimes = []
+        numArrivals = 0
+        # Candidates to draw per arrival wanted, from the acceptance rate so far.
+        candidatesPerArrival = 1.1*self.numCandidates/self.numAccepted if self.numAccepted else 2.0
+        while numArrivals < size:
+            numCandidates = int((size - numArrivals)*candidatesPerArrival) + 16
+            positions = self.lastPosition + numpy.cumsum(randomState.standard_exponential(numCandidates))
+            times = self.getEnvelopeTimes(positions)
+            rates = numpy.asarray(self.rate(times), dtype=float)
+            envelope = self.getEnvelope(times)
+            if numpy.any(rates > envelope):
+                raise ValueError("The rate is above the envelope at time %s" % times[numpy.argmax(rates > envelope)])
+            accepted = numpy.flatnonzero(randomState.random_sample(numCandidates)*envelope < rates)
+            # Candidates after the size'th arrival are thrown away, and the next block starts from it again.
+            accepted = accepted[:size - numArrivals]
+            if len(accepted) == size - numArrivals:
+                last = accepted[-1]
+            else:
+                last = numCandidates - 1
+            self.numCandidates += last + 1
+            self.numAccepted += len(accepted)
+            arrivalTimes.append(times[accepted])
+            numArrivals += len(accepted)
+            self.lastPosition = positions[last]
+            candidatesPerArrival *= 2
+        arrivalTimes = numpy.concatenate(arrivalTimes)
+        interarrivalTimes = numpy.diff(numpy.concatenate([[self.lastTime], arrivalTimes]))
+        self.lastTime = arrivalTimes[-1]
+        return interarrivalTimes
+
+def piecewiseConstant(breakpoints, rates, period=None):
+    '''
+    Returns a NonHomogeneousPoisson whose rate is rates[i] from breakpoints[i] on, for example hourly rates. If period
+    is given the rates repeat and the breakpoints end with the period; otherwise the last rate continues forever. The
+    envelope is the rate itself, so no candidates are thrown away.
+    '''
+    breakpoints = numpy.asarray(breakpoints, dtype=float)
+    values = numpy.asarray(rates, dtype=float)
+    def rate(times):
+        if period is not None:
+            times = numpy.mod(times, period)
+        return values[numpy.searchsorted(breakpoints[:len(values)], times, side="right") - 1]
+    if period is None:
+        if len(values) == 1:
+            return NonHomogeneousPoisson(rate, [0.0, 1.0], None, values)
+        return NonHomogeneousPoisson(rate, breakpoints, None, values[:-1])
+    return NonHomogeneousPoisson(rate, breakpoints, period, values)
@@ -0,0 +1,343 @@
+'''
+Benchmark
+
+Micro benchmarks for the simulator. Run this module to print the results.
+
+The model suite (benchmarkModels) runs the hot loop of the Controller for a fixed number of events with fixed seeds,
+so its results can be compared between versions to catch regressions:
+    python Benchmark.py models baseline.json
+writes the results to baseline.json the first time and afterwards compares with it and lists the configurations
+that became more than REGRESSION_TOLERANCE slower.
+'''
+from __future__ import division #Required for floating point division.
+import json
+import os
+import sys
+import timeit
+
+NUM_VALUES = 10**6
+
+# Configurations of the model suite: (model, loads, capacities), with None for no capacity limit.
+MODEL_CONFIGURATIONS = [("M/M/1", (0.5, 0.9, 0.99), (None,)),
+                        ("M/M/1/K", (0.5, 0.9, 0.99), (5, 50, 500)),
+                        ("M/D/1/K", (0.5, 0.9, 0.99), (5, 50, 500))]
+NUM_MODEL_EVENTS = 10**6
+# Fraction by which the events per second of a configuration may drop below the baseline.
+REGRESSION_TOLERANCE = 0.1
+
+def benchmarkVariateStreams(numValues=NUM_VALUES):
+    '''
+    Compares the cost per value of exponentialValue and Grand against VariateStreams of the same distributions.
+    Returns a list of (name, nanoseconds per value) pairs.
+    '''
+    setup = '''
+from NumberGenerator import exponentialValue, Grand, Exponential, Normal, VariateStream, substream
+exponentialStream = VariateStream(Exponential(50), substream(1, 0))
+normalStream = VariateStream(Normal(0, 1), substream(1, 1))
+'''
+    statements = [("exponentialValue(50)", "exponentialValue(50)"),
+                  ("VariateStream(Exponential(50)).next()", "exponentialStream.next()"),
+                  ("Grand(0, 1)", "Grand(0, 1)"),
+                  ("VariateStream(Normal(0, 1)).next()", "normalStream.next()")]
+    results = []
+    for name, statement in statements:
+        # Grand is roughly 30 times slower than the others so it gets fewer repetitions.
+        number = numValues//30 if statement.startswith("Grand") else numValues
+        seconds = min(timeit.repeat(statement, setup, repeat=3, number=number))
+        results.append((name, seconds/number*1e9))
+    return results
+
+def benchmarkEventCalendars(pendingEventCounts=(3, 10, 100, 1000, 10000), numOperations=200000):
+    '''
+    Measures each event calendar with the hold model: the calendar is filled with n pending events and then the
+    earliest event is repeatedly popped and rescheduled an exponential time later, so n events stay pending.
+    Returns a list of (calendar name, n, events per second) triples.
+    '''
+    import numpy
+    from EventCalendar import NextEventCalendar, HeapCalendar, CalendarQueue
+    results = []
+    for calendarClass in (NextEventCalendar, HeapCalendar, CalendarQueue):
+        for n in pendingEventCounts:
+            if calendarClass is NextEventCalendar and n > 1000:
+                continue # Too slow to be worth waiting for.
+            increments = numpy.random.RandomState(n).standard_exponential(numOperations + n).tolist()
+            calendar = calendarClass(n)
+            for event in range(n):
+                calendar.schedule(increments[event], event)
+            start = timeit.default_timer()
+            for increment in increments[n:]:
+                time, event = calendar.pop()
+                calendar.schedule(time + increment, event)
+            seconds = timeit.default_timer() - start
+            results.append((calendarClass.__name__, n, numOperations/seconds))
+    return results
+
+def benchmarkRequestStorage(queueLengths=(10**3, 10**4, 10**5, 10**6), numOperations=100000):
+    '''
+    Measures the cost of one dequeue and enqueue with queueLength requests waiting, for the RequestStore with a deque
+    of slots used by the Controller and for the list of Request objects it replaced (only up to 10**5 requests, as
+    list.pop(0) is linear in the queue length). Returns a list of (storage name, queue length, nanoseconds per
+    operation, bytes per waiting request) tuples.
+    '''
+    from collections import deque
+    from QueueEngine import Request, RequestStore
+    results = []
+    for n in queueLengths:
+        store = RequestStore()
+        queue = deque(store.add(float(i)) for i in range(n))
+        start = timeit.default_timer()
+        for i in xrange(numOperations):
+            slot = queue.popleft()
+            store.serviceTimes[slot] = 1.0
+            store.release(slot)
+            queue.append(store.add(2.0))
+        seconds = timeit.default_timer() - start
+        memory = (store.birthTimes.nbytes*3 + sys.getsizeof(queue) + sys.getsizeof(store.freeSlots) +
+                  sum(sys.getsizeof(slot) for slot in queue))
+        results.append(("RequestStore and deque", n, seconds/numOperations*1e9, memory/n))
+        if n <= 10**5:
+            requests = [Request(float(i)) for i in range(n)]
+            operations = numOperations//10
+            start = timeit.default_timer()
+            for i in xrange(operations):
+                request = requests.pop(0)
+                request.setServiceTime(1.0)
+                requests.append(Request(2.0))
+            seconds = timeit.default_timer() - start
+            memory = sys.getsizeof(requests) + sum(sys.getsizeof(request) for request in requests)
+            results.append(("list of Request", n, seconds/operations*1e9, memory/n))
+    return results
+
+def benchmarkVarianceReduction(numReplications=20, simulationTime=200, monitorStartingTime=20, processes=None):
+    '''
+    Estimates the average queuing time of M/M/1 with arrival rate 40 and average service time 0.015 (and its
+    difference from average service time 0.0125) with and without each variance reduction technique, using the same
+    number of simulated events for both. Antithetic pairs lose their correlation in long runs close to saturation,
+    so the load is moderate. Returns a list of (technique, plain half width, reduced half width,
+    factor) tuples, where factor is (plain half width/reduced half width)**2, the number of times more events
+    independent replications need for the same confidence interval width.
+    '''
+    from MM1Queue import Controller
+    from Replications import runReplications
+    from VarianceReduction import (compareConfigurations, runAntitheticReplications, getControlVariateInterval,
+                                   getHalfWidth)
+    arguments = (40, 0.015, simulationTime)
+    otherArguments = (40, 0.0125, simulationTime)
+    name = "averageQueuingTime"
+    results = []
+
+    independent = compareConfigurations(Controller, arguments, otherArguments, monitorStartingTime, numReplications,
+                                        commonRandomNumbers=False, processes=processes)
+    common = compareConfigurations(Controller, arguments, otherArguments, monitorStartingTime, numReplications,
+                                   processes=processes)
+    results.append(("common random numbers (difference)", getHalfWidth(independent, name), getHalfWidth(common, name)))
+
+    # A pair simulates twice the events of a replication, so it is compared with twice the replications.
+    plain = runReplications(Controller, arguments, monitorStartingTime, 2*numReplications, seed=10**6,
+                            processes=processes)
+    antithetic = runAntitheticReplications(Controller, arguments, monitorStartingTime, numReplications,
+                                           processes=processes)
+    results.append(("antithetic variates", getHalfWidth(plain, name), getHalfWidth(antithetic, name)))
+
+    mean, halfWidth, coefficient = getControlVariateInterval(plain, name, "averageServiceTime", 0.015)
+    results.append(("control variate (service time)", getHalfWidth(plain, name), halfWidth))
+    return [(technique, plainHalfWidth, reducedHalfWidth, (plainHalfWidth/reducedHalfWidth)**2)
+            for technique, plainHalfWidth, reducedHalfWidth in results]
+
+def benchmarkTracing(numEvents=10**7, path="benchmark.trace"):
+    '''
+    Runs M/M/1 with arrival rate 60 and average service time 0.015 for numEvents events without and with a
+    TraceSink, and then analyzes the trace. Returns (seconds without trace, seconds with trace, seconds to analyze,
+    trace size in bytes). The trace file is deleted afterwards.
+    '''
+    from MM1Queue import Controller
+    from Trace import TraceSink, readTrace, analyzeTrace
+    results = []
+    for sink in (None, TraceSink(path)):
+        controller = Controller(60, 0.015, float("inf"), seed=1, trace=sink)
+        start = timeit.default_timer()
+        controller.runSimulation(0, maxEvents=numEvents)
+        if sink is not None:
+            sink.close(controller)
+        results.append(timeit.default_timer() - start)
+    start = timeit.default_timer()
+    analyzeTrace(readTrace(path), 0, controller.time).getSummary()
+    results.append(timeit.default_timer() - start)
+    results.append(os.path.getsize(path))
+    os.remove(path)
+    return tuple(results)
+
+def benchmarkRareEvents(cases=((0.5, 20), (0.5, 30), (0.8, 60), (0.8, 90)), relativePrecision=0.05):
+    '''
+    Estimates the blocking probability of M/M/1/K with average service time 1 for every (load, capacity) of cases by
+    importance sampling (see RareEvents) to the given relative precision at 95% confidence. Returns a list of (load,
+    capacity, estimate, exact probability, seconds, events, events counting rejections would need) tuples.
+    '''
+    from Analytic import solve
+    from RareEvents import estimateBlockingProbability, getBruteForceEvents
+    results = []
+    for load, capacity in cases:
+        start = timeit.default_timer()
+        estimate = estimateBlockingProbability(load, 1.0, capacity, seed=1, relativePrecision=relativePrecision)
+        seconds = timeit.default_timer() - start
+        exact = solve("M/M/1/K", load, 1.0, capacity=capacity).rejectionProbability
+        results.append((load, capacity, estimate.probability, exact, seconds, estimate.numEvents,
+                        getBruteForceEvents(exact, estimate.relativeError)))
+    return results
+
+def benchmarkCompiledEngine(cases=(("M/M/1", 0.9, None), ("M/M/1/K", 0.9, 50), ("M/D/1/K", 0.9, 50)),
+                            numEvents=NUM_MODEL_EVENTS):
+    '''
+    Runs every (model, load, capacity) of cases for numEvents events in time weighted mode with the Controller and with
+    the compiled event loop (see CompiledEngine), after a short run that compiles it. Returns a list of (model, load,
+    capacity, Controller events per second, compiled events per second) tuples, or None if Numba is not installed.
+    '''
+    import CompiledEngine
+    from QueueEngine import Controller
+    from NumberGenerator import Exponential, Deterministic
+    if not CompiledEngine.isAvailable():
+        return None
+    results = []
+    for model, load, capacity in cases:
+        serviceDistribution = Deterministic(1.0) if model.startswith("M/D") else Exponential(1.0)
+        makeController = lambda: Controller(Exponential(load), serviceDistribution, float("inf"), capacity=capacity,
+                                            seed=1, timeWeighted=True)
+        CompiledEngine.runSimulation(makeController(), 0, maxEvents=1000)
+        eventsPerSecond = []
+        for run in (lambda controller: controller.runSimulation(0, maxEvents=numEvents),
+                    lambda controller: CompiledEngine.runSimulation(controller, 0, maxEvents=numEvents)):
+            controller = makeController()
+            start = timeit.default_timer()
+            run(controller)
+            eventsPerSecond.append(controller.numEvents/(timeit.default_timer() - start))
+        results.append((model, load, capacity) + tuple(eventsPerSecond))
+    return results
+
+def runModel(model, load, capacity, numEvents):
+    '''
+    Simulates numEvents events of model with average service time 1 and arrival rate load, in time weighted mode.
+    Returns (events per second, peak memory in bytes, increase of the peak memory during the run in bytes). Meant to
+    run in a fresh process, since the peak memory of a process never decreases.
+    '''
+    import resource
+    from QueueEngine import Controller
+    from NumberGenerator import Exponential, Deterministic
+    serviceDistribution = Deterministic(1.0) if model.startswith("M/D") else Exponential(1.0)
+    controller = Controller(Exponential(load), serviceDistribution, float("inf"), capacity=capacity, seed=1,
+                            timeWeighted=True)
+    # ru_maxrss is in kilobytes on Linux.
+    peakBefore = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+    start = timeit.default_timer()
+    controller.runSimulation(0, maxEvents=numEvents)
+    seconds = timeit.default_timer() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+    return controller.numEvents/seconds, peak, peak - peakBefore
+
+def runModelTask(task):
+    return runModel(*task)
+
+def benchmarkModels(configurations=MODEL_CONFIGURATIONS, numEvents=NUM_MODEL_EVENTS):
+    '''
+    Runs every (model, load, capacity) of configurations (see MODEL_CONFIGURATIONS) for numEvents events, each in
+    its own process. Returns a list of (model, load, capacity, events per second, peak memory in bytes, increase of
+    the peak memory during the run) tuples.
+    '''
+    from multiprocessing import Pool
+    results = []
+    for model, loads, capacities in configurations:
+        for load in loads:
+            for capacity in capacities:
+                pool = Pool(1)
+                eventsPerSecond, peak, increase = pool.apply(runModelTask, ((model, load, capacity, numEvents),))
+                pool.close()
+                pool.join()
+                results.append((model, load, capacity, eventsPerSecond, peak, increase))
+    return results
+
+def getModelName(model, capacity):
+    return model if capacity is None else model.replace("K", str(capacity))
+
+def compareModels(results, path, tolerance=REGRESSION_TOLERANCE):
+    '''
+    Compares results of benchmarkModels with the baseline in path, writing them as the baseline if there is none.
+    Returns a list of (configuration, baseline events per second, events per second) for the configurations that
+    are more than tolerance slower than the baseline.
+    '''
+    current = dict(("%s rho=%s" % (getModelName(model, capacity), load), eventsPerSecond)
+                   for model, load, capacity, eventsPerSecond, peak, increase in results)
+    if not os.path.exists(path):
+        with open(path, "w") as baselineFile:
+            json.dump(current, baselineFile, indent=1, sort_keys=True)
+        return []
+    with open(path) as baselineFile:
+        baseline = json.load(baselineFile)
+    return [(name, baseline[name], current[name]) for name in sorted(current)
+            if name in baseline and current[name] < (1 - tolerance)*baseline[name]]
+
+def profileModel(numEvents=NUM_VALUES):
+    '''
+    Returns a timing Profiler (see Profiling) of M/M/1 with load 0.9 run for numEvents events.
+    '''
+    from MM1Queue import Controller
+    from Profiling import Profiler
+    controller = Controller(0.9, 1.0, float("inf"), seed=1)
+    profiler = Profiler(timing=True)
+    profiler.attach(controller)
+    controller.runSimulation(0, maxEvents=numEvents)
+    profiler.detach(controller)
+    return profiler
+
+def printModels(results):
+    print "%-12s %5s %14s %14s %14s" % ("Model", "rho", "Events/s", "Peak MB", "Run Peak MB")
+    for model, load, capacity, eventsPerSecond, peak, increase in results:
+        print "%-12s %5s %14.0f %14.1f %14.1f" % (getModelName(model, capacity), load, eventsPerSecond, peak/2**20,
+                                                   increase/2**20)
+
+if __name__ == "__main__" and sys.argv[1:2] == ["models"]:
+    results = benchmarkModels()
+    printModels(results)
+    if len(sys.argv) > 2:
+        regressions = compareModels(results, sys.argv[2])
+        for name, baselineEventsPerSecond, eventsPerSecond in regressions:
+            print "Regression: %s %.0f events/s, baseline %.0f" % (name, eventsPerSecond, baselineEventsPerSecond)
+        sys.exit(1 if regressions else 0)
+elif __name__ == "__main__":
+    print "Variate generation (ns per value)"
+    for name, nanoseconds in benchmarkVariateStreams():
+        print "%-40s %8.1f" % (name, nanoseconds)
+    print
+    print "Event calendars, hold model (events per second)"
+    for name, n, eventsPerSecond in benchmarkEventCalendars():
+        print "%-20s %6d pending %12.0f" % (name, n, eventsPerSecond)
+    print
+    print "Request storage (ns per dequeue and enqueue, bytes per waiting request)"
+    for name, n, nanoseconds, bytesPerRequest in benchmarkRequestStorage():
+        print "%-25s %8d waiting %10.1f %8.1f" % (name, n, nanoseconds, bytesPerRequest)
+    print
+    print "Variance reduction, M/M/1 average queuing time (95% half widths for equal numbers of events)"
+    for technique, plainHalfWidth, reducedHalfWidth, factor in benchmarkVarianceReduction():
+        print "%-36s %10.6f %10.6f %6.1fx fewer events" % (technique, plainHalfWidth, reducedHalfWidth, factor)
+    print
+    print "Tracing 10**7 events (seconds without trace, with trace, to analyze the trace)"
+    withoutTrace, withTrace, analysis, size = benchmarkTracing()
+    print "%.1f %.1f (%+.0f%%) %.1f, %d bytes" % (withoutTrace, withTrace, (withTrace/withoutTrace - 1)*100, analysis, size)
+    print
+    print "Rare event blocking of M/M/1/K, +/-5% (load, K, estimate, exact, seconds, events, brute force events)"
+    for load, capacity, estimate, exact, seconds, events, bruteForceEvents in benchmarkRareEvents():
+        print "%4s %4d %12.4g %12.4g %8.2f %12d %12.3g" % (load, capacity, estimate, exact, seconds, events,
+                                                         bruteForceEvents)
+    print
+    print "Compiled event loop, 10**6 events in time weighted mode (events per second)"
+    compiled = benchmarkCompiledEngine()
+    if compiled is None:
+        print "Numba is not installed"
+    else:
+        for model, load, capacity, eventsPerSecond, compiledEventsPerSecond in compiled:
+            print "%-10s %4s %12.0f %12.0f %6.1fx" % (getModelName(model, capacity), load, eventsPerSecond,
+                                                     compiledEventsPerSecond, compiledEventsPerSecond/eventsPerSecond)
+    print
+    print "Models, 10**6 events in time weighted mode"
+    printModels(benchmarkModels())
+    print
+    print "Profile of M/M/1 at rho = 0.9, 10**6 events (timing inflates the cheapest calls)"
+    profileModel().printReport()
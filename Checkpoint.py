@@ -0,0 +1,124 @@
+'''
+Checkpoint
+
+This module saves the state of a running simulation to a NumPy .npz file and restores it, so that a long run can be
+paused and resumed, and so that many what-if branches can start from one warmed up steady state instead of each
+repeating the warm-up period.
+
+    controller.runSimulation(1000)           # warm up (and monitor) until time 1000
+    saveCheckpoint(controller, "warm.npz")
+    ...
+    branch = Controller(..., simulationTime=5000)
+    forkCheckpoint(branch, "warm.npz", seed=7)
+    branch.resumeSimulation()
+
+The file holds the time, the pending events, the queue, the servers, the times of the requests in the system, the
+state and unused block of every random number stream, and the Monitor. The Controller restored into is built by
+the caller and keeps its own configuration (distributions, capacity, simulationTime), so a branch can change the
+service distribution, for example. It must have the same number of servers.
+
+The Monitor and the warm-up detector are stored pickled, so only load checkpoints from trusted sources.
+'''
+from __future__ import division #Required for floating point division.
+import cPickle as pickle
+import numpy
+from NumberGenerator import VariateStream, substream, ARRIVAL_STREAM, SERVICE_STREAM, MONITOR_STREAM, CLASS_STREAM
+
+# The random number streams of a Controller, by attribute name and substream. Controllers with several classes of
+# requests also have the CLASS_STREAM (see getStreams).
+STREAMS = [("interarrivalTimes", ARRIVAL_STREAM), ("serviceTimes", SERVICE_STREAM),
+           ("monitorIntervals", MONITOR_STREAM)]
+
+def getStreams(controller):
+    if controller.numClasses > 1:
+        return STREAMS + [("classStream", CLASS_STREAM)]
+    return STREAMS
+
+def saveCheckpoint(controller, path):
+    '''
+    Writes the state of controller to path, an .npz file. The state of a Disciplines.ProcessorSharingController is
+    not saved.
+    '''
+    if hasattr(controller, "virtualTime"):
+        raise ValueError("Processor sharing simulations cannot be checkpointed")
+    entries = controller.schedule.getEntries()
+    state = {"time": controller.time,
+             "numEvents": controller.numEvents,
+             "monitorStartingTime": controller.monitorStartingTime,
+             "calendarTimes": numpy.array([time for time, event in entries], dtype=float),
+             "calendarEvents": numpy.array([event for time, event in entries], dtype=numpy.int64),
+             "queue": numpy.array(list(controller.queue), dtype=numpy.int64),
+             "beingServed": numpy.array([-1 if slot is None else slot for slot in controller.beingServed],
+                                        dtype=numpy.int64),
+             "idleServers": numpy.array(controller.idleServers, dtype=numpy.int64),
+             "requestFreeSlots": numpy.array(controller.requests.freeSlots, dtype=numpy.int64),
+             "monitor": toBytes(controller.monitor),
+             "warmupDetector": toBytes(controller.warmupDetector)}
+    # The arrays of the RequestStore, such as requestBirthTimes.
+    for field in controller.requests.fields:
+        state["request" + field[0].upper() + field[1:]] = getattr(controller.requests, field)
+    for name, streamId in getStreams(controller):
+        (generator, keys, position, hasGauss, cachedGaussian), values, consumed = getattr(controller, name).getState()
+        state[name + "Keys"] = keys
+        state[name + "Generator"] = numpy.array([position, hasGauss, cachedGaussian], dtype=float)
+        state[name + "Values"] = numpy.array(values, dtype=float)
+        state[name + "Consumed"] = consumed
+    numpy.savez_compressed(path, **state)
+
+def loadCheckpoint(controller, path):
+    '''
+    Restores the state saved in path into controller, which continues exactly as the saved Controller would have
+    when resumed (see Controller.resumeSimulation).
+    '''
+    with numpy.load(path) as state:
+        restoreState(controller, state)
+        for name, streamId in getStreams(controller):
+            position, hasGauss, cachedGaussian = state[name + "Generator"]
+            randomStateState = ("MT19937", state[name + "Keys"], int(position), int(hasGauss), cachedGaussian)
+            getattr(controller, name).setState((randomStateState, state[name + "Values"].tolist(),
+                                               int(state[name + "Consumed"])))
+
+def forkCheckpoint(controller, path, seed):
+    '''
+    Restores the state saved in path into controller but draws the random numbers from here on with seed, so
+    branches forked with different seeds are independent continuations of the same state. Events already
+    pending, such as the next birth, keep their saved times.
+    '''
+    with numpy.load(path) as state:
+        restoreState(controller, state)
+    for name, streamId in getStreams(controller):
+        stream = getattr(controller, name)
+        setattr(controller, name, VariateStream(stream.distribution, substream(seed, streamId), stream.blockSize,
+                                                stream.antithetic))
+
+def restoreState(controller, state):
+    servers = len(state["beingServed"])
+    if servers != controller.servers:
+        raise ValueError("The checkpoint has %d servers but the Controller has %d" % (servers, controller.servers))
+    controller.time = state["time"].item()
+    controller.numEvents = state["numEvents"].item()
+    controller.monitorStartingTime = state["monitorStartingTime"].item()
+    schedule = controller.schedule.__class__(len(controller.handlers))
+    for time, event in zip(state["calendarTimes"].tolist(), state["calendarEvents"].tolist()):
+        schedule.schedule(time, event)
+    controller.schedule = schedule
+    # The queue is emptied and refilled in serving order, so it keeps the Controller's discipline.
+    while controller.queue:
+        controller.queue.popleft()
+    requests = controller.requests
+    for field in requests.fields:
+        setattr(requests, field, state["request" + field[0].upper() + field[1:]].copy())
+    for slot in state["queue"].tolist():
+        controller.queue.append(slot)
+    controller.beingServed = [None if slot < 0 else slot for slot in state["beingServed"].tolist()]
+    controller.numBeingServed = servers - controller.beingServed.count(None)
+    controller.idleServers = state["idleServers"].tolist()
+    requests.freeSlots = state["requestFreeSlots"].tolist()
+    controller.monitor = fromBytes(state["monitor"])
+    controller.warmupDetector = fromBytes(state["warmupDetector"])
+
+def toBytes(value):
+    return numpy.frombuffer(pickle.dumps(value, pickle.HIGHEST_PROTOCOL), dtype=numpy.uint8)
+
+def fromBytes(array):
+    return pickle.loads(array.tostring())
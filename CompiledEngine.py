@@ -0,0 +1,288 @@
+'''
+CompiledEngine
+
+This module runs the event loop of a QueueEngine Controller as one compiled function when Numba is installed, to
+remove the interpreter overhead per event for the models that have no faster special case (finite capacity,
+several servers):
+
+    controller = MM1KQueue.Controller(60, 0.015, 10**5, seed=1)
+    CompiledEngine.runSimulation(controller, 100)
+    controller.monitor.printReport()
+
+The kernel, runEvents, keeps the state of the queue in arrays: the calendar as one time per event (like the
+NextEventCalendar, ties going to the lowest event), the birth times of the waiting requests in a circular buffer, and
+the birth and service start times of the requests being served. It executes births, deaths and Monitor events
+exactly as the Controller does, with the same arithmetic, and draws its random numbers from the blocks of the
+Controller's own VariateStreams, so the events, their times and every count are the same as those of
+Controller.runSimulation with the same seed. It returns to Python whenever a block of random numbers is used up or its
+output buffers are full; the times of the dead requests, the snapshots and the state changes are then given to the
+Monitor as arrays (Monitor.recordDeadTimeArrays and the like), so the statistics agree with the Controller's up to
+rounding. At the end the state is written back into the Controller, which can then be resumed, checkpointed or run
+further with either engine.
+
+Without Numba, runSimulation falls back to the Controller. Configurations the kernel does not cover (disciplines,
+classes of requests, traces, automatic warm-up detection, windows, sequential stopping and processor sharing) always
+run on the Controller. The kernel can also be run interpreted (jit=False), which is slow but checks it against the
+Controller where Numba is not installed.
+'''
+from __future__ import division #Required for floating point division.
+from collections import deque
+import numpy
+from EventCalendar import NextEventCalendar, HeapCalendar, CalendarQueue, BIRTH, MONITOR, DEATH, INFINITY
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Entries of the counters array shared by runEvents and Python.
+NUM_EVENTS = 0
+QUEUE_HEAD = 1
+QUEUE_LENGTH = 2
+NUM_IDLE_SERVERS = 3
+NUM_BEING_SERVED = 4
+ATTEMPTED_REQUESTS = 5
+REJECTED_REQUESTS = 6
+INTERARRIVAL_POSITION = 7
+SERVICE_POSITION = 8
+MONITOR_POSITION = 9
+NUM_DEATHS = 10
+NUM_STATE_CHANGES = 11
+NUM_SNAPSHOTS = 12
+NUM_COUNTERS = 13
+
+# Statuses returned by runEvents.
+FINISHED = 0
+NEEDS_PYTHON = 1
+
+# Size of the output buffers, the largest number of records collected between two returns to Python.
+OUTPUT_BUFFER_SIZE = 65536
+INITIAL_QUEUE_CAPACITY = 1024
+
+def runEvents(clock, eventTimes, counters, queueBirthTimes, birthTimes, serviceStartTimes, idleServers, busyTimes,
+              interarrivalTimes, serviceTimes, monitorIntervals, deathRecords, stateRecords, snapshotRecords,
+              capacity, timeWeighted, monitorStartingTime, simulationTime, maxEvents):
+    '''
+    Executes events until simulationTime or maxEvents events, or until more random numbers, output buffer space or
+    queue space may be needed. Returns FINISHED or NEEDS_PYTHON. clock[0] is the time, eventTimes the calendar and
+    counters the entries named above. Served requests are those with a birth time (birthTimes[server]) that is not
+    NaN. capacity is -1 for no limit. Written in the subset of Python that Numba compiles.
+    '''
+    numEventTypes = len(eventTimes)
+    queueCapacity = len(queueBirthTimes)
+    outputSize = len(deathRecords)
+    time = clock[0]
+    while time < simulationTime and counters[NUM_EVENTS] < maxEvents:
+        if (counters[INTERARRIVAL_POSITION] == len(interarrivalTimes) or
+                counters[SERVICE_POSITION] == len(serviceTimes) or
+                (not timeWeighted and counters[MONITOR_POSITION] == len(monitorIntervals)) or
+                counters[QUEUE_LENGTH] == queueCapacity or counters[NUM_DEATHS] == outputSize or
+                counters[NUM_STATE_CHANGES] == outputSize or counters[NUM_SNAPSHOTS] == outputSize):
+            clock[0] = time
+            return NEEDS_PYTHON
+        # Pop the earliest event, the lowest numbered one on ties.
+        event = 0
+        for candidate in range(1, numEventTypes):
+            if eventTimes[candidate] < eventTimes[event]:
+                event = candidate
+        time = eventTimes[event]
+        eventTimes[event] = INFINITY
+        server = -1
+        changed = True # Whether the number of requests may have changed.
+        if event == BIRTH:
+            eventTimes[BIRTH] = time + interarrivalTimes[counters[INTERARRIVAL_POSITION]]
+            counters[INTERARRIVAL_POSITION] += 1
+            accepted = True
+            if capacity >= 0:
+                if time > monitorStartingTime:
+                    counters[ATTEMPTED_REQUESTS] += 1
+                if counters[QUEUE_LENGTH] + counters[NUM_BEING_SERVED] == capacity:
+                    if time > monitorStartingTime:
+                        counters[REJECTED_REQUESTS] += 1
+                    accepted = False
+                    changed = False
+            if accepted:
+                queueBirthTimes[(counters[QUEUE_HEAD] + counters[QUEUE_LENGTH]) % queueCapacity] = time
+                counters[QUEUE_LENGTH] += 1
+                if counters[NUM_IDLE_SERVERS] > 0:
+                    counters[NUM_IDLE_SERVERS] -= 1
+                    server = idleServers[counters[NUM_IDLE_SERVERS]]
+        elif event == MONITOR:
+            snapshot = counters[NUM_SNAPSHOTS]
+            snapshotRecords[snapshot, 0] = counters[QUEUE_LENGTH]
+            snapshotRecords[snapshot, 1] = counters[QUEUE_LENGTH] + counters[NUM_BEING_SERVED]
+            counters[NUM_SNAPSHOTS] += 1
+            eventTimes[MONITOR] = time + monitorIntervals[counters[MONITOR_POSITION]]
+            counters[MONITOR_POSITION] += 1
+            changed = False
+        else:
+            deadServer = event - DEATH
+            serviceStartTime = serviceStartTimes[deadServer]
+            if time > monitorStartingTime:
+                death = counters[NUM_DEATHS]
+                deathRecords[death, 0] = birthTimes[deadServer]
+                deathRecords[death, 1] = serviceStartTime
+                deathRecords[death, 2] = time
+                counters[NUM_DEATHS] += 1
+                busyTime = time - max(serviceStartTime, monitorStartingTime)
+                busyTimes[deadServer] += busyTime
+            birthTimes[deadServer] = numpy.nan
+            counters[NUM_BEING_SERVED] -= 1
+            if counters[QUEUE_LENGTH] != 0:
+                server = deadServer
+            else:
+                idleServers[counters[NUM_IDLE_SERVERS]] = deadServer
+                counters[NUM_IDLE_SERVERS] += 1
+        if server >= 0:
+            # Serve the request at the head of the queue.
+            birthTimes[server] = queueBirthTimes[counters[QUEUE_HEAD]]
+            counters[QUEUE_HEAD] = (counters[QUEUE_HEAD] + 1) % queueCapacity
+            counters[QUEUE_LENGTH] -= 1
+            serviceStartTimes[server] = time
+            counters[NUM_BEING_SERVED] += 1
+            eventTimes[DEATH + server] = time + serviceTimes[counters[SERVICE_POSITION]]
+            counters[SERVICE_POSITION] += 1
+        if timeWeighted and changed:
+            change = counters[NUM_STATE_CHANGES]
+            stateRecords[change, 0] = time
+            stateRecords[change, 1] = counters[QUEUE_LENGTH]
+            stateRecords[change, 2] = counters[QUEUE_LENGTH] + counters[NUM_BEING_SERVED]
+            counters[NUM_STATE_CHANGES] += 1
+        counters[NUM_EVENTS] += 1
+    clock[0] = time
+    return FINISHED
+
+if numba is not None:
+    compiledRunEvents = numba.njit(cache=True)(runEvents)
+else:
+    compiledRunEvents = None
+
+def isAvailable():
+    '''
+    Returns True if Numba is installed, so runSimulation runs compiled.
+    '''
+    return compiledRunEvents is not None
+
+def isSupported(controller):
+    '''
+    Returns True if the kernel can run controller (see the module documentation).
+    '''
+    return (isinstance(controller.queue, deque) and controller.numClasses == 1 and not controller.demandsAtBirth and
+            controller.trace is None and controller.monitor.windowLength is None and
+            not hasattr(controller, "virtualTime") and
+            controller.schedule.__class__ in (NextEventCalendar, HeapCalendar, CalendarQueue))
+
+def runSimulation(controller, monitorStartingTime, maxEvents=None, jit=True):
+    '''
+    Runs controller like controller.runSimulation(monitorStartingTime, maxEvents=maxEvents), compiled if jit is True
+    and Numba is installed, and interpreted if jit is False. monitorStartingTime must be given.
+    '''
+    if not isSupported(controller) or (jit and not isAvailable()):
+        controller.runSimulation(monitorStartingTime, maxEvents=maxEvents)
+        return
+    controller.startSimulation(monitorStartingTime)
+    resumeSimulation(controller, maxEvents, jit)
+
+def resumeSimulation(controller, maxEvents=None, jit=True):
+    '''
+    Executes events of controller like controller.resumeSimulation(maxEvents=maxEvents), with the kernel if it can.
+    '''
+    if (not isSupported(controller) or controller.warmupDetector is not None or (jit and not isAvailable())):
+        controller.resumeSimulation(maxEvents=maxEvents)
+        return
+    kernel = compiledRunEvents if jit else runEvents
+    servers = controller.servers
+    monitor = controller.monitor
+    requests = controller.requests
+
+    clock = numpy.array([controller.time], dtype=float)
+    eventTimes = numpy.full(DEATH + servers, INFINITY)
+    for time, event in controller.schedule.getEntries():
+        eventTimes[event] = time
+    counters = numpy.zeros(NUM_COUNTERS, dtype=numpy.int64)
+    counters[NUM_EVENTS] = controller.numEvents
+    queue = [requests.birthTimes.item(slot) for slot in controller.queue]
+    queueBirthTimes = numpy.zeros(max(INITIAL_QUEUE_CAPACITY, 2*len(queue)))
+    queueBirthTimes[:len(queue)] = queue
+    counters[QUEUE_LENGTH] = len(queue)
+    birthTimes = numpy.full(servers, numpy.nan)
+    serviceStartTimes = numpy.zeros(servers)
+    for server, slot in enumerate(controller.beingServed):
+        if slot is not None:
+            birthTimes[server] = requests.birthTimes.item(slot)
+            serviceStartTimes[server] = requests.serviceTimes.item(slot)
+    counters[NUM_BEING_SERVED] = controller.numBeingServed
+    idleServers = numpy.zeros(servers, dtype=numpy.int64)
+    idleServers[:len(controller.idleServers)] = controller.idleServers
+    counters[NUM_IDLE_SERVERS] = len(controller.idleServers)
+    busyTimes = numpy.array(monitor.serverBusyTimes, dtype=float)
+    counters[ATTEMPTED_REQUESTS] = monitor.attemptedRequests
+    counters[REJECTED_REQUESTS] = monitor.rejectedRequests
+    streams = [(controller.interarrivalTimes, INTERARRIVAL_POSITION), (controller.serviceTimes, SERVICE_POSITION),
+               (controller.monitorIntervals, MONITOR_POSITION)]
+    blocks = []
+    for stream, position in streams:
+        randomStateState, values, counters[position] = stream.getState()
+        blocks.append(numpy.array(values, dtype=float))
+    deathRecords = numpy.zeros((OUTPUT_BUFFER_SIZE, 3))
+    stateRecords = numpy.zeros((OUTPUT_BUFFER_SIZE, 3))
+    snapshotRecords = numpy.zeros((OUTPUT_BUFFER_SIZE, 2), dtype=numpy.int64)
+    capacity = -1 if controller.capacity is None else controller.capacity
+    maxEvents = numpy.iinfo(numpy.int64).max if maxEvents is None else controller.numEvents + maxEvents
+
+    while True:
+        status = kernel(clock, eventTimes, counters, queueBirthTimes, birthTimes, serviceStartTimes, idleServers,
+                        busyTimes, blocks[0], blocks[1], blocks[2], deathRecords, stateRecords, snapshotRecords,
+                        capacity, controller.timeWeighted, controller.monitorStartingTime, controller.simulationTime,
+                        maxEvents)
+        # Hand the records to the Monitor.
+        numDeaths = counters[NUM_DEATHS]
+        monitor.recordDeadTimeArrays(deathRecords[:numDeaths, 0], deathRecords[:numDeaths, 1],
+                                     deathRecords[:numDeaths, 2])
+        numChanges = counters[NUM_STATE_CHANGES]
+        if numChanges:
+            monitor.recordStateChangeArrays(stateRecords[:numChanges, 0], stateRecords[:numChanges, 1].astype(int),
+                                            stateRecords[:numChanges, 2].astype(int))
+        numSnapshots = counters[NUM_SNAPSHOTS]
+        if numSnapshots:
+            monitor.recordSnapshotArrays(snapshotRecords[:numSnapshots, 0], snapshotRecords[:numSnapshots, 1])
+        counters[NUM_DEATHS] = counters[NUM_STATE_CHANGES] = counters[NUM_SNAPSHOTS] = 0
+        if status == FINISHED:
+            break
+        # Draw the next block of every stream used up, as its next method would.
+        for i, (stream, position) in enumerate(streams):
+            if counters[position] == len(blocks[i]) and not (position == MONITOR_POSITION and controller.timeWeighted):
+                blocks[i] = numpy.ascontiguousarray(stream.block(stream.blockSize), dtype=float)
+                counters[position] = 0
+        if counters[QUEUE_LENGTH] == len(queueBirthTimes):
+            queueBirthTimes = numpy.roll(queueBirthTimes, -counters[QUEUE_HEAD])
+            queueBirthTimes = numpy.concatenate([queueBirthTimes, numpy.zeros(len(queueBirthTimes))])
+            counters[QUEUE_HEAD] = 0
+
+    # Write the state back into the Controller.
+    controller.time = clock.item(0)
+    for i, (stream, position) in enumerate(streams):
+        stream.setState((stream.randomState.get_state(), blocks[i].tolist(), int(counters[position])))
+    schedule = controller.schedule.__class__(len(controller.handlers))
+    for event, time in enumerate(eventTimes.tolist()):
+        if time != INFINITY:
+            schedule.schedule(time, event)
+    controller.schedule = schedule
+    requests = controller.requests = requests.__class__()
+    controller.queue = deque()
+    head = counters[QUEUE_HEAD]
+    for i in xrange(counters[QUEUE_LENGTH]):
+        controller.queue.append(requests.add(queueBirthTimes.item((head + i) % len(queueBirthTimes))))
+    controller.beingServed = [None]*servers
+    for server in xrange(servers):
+        if not numpy.isnan(birthTimes[server]):
+            slot = requests.add(birthTimes.item(server))
+            requests.serviceTimes[slot] = serviceStartTimes.item(server)
+            controller.beingServed[server] = slot
+    controller.numBeingServed = int(counters[NUM_BEING_SERVED])
+    controller.idleServers = idleServers[:counters[NUM_IDLE_SERVERS]].tolist()
+    monitor.serverBusyTimes = busyTimes.tolist()
+    monitor.attemptedRequests = int(counters[ATTEMPTED_REQUESTS])
+    monitor.rejectedRequests = int(counters[REJECTED_REQUESTS])
+    controller.numEvents = int(counters[NUM_EVENTS])
+    controller.finishRun()
@@ -0,0 +1,181 @@
+'''
+Disciplines
+
+This module defines the orders, other than first come first served, in which the Controller can serve waiting
+requests. A discipline is a class given to the Controller (Controller(..., discipline=PriorityQueue)) and built by it
+from its RequestStore and number of request classes. It holds the slots of the waiting requests and has the methods
+of the deque the Controller uses by default:
+    append(slot)  - adds a waiting request
+    popleft()     - removes and returns the request to serve next
+    len(queue)    - the number of waiting requests
+    iter(queue)   - the waiting requests, in an order that rebuilds the queue when appended to an empty one
+The queues are non-preemptive: a request being served is never interrupted.
+
+    LifoQueue             - last come first served
+    PriorityQueue         - the waiting request of the lowest class first, first come first served within a class
+    ShortestJobFirstQueue - the waiting request with the shortest service time first
+
+Classes are drawn at birth with the Controller's classProbabilities, and the Monitor then keeps the waiting and
+queuing times of each class. Analytic.priorityQueue gives the exact per-class results of M/G/1 with priorities.
+
+Processor sharing is not an order of a queue, since every request is served at once, so it is the
+ProcessorSharingController.
+'''
+from __future__ import division #Required for floating point division.
+from collections import deque
+from heapq import heappush, heappop
+from EventCalendar import NextEventCalendar, BIRTH, DEATH, INFINITY
+from QueueEngine import Controller
+
+class LifoQueue(list):
+    '''
+    Serves the request that arrived last first.
+    '''
+    def __init__(self, requests, numClasses):
+        list.__init__(self)
+    popleft = list.pop
+
+class PriorityQueue:
+    '''
+    Keeps a deque of the waiting requests of every class and serves the first request of the lowest numbered class
+    with waiting requests, so class 0 has the highest priority. The Controller must be given classProbabilities.
+    '''
+    needsClasses = True
+
+    def __init__(self, requests, numClasses):
+        self.requests = requests
+        self.queues = [deque() for i in xrange(numClasses)]
+        self.size = 0
+    def append(self, slot):
+        self.queues[int(self.requests.classes.item(slot))].append(slot)
+        self.size += 1
+    def popleft(self):
+        for queue in self.queues:
+            if queue:
+                self.size -= 1
+                return queue.popleft()
+        raise IndexError("pop from an empty queue")
+    def __len__(self):
+        return self.size
+    def __iter__(self):
+        for queue in self.queues:
+            for slot in queue:
+                yield slot
+
+class ShortestJobFirstQueue:
+    '''
+    Keeps the waiting requests in a heap by service time and serves the shortest first, in order of arrival for
+    equal service times. The Controller draws the service time of a request at its birth for this discipline.
+    '''
+    needsServiceDemands = True
+
+    def __init__(self, requests, numClasses):
+        self.requests = requests
+        self.heap = []
+        self.numAppended = 0
+    def append(self, slot):
+        heappush(self.heap, (self.requests.serviceDemands.item(slot), self.numAppended, slot))
+        self.numAppended += 1
+    def popleft(self):
+        return heappop(self.heap)[2]
+    def __len__(self):
+        return len(self.heap)
+    def __iter__(self):
+        for demand, order, slot in sorted(self.heap):
+            yield slot
+
+class ProcessorSharingController(Controller):
+    '''
+    Serves all the requests in the system at once: with n requests and c servers each is served at rate min(1, c/n).
+
+    The Controller follows the virtual time V, the service a request in the system since time 0 would have received,
+    which grows at rate min(1, c/n) and is updated at every event. A request born when the virtual time is V with
+    service time S dies when the virtual time reaches V + S, so the requests are kept in a heap by that finish time and
+    only the death of the first is scheduled; a birth changes the rate and reschedules it. Every event then costs
+    O(log n) however many requests share the servers.
+
+    Requests are never queued: the Monitor sees no requests waiting and numBeingServed requests in service, and the
+    serviceTimes of the RequestStore hold the service time of each request rather than the time its service started.
+    The waiting time recorded for a request is its queuing time minus its service time, the delay caused by sharing, and
+    the busy time of the servers is split evenly between them.
+    '''
+    def __init__(self, arrivalDistribution, serviceDistribution, simulationTime, capacity=None, servers=1, seed=None,
+                 keepSamples=False, timeWeighted=False, antithetic=False, trace=None, classProbabilities=None,
+                 windowLength=None):
+        Controller.__init__(self, arrivalDistribution, serviceDistribution, simulationTime, capacity, servers, seed,
+                            keepSamples, timeWeighted, NextEventCalendar, antithetic, trace, None, classProbabilities,
+                            windowLength)
+        self.virtualTime = 0.0
+        self.lastEventTime = 0.0
+        self.finishTimes = [] # Heap of the (virtual finish time, slot) of the requests in the system.
+        self.handlers[DEATH:] = [self.executeDeath] + [None]*(servers - 1)
+
+    def getServiceRate(self):
+        '''
+        Returns the rate at which every request in the system is being served.
+        '''
+        return min(1.0, self.servers/self.numBeingServed)
+
+    def advance(self):
+        '''
+        Brings the virtual time and the busy times of the servers up to the current time.
+        '''
+        if self.numBeingServed > 0:
+            rate = self.getServiceRate()
+            self.virtualTime += (self.time - self.lastEventTime)*rate
+            if self.time > self.monitorStartingTime:
+                busyTime = (self.time - max(self.lastEventTime, self.monitorStartingTime))*rate*self.numBeingServed/self.servers
+                for server in xrange(self.servers):
+                    self.monitor.recordBusyTime(server, busyTime)
+        self.lastEventTime = self.time
+
+    def scheduleDeath(self):
+        if self.finishTimes:
+            finishTime = self.finishTimes[0][0]
+            self.schedule.schedule(self.time + max(finishTime - self.virtualTime, 0.0)/self.getServiceRate(), DEATH)
+        else:
+            self.schedule.schedule(INFINITY, DEATH)
+
+    def executeBirth(self, event):
+        self.schedule.schedule(self.time + self.interarrivalTimes.next(), BIRTH)
+        if self.capacity is not None:
+            if self.time > self.monitorStartingTime:
+                self.monitor.incrementAttemptedRequests()
+            if self.numBeingServed == self.capacity:
+                if self.time > self.monitorStartingTime:
+                    self.monitor.incrementRejectedRequests()
+                if self.trace is not None:
+                    self.trace.recordRejection(self.time)
+                return
+        self.advance()
+        slot = self.requests.add(self.time)
+        if self.labelsRequests:
+            self.labelRequest(slot)
+        serviceTime = self.serviceTimes.next()
+        self.requests.serviceTimes[slot] = serviceTime
+        heappush(self.finishTimes, (self.virtualTime + serviceTime, slot))
+        self.numBeingServed += 1
+        self.scheduleDeath()
+        if self.timeWeighted:
+            self.recordState()
+
+    def executeDeath(self, event):
+        self.advance()
+        finishTime, slot = heappop(self.finishTimes)
+        self.numBeingServed -= 1
+        self.scheduleDeath()
+        requests = self.requests
+        birthTime = requests.birthTimes.item(slot)
+        # The time the request would have started an uninterrupted service to die now.
+        serviceTime = self.time - requests.serviceTimes.item(slot)
+        if self.time > self.monitorStartingTime:
+            self.monitor.recordDeadTimes(birthTime, serviceTime, self.time)
+            if self.numClasses > 1:
+                self.monitor.recordClassTimes(int(requests.classes.item(slot)), birthTime, serviceTime, self.time)
+        elif self.warmupDetector is not None:
+            self.detectWarmup(self.time - birthTime)
+        if self.trace is not None:
+            self.trace.recordRequest(birthTime, serviceTime, self.time)
+        requests.release(slot)
+        if self.timeWeighted:
+            self.recordState()
@@ -0,0 +1,131 @@
+'''
+EventCalendar
+
+This module defines the schedules (event calendars) the Controller can keep its future events in.
+
+Events are small integers: BIRTH, MONITOR, and DEATH + i for the death of the request served by server i. The
+Controller dispatches an event by indexing a table of handlers with it, so no strings are compared.
+
+Every calendar has the same four methods:
+    schedule(time, event) - adds event at time
+    pop()                 - removes the earliest event and returns (time, event)
+    len(calendar)         - the number of pending events
+    getEntries()          - a list of the pending (time, event) pairs, in no particular order
+
+NextEventCalendar keeps one slot per event and needs no allocation per event. It suits small fixed event sets, as in
+a single server queue, which only ever has one Birth, at most one Death and one Monitor event pending.
+HeapCalendar is a binary heap, O(log n) per operation. CalendarQueue is Brown's calendar queue, O(1) on average per
+operation, for models with very many pending events. Because heapq is implemented in C, under CPython the heap is
+as fast as the slot calendar for a handful of events and faster than the calendar queue up to tens of thousands of
+pending events; Benchmark.benchmarkEventCalendars measures all three.
+'''
+from __future__ import division #Required for floating point division.
+from bisect import insort
+from heapq import heappush, heappop
+
+BIRTH = 0
+MONITOR = 1
+DEATH = 2
+
+INFINITY = float("inf")
+
+class NextEventCalendar:
+    '''
+    Keeps the time of the next occurrence of each of numEvents events in a slot. At most one occurrence of each
+    event can be pending, and pop scans the slots, so use this for small numbers of events.
+    '''
+    def __init__(self, numEvents):
+        self.times = [INFINITY]*numEvents
+    def schedule(self, time, event):
+        self.times[event] = time
+    def pop(self):
+        times = self.times
+        time = min(times)
+        event = times.index(time)
+        times[event] = INFINITY
+        return time, event
+    def __len__(self):
+        return len(self.times) - self.times.count(INFINITY)
+    def getEntries(self):
+        return [(time, event) for event, time in enumerate(self.times) if time != INFINITY]
+
+class HeapCalendar:
+    '''
+    Keeps (time, event) pairs in a binary heap.
+    '''
+    def __init__(self, numEvents=None):
+        self.heap = []
+    def schedule(self, time, event):
+        heappush(self.heap, (time, event))
+    def pop(self):
+        return heappop(self.heap)
+    def __len__(self):
+        return len(self.heap)
+    def getEntries(self):
+        return list(self.heap)
+
+class CalendarQueue:
+    '''
+    Brown's calendar queue (Communications of the ACM 31(10), 1988). Events are kept in an array of buckets like days in
+    a calendar: bucket i holds the events whose time t has int(t/bucketWidth) % numBuckets == i, sorted by time. pop
+    walks the buckets from the current day, taking the first event that belongs to the current year. The number of
+    buckets is doubled or halved as the number of events changes, and the bucket width is re-estimated from the spacing
+    of the earliest events at the same time, so a bucket holds a few events on average.
+    '''
+    MIN_BUCKETS = 2
+
+    def __init__(self, numEvents=None):
+        self.size = 0
+        self.lastTime = 0.0
+        self.rebuild(self.MIN_BUCKETS, 1.0, [])
+    def rebuild(self, numBuckets, bucketWidth, entries):
+        self.numBuckets = numBuckets
+        self.bucketWidth = bucketWidth
+        self.buckets = [[] for i in range(numBuckets)]
+        for time, event in entries:
+            self.buckets[int(time/bucketWidth) % numBuckets].append((time, event))
+        # Number of the current day since time 0. Its bucket is currentDay % numBuckets.
+        self.currentDay = int(self.lastTime/bucketWidth)
+    def resize(self, numBuckets):
+        entries = self.getEntries()
+        entries.sort()
+        # Three times the average separation of the earliest events, as suggested by Brown.
+        sample = entries[:25]
+        bucketWidth = self.bucketWidth
+        if len(sample) > 1 and sample[-1][0] > sample[0][0]:
+            bucketWidth = 3*(sample[-1][0] - sample[0][0])/(len(sample) - 1)
+        self.rebuild(numBuckets, bucketWidth, entries)
+    def schedule(self, time, event):
+        insort(self.buckets[int(time/self.bucketWidth) % self.numBuckets], (time, event))
+        self.size += 1
+        if self.size > 2*self.numBuckets:
+            self.resize(2*self.numBuckets)
+    def pop(self):
+        buckets = self.buckets
+        numBuckets = self.numBuckets
+        bucketWidth = self.bucketWidth
+        day = self.currentDay
+        for i in xrange(numBuckets):
+            bucket = buckets[day % numBuckets]
+            if bucket and int(bucket[0][0]/bucketWidth) <= day:
+                break
+            day += 1
+        else:
+            # Nothing happens in the coming year, so jump straight to the earliest event.
+            earliest = min(bucket[0] for bucket in buckets if bucket)
+            day = int(earliest[0]/bucketWidth)
+            bucket = buckets[day % numBuckets]
+        entry = bucket.pop(0)
+        self.currentDay = day
+        self.lastTime = entry[0]
+        self.size -= 1
+        if self.size < numBuckets//2 and numBuckets > self.MIN_BUCKETS:
+            self.resize(numBuckets//2)
+        return entry
+    def __len__(self):
+        return self.size
+    def getEntries(self):
+        entries = []
+        for bucket in self.buckets:
+            entries.extend(bucket)
+        return entries
@@ -0,0 +1,104 @@
+'''
+LindleyQueue
+
+This module defines a batch simulator for single server queues with a first-come first-serve discipline.
+
+Instead of pushing Birth, Death and Monitor events through a schedule, interarrival and service times are drawn
+in NumPy blocks and the waiting time of every request is computed directly with the Lindley recursion
+
+    W[n+1] = max(0, W[n] + S[n] - A[n+1])
+
+where W[n] is the time request n spends waiting in the queue, S[n] is its service time and A[n+1] is the time
+between the births of request n and request n+1. The recursion is evaluated a whole block at a time: writing
+C for the cumulative sum of S[n] - A[n+1], the waiting time of every request in a block is C minus the running
+minimum of C, so a block costs a handful of vectorized NumPy operations.
+
+The waiting time W and queuing time W + S are the same quantities the Monitor collects when a request dies.
+The time averaged number of requests waiting and in the system are recovered with Little's law.
+'''
+from __future__ import division #Required for floating point division.
+import numpy
+from NumberGenerator import Exponential, VariateStream, substream, ARRIVAL_STREAM, SERVICE_STREAM
+
+# Number of requests whose interarrival and service times are drawn at once.
+BLOCK_SIZE = 2**20
+
+def lindleyWaitingTimes(previousWaitingTime, previousServiceTime, serviceTimes, interarrivalTimes):
+    '''
+    Returns the waiting times of a block of requests. previousWaitingTime and previousServiceTime belong to the
+    request born just before the block (both are 0 if the system starts empty), serviceTimes[i] is the service time
+    of the i'th request of the block and interarrivalTimes[i] is the time between its birth and the previous birth.
+    '''
+    increments = numpy.empty(len(serviceTimes))
+    increments[0] = previousServiceTime - interarrivalTimes[0]
+    numpy.subtract(serviceTimes[:-1], interarrivalTimes[1:], out=increments[1:])
+    cumulative = numpy.cumsum(increments)
+    runningMinimum = numpy.minimum.accumulate(cumulative)
+    numpy.minimum(runningMinimum, -previousWaitingTime, out=runningMinimum)
+    return cumulative - runningMinimum
+
+def simulateLindley(arrivalRate, averageServiceTime, numRequests, warmupRequests=0, seed=None, blockSize=BLOCK_SIZE):
+    '''
+    Simulates numRequests requests passing through an M/M/1 queue which starts empty. The first warmupRequests
+    requests are simulated but not recorded, in the same way the Controller ignores deaths before
+    monitorStartingTime. Returns a LindleySummary of the recorded requests.
+    '''
+    interarrivalStream = VariateStream(Exponential(arrivalRate), substream(seed, ARRIVAL_STREAM))
+    serviceStream = VariateStream(Exponential(1/averageServiceTime), substream(seed, SERVICE_STREAM))
+    summary = LindleySummary()
+    waitingTime = 0.0
+    serviceTime = 0.0
+    time = 0.0
+    simulated = 0
+    while simulated < numRequests:
+        size = min(blockSize, numRequests - simulated)
+        interarrivalTimes = interarrivalStream.block(size)
+        serviceTimes = serviceStream.block(size)
+        waitingTimes = lindleyWaitingTimes(waitingTime, serviceTime, serviceTimes, interarrivalTimes)
+        birthTimes = time + numpy.cumsum(interarrivalTimes)
+
+        # Only record the part of the block that comes after the warm up period.
+        start = min(max(warmupRequests - simulated, 0), size)
+        if start < size:
+            summary.recordBlock(birthTimes[start:], waitingTimes[start:], serviceTimes[start:])
+
+        waitingTime = waitingTimes[-1]
+        serviceTime = serviceTimes[-1]
+        time = birthTimes[-1]
+        simulated += size
+    return summary
+
+class LindleySummary:
+    '''
+    Accumulates the Monitor report quantities for blocks of requests produced by simulateLindley.
+    '''
+    def __init__(self):
+        self.numRequests = 0
+        self.firstBirthTime = None
+        self.lastBirthTime = None
+        self.totalWaitingTime = 0.0
+        self.totalQueuingTime = 0.0
+    def recordBlock(self, birthTimes, waitingTimes, serviceTimes):
+        if self.firstBirthTime is None:
+            self.firstBirthTime = birthTimes[0]
+        self.lastBirthTime = birthTimes[-1]
+        self.numRequests += len(waitingTimes)
+        blockWaitingTime = waitingTimes.sum()
+        self.totalWaitingTime += blockWaitingTime
+        self.totalQueuingTime += blockWaitingTime + serviceTimes.sum()
+    def getObservedTime(self):
+        return self.lastBirthTime - self.firstBirthTime
+    def getAverageWaitingTime(self):
+        return self.totalWaitingTime/self.numRequests
+    def getAverageQueuingTime(self):
+        return self.totalQueuingTime/self.numRequests
+    def getAverageRequestsWaiting(self):
+        # Little's law: requests waiting = arrival rate * waiting time.
+        return self.totalWaitingTime/self.getObservedTime()
+    def getAverageRequestsInSystem(self):
+        return self.totalQueuingTime/self.getObservedTime()
+    def printReport(self):
+        print "Average Requests Waiting: "  + str(self.getAverageRequestsWaiting())
+        print "Average Requests In System: "  + str(self.getAverageRequestsInSystem())
+        print "Average Waiting Time: "  + str(self.getAverageWaitingTime())
+        print "Average Queuing Time: "  + str(self.getAverageQueuingTime())
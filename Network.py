@@ -0,0 +1,249 @@
+'''
+Network
+
+This module simulates an open network of queuing stations, such as a pipeline of services. Every Station is a queue
+like the one the QueueEngine Controller simulates, with its own service distribution, number of servers and
+capacity. Requests arrive from outside at station i with rate externalArrivalRates[i], and a request leaving station
+i goes to station j with probability routing[i][j] and leaves the network with probability 1 - sum(routing[i]).
+A request routed to a full station is lost.
+
+All stations share one event calendar (a heap), whose events are EXTERNAL_ARRIVAL and DEATH + k for the death of
+the request served by server k of the network. The destination of a request is drawn by bisecting the cumulative
+probabilities of the stations it can go to, so the cost of an event grows with the logarithm of the number of
+stations and servers, not linearly, and networks of hundreds of stations run at nearly the speed of one.
+
+Every station has a time weighted Monitor with the report quantities of a single queue, and the Network keeps the
+end-to-end sojourn times of the requests that leave it. Analytic.jacksonNetwork gives the exact results for networks
+of M/M/c stations without capacity limits.
+'''
+from __future__ import division #Required for floating point division.
+from bisect import bisect_right
+from collections import deque
+import numpy
+from EventCalendar import HeapCalendar, INFINITY
+from QueueEngine import Monitor, RequestStore, formatWindowValue
+from Statistics import RunningStatistics, QuantileSketch, BatchMeans, REPORTED_QUANTILES
+from NumberGenerator import Exponential, Uniform, VariateStream, substream, ARRIVAL_STREAM, MONITOR_STREAM
+
+EXTERNAL_ARRIVAL = 0
+DEATH = 1
+
+# Substreams of the seed used for routing decisions and for the service times of station i.
+ROUTING_STREAM = MONITOR_STREAM + 1
+FIRST_STATION_STREAM = ROUTING_STREAM + 1
+
+# Cumulative probabilities this close to 1 are taken to be 1.
+ROUNDING_TOLERANCE = 1e-9
+
+# Stations draw service times in smaller blocks than a single queue, as a network may have hundreds of them.
+STATION_BLOCK_SIZE = 512
+
+class Station:
+    '''
+    A queue of a Network: serviceDistribution, the number of servers and the capacity (None for no limit).
+    '''
+    def __init__(self, serviceDistribution, servers=1, capacity=None):
+        self.serviceDistribution = serviceDistribution
+        self.servers = servers
+        self.capacity = capacity
+        self.queue = deque() # Slots of the requests waiting to be served.
+        self.beingServed = [None]*servers
+        self.numBeingServed = 0
+        self.idleServers = range(servers - 1, -1, -1)
+        self.monitor = Monitor(servers=servers)
+        self.lostRequests = 0
+
+class Network:
+    def __init__(self, stations, externalArrivalRates, routing, simulationTime, seed=None):
+        self.stations = stations
+        self.simulationTime = simulationTime
+        self.time = 0
+        self.numEvents = 0
+        totalArrivalRate = sum(externalArrivalRates)
+        self.externalArrivalTimes = VariateStream(Exponential(totalArrivalRate), substream(seed, ARRIVAL_STREAM))
+        self.uniforms = VariateStream(Uniform(), substream(seed, ROUTING_STREAM))
+        for i, station in enumerate(stations):
+            station.serviceTimes = VariateStream(station.serviceDistribution, substream(seed, FIRST_STATION_STREAM + i),
+                                                 STATION_BLOCK_SIZE)
+        # Stations and cumulative probabilities of external arrivals, and of the next station of a request leaving
+        # each station. Only possible destinations are kept, so a sparse routing matrix gives short lists.
+        self.arrivalChoices = self.makeChoices([rate/totalArrivalRate for rate in externalArrivalRates])
+        self.routingChoices = [self.makeChoices(row) for row in numpy.asarray(routing, dtype=float).tolist()]
+        # Server k of the network is server k - firstServer of station serverStations[k].
+        self.serverStations = []
+        for i, station in enumerate(stations):
+            station.firstServer = len(self.serverStations)
+            self.serverStations.extend([i]*station.servers)
+        # Slots of the requests in the network. birthTimes holds the time a request arrived at its current station
+        # and entryTimes the time it entered the network.
+        self.requests = RequestStore(extraFields=("entryTimes",))
+        self.schedule = HeapCalendar()
+        self.sojournTimeStatistics = RunningStatistics()
+        self.sojournTimeQuantiles = QuantileSketch()
+        self.sojournTimeBatches = BatchMeans()
+        self.lostRequests = 0
+
+    def makeChoices(self, probabilities):
+        '''
+        Returns (stations, cumulative probabilities) of the stations with a positive probability.
+        '''
+        destinations = [i for i, p in enumerate(probabilities) if p > 0]
+        cumulative = numpy.cumsum([probabilities[i] for i in destinations]).tolist()
+        if cumulative and cumulative[-1] > 1 - ROUNDING_TOLERANCE:
+            # Probabilities that add up to 1 must not leave room for rounding errors.
+            cumulative[-1] = INFINITY
+        return destinations, cumulative
+
+    def choose(self, choices):
+        '''
+        Returns a station drawn from choices (see makeChoices), or None for leaving the network.
+        '''
+        destinations, cumulative = choices
+        index = bisect_right(cumulative, self.uniforms.next())
+        if index == len(destinations):
+            return None
+        return destinations[index]
+
+    def runSimulation(self, monitorStartingTime):
+        self.monitorStartingTime = monitorStartingTime
+        for station in self.stations:
+            station.monitor.startTimeWeightedStatistics(monitorStartingTime)
+        self.schedule.schedule(self.externalArrivalTimes.next(), EXTERNAL_ARRIVAL)
+        pop = self.schedule.pop
+        numEvents = self.numEvents
+        while self.time < self.simulationTime:
+            self.time, event = pop()
+            if event == EXTERNAL_ARRIVAL:
+                self.executeExternalArrival()
+            else:
+                self.executeDeath(event - DEATH)
+            numEvents += 1
+        self.numEvents = numEvents
+        observedTime = max(self.time - monitorStartingTime, 0.0)
+        for station in self.stations:
+            partialBusyTimes = [0.0]*station.servers
+            for server, slot in enumerate(station.beingServed):
+                if slot is not None:
+                    serviceTime = self.requests.serviceTimes.item(slot)
+                    partialBusyTimes[server] = max(self.time - max(serviceTime, monitorStartingTime), 0.0)
+            station.monitor.setObservedTime(observedTime, partialBusyTimes)
+            station.monitor.numEvents = numEvents
+
+    def executeExternalArrival(self):
+        self.schedule.schedule(self.time + self.externalArrivalTimes.next(), EXTERNAL_ARRIVAL)
+        slot = self.requests.add(self.time)
+        self.requests.entryTimes[slot] = self.time
+        self.enterStation(self.choose(self.arrivalChoices), slot)
+
+    def enterStation(self, stationIndex, slot):
+        station = self.stations[stationIndex]
+        monitoring = self.time > self.monitorStartingTime
+        if station.capacity is not None:
+            if monitoring:
+                station.monitor.incrementAttemptedRequests()
+            if len(station.queue) + station.numBeingServed == station.capacity:
+                if monitoring:
+                    station.monitor.incrementRejectedRequests()
+                    station.lostRequests += 1
+                    self.lostRequests += 1
+                self.requests.release(slot)
+                return
+        self.requests.birthTimes[slot] = self.time
+        station.queue.append(slot)
+        if station.idleServers:
+            self.startService(station, station.idleServers.pop())
+        self.recordState(station)
+
+    def startService(self, station, server):
+        slot = station.queue.popleft()
+        self.requests.serviceTimes[slot] = self.time
+        station.beingServed[server] = slot
+        station.numBeingServed += 1
+        self.schedule.schedule(self.time + station.serviceTimes.next(), DEATH + station.firstServer + server)
+
+    def executeDeath(self, networkServer):
+        stationIndex = self.serverStations[networkServer]
+        station = self.stations[stationIndex]
+        server = networkServer - station.firstServer
+        slot = station.beingServed[server]
+        requests = self.requests
+        if self.time > self.monitorStartingTime:
+            serviceTime = requests.serviceTimes.item(slot)
+            station.monitor.recordDeadTimes(requests.birthTimes.item(slot), serviceTime, self.time)
+            station.monitor.recordBusyTime(server, self.time - max(serviceTime, self.monitorStartingTime))
+        station.beingServed[server] = None
+        station.numBeingServed -= 1
+        if station.queue:
+            self.startService(station, server)
+        else:
+            station.idleServers.append(server)
+        self.recordState(station)
+
+        destination = self.choose(self.routingChoices[stationIndex])
+        if destination is None:
+            if self.time > self.monitorStartingTime:
+                sojournTime = self.time - requests.entryTimes.item(slot)
+                self.sojournTimeStatistics.add(sojournTime)
+                self.sojournTimeQuantiles.add(sojournTime)
+                self.sojournTimeBatches.add(sojournTime)
+            requests.release(slot)
+        else:
+            self.enterStation(destination, slot)
+
+    def recordState(self, station):
+        requestsWaiting = len(station.queue)
+        station.monitor.recordStateChange(self.time, requestsWaiting, requestsWaiting + station.numBeingServed)
+
+    def getSummary(self):
+        '''
+        Returns the end-to-end report quantities as a dictionary. The report quantities of station i are
+        stations[i].monitor.getSummary(). Like those of a Monitor, quantities are None when nothing they average was
+        monitored.
+        '''
+        observedTime = max(self.time - self.monitorStartingTime, 0.0)
+        numLeaving = self.sojournTimeStatistics.count
+        requestsInSystem = [station.monitor.getMeanOfRequestsInSystem() for station in self.stations]
+        summary = {"averageSojournTime": self.sojournTimeStatistics.getMean() if numLeaving else None,
+                   "standardDeviationOfSojournTime":
+                       self.sojournTimeStatistics.getStandardDeviation() if numLeaving else None,
+                   "throughput": numLeaving/observedTime if observedTime > 0 else None,
+                   "averageRequestsInNetwork": None if None in requestsInSystem else sum(requestsInSystem),
+                   "lossProbability": self.lostRequests/(self.lostRequests + numLeaving)
+                                      if self.lostRequests + numLeaving else None}
+        for q, sojournTime in zip(REPORTED_QUANTILES, self.sojournTimeQuantiles.getQuantiles()):
+            summary["sojournTimePercentile" + str(q*100)] = sojournTime
+        return summary
+
+    def printReport(self):
+        summary = self.getSummary()
+        print "Number of Requests Leaving the Network: " + str(self.sojournTimeStatistics.count)
+        print "Average Sojourn Time: " + str(summary["averageSojournTime"])
+        print "Standard Deviation of Sojourn Time: " + str(summary["standardDeviationOfSojournTime"])
+        print "Sojourn Time Percentiles: " + ", ".join("p%s = %s" % (q*100, value) for q, value in
+                                                       zip(REPORTED_QUANTILES, self.sojournTimeQuantiles.getQuantiles()))
+        interval = self.sojournTimeBatches.getConfidenceInterval()
+        if interval is not None:
+            mean, halfWidth, numBatches = interval
+            print "Sojourn Time 95% Confidence Interval (" + str(numBatches) + " batch means): " + str(mean) + " +/- " + str(halfWidth)
+        print "Throughput: " + str(summary["throughput"])
+        print "Average Requests In Network: " + str(summary["averageRequestsInNetwork"])
+        if self.lostRequests > 0:
+            print "Loss Probability: " + str(summary["lossProbability"])
+        print
+        print "Station  Arrival Rate  Utilization  Requests In System  Queuing Time"
+        observedTime = max(self.time - self.monitorStartingTime, 0.0)
+        for i, station in enumerate(self.stations):
+            monitor = station.monitor
+            arrivalRate = monitor.numRequests/observedTime if observedTime > 0 else None
+            print "%7d  %12s  %11s  %18s  %12s" % (i, formatWindowValue(arrivalRate),
+                                                  formatWindowValue(monitor.getAverageServerUtilization()),
+                                                  formatWindowValue(monitor.getMeanOfRequestsInSystem()),
+                                                  formatWindowValue(monitor.getMeanOfQueuingTime()))
+
+if __name__ == "__main__":
+    # A web tier feeding an application tier, which calls a database and sometimes sends requests back for retries.
+    stations = [Station(Exponential(1/0.01), servers=2), Station(Exponential(1/0.009)), Station(Exponential(1/0.005))]
+    routing = [[0, 1.0, 0], [0.1, 0, 0.5], [0, 0.6, 0]]
+    network = Network(stations, [50, 0, 0], routing, 1000, seed=1)
+    network.runSimulation(100)
+    network.printReport()
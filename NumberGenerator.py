@@ -4,12 +4,19 @@ NumberGenerator
 Created on Feb 14, 2013
 @author: adrielklein
 '''
+from __future__ import division #Required for floating point division.
 import math
 import random
 import numpy
 
-def exponentialValue(Lambda):
+def exponentialValue(Lambda, antithetic=False):
     y = random.uniform(0,1)
+    # The antithetic value takes the log of y itself, so y must not be 0.
+    while y == 0:
+        y = random.uniform(0,1)
+    if antithetic:
+        # The antithetic value of the same uniform draw.
+        y = 1 - y
     return -math.log(1-y)/Lambda
 '''
 Returns a random value according to standard normal distribution.
@@ -29,6 +36,168 @@ Returns a random value according to a normal distribution with mean U and standa
 '''
 def Grand(U,S):
     return Zrand()*S + U
-    
-    
-    
\ No newline at end of file
+
+'''
+Variate streams.
+
+Calling exponentialValue or Grand once per event pays for a Python level uniform draw, a log and (for Zrand) 30 uniform
+draws per value. A VariateStream instead draws a large block of values from a distribution with NumPy and hands them
+out one at a time. Every stream owns a numpy RandomState, and substream gives each event type (arrivals, services,
+monitor sampling) its own independent RandomState derived from a single seed, so a run is reproducible from its seed.
+
+Distributions with an inverse method generate their values by inversion, generate(randomState, size) giving the same
+values as inverse(randomState.random_sample(size)). An antithetic VariateStream hands out inverse(1 - u) for the same
+uniform values u instead, so a run with antithetic streams is negatively correlated with the run of the same seed.
+'''
+ARRIVAL_STREAM = 0
+SERVICE_STREAM = 1
+MONITOR_STREAM = 2
+CLASS_STREAM = 3
+
+# The smallest positive value of random_sample.
+SMALLEST_UNIFORM = 2.0**-53
+
+# Number of values a VariateStream draws at a time.
+DEFAULT_BLOCK_SIZE = 4096
+
+def substream(seed, streamId):
+    '''
+    Returns the RandomState for substream streamId of seed. Substreams of the same seed are seeded with different keys
+    and are therefore independent. If seed is None the RandomState is seeded from the operating system.
+    '''
+    if seed is None:
+        return numpy.random.RandomState()
+    return numpy.random.RandomState([seed, streamId])
+
+class Exponential:
+    def __init__(self, rate):
+        self.rate = rate
+    def mean(self):
+        return 1/self.rate
+    def generate(self, randomState, size):
+        return randomState.standard_exponential(size)/self.rate
+    def inverse(self, uniforms):
+        # NumPy's standard_exponential is -log(1 - u) of its next uniform value u.
+        return -numpy.log(1 - uniforms)/self.rate
+
+class Deterministic:
+    def __init__(self, value):
+        self.value = value
+    def mean(self):
+        return self.value
+    def generate(self, randomState, size):
+        return numpy.full(size, self.value, dtype=float)
+    def inverse(self, uniforms):
+        return numpy.full(len(uniforms), self.value, dtype=float)
+
+class Normal:
+    '''
+    Normal distribution with mean U and standard deviation S, the vectorized equivalent of Grand.
+    '''
+    def __init__(self, U, S):
+        self.U = U
+        self.S = S
+    def mean(self):
+        return self.U
+    def generate(self, randomState, size):
+        return randomState.normal(self.U, self.S, size)
+
+class Erlang:
+    '''
+    Sum of k independent exponential values with the given rate.
+    '''
+    def __init__(self, k, rate):
+        self.k = k
+        self.rate = rate
+    def mean(self):
+        return self.k/self.rate
+    def generate(self, randomState, size):
+        return randomState.standard_gamma(self.k, size)/self.rate
+
+class Hyperexponential:
+    '''
+    Exponential value whose rate is rates[i] with probability probabilities[i].
+    '''
+    def __init__(self, probabilities, rates):
+        self.probabilities = list(probabilities)
+        self.rates = list(rates)
+    def mean(self):
+        return sum(p/rate for p, rate in zip(self.probabilities, self.rates))
+    def generate(self, randomState, size):
+        phases = randomState.choice(len(self.rates), size, p=self.probabilities)
+        return randomState.standard_exponential(size)/numpy.asarray(self.rates)[phases]
+
+class Lognormal:
+    '''
+    exp(N) where N is normal with mean mu and standard deviation sigma.
+    '''
+    def __init__(self, mu, sigma):
+        self.mu = mu
+        self.sigma = sigma
+    def mean(self):
+        return math.exp(self.mu + self.sigma**2/2)
+    def generate(self, randomState, size):
+        return randomState.lognormal(self.mu, self.sigma, size)
+
+class Uniform:
+    '''
+    Uniform distribution on [low, high).
+    '''
+    def __init__(self, low=0.0, high=1.0):
+        self.low = low
+        self.high = high
+    def mean(self):
+        return (self.low + self.high)/2
+    def generate(self, randomState, size):
+        return self.inverse(randomState.random_sample(size))
+    def inverse(self, uniforms):
+        return self.low + (self.high - self.low)*uniforms
+
+class VariateStream:
+    '''
+    Hands out values of distribution one at a time from blocks of blockSize values drawn with randomState.
+    stream.next() returns the next value. If antithetic is True the values are the antithetic ones, which needs a
+    distribution with an inverse method.
+    '''
+    def __init__(self, distribution, randomState, blockSize=DEFAULT_BLOCK_SIZE, antithetic=False):
+        if antithetic and not hasattr(distribution, "inverse"):
+            raise ValueError("Antithetic values need a distribution with an inverse distribution function")
+        self.distribution = distribution
+        self.randomState = randomState
+        self.blockSize = blockSize
+        self.antithetic = antithetic
+        self.values = []
+        self.position = 0
+        # Binding the generator's next method directly keeps the per value cost to a single call.
+        self.next = self.generateValues().next
+    def generateValues(self):
+        # First the values left in the current block, which are only there after setState.
+        for self.position, value in enumerate(self.values[self.position:], self.position + 1):
+            yield value
+        while True:
+            self.values = self.block(self.blockSize).tolist()
+            for self.position, value in enumerate(self.values, 1):
+                yield value
+    def getState(self):
+        '''
+        Returns (randomState state, current block, number of values of the block handed out), from which setState
+        continues the stream with the same values.
+        '''
+        return self.randomState.get_state(), self.values, self.position
+    def setState(self, state):
+        randomStateState, values, position = state
+        self.randomState.set_state(randomStateState)
+        self.values = list(values)
+        self.position = position
+        self.next = self.generateValues().next
+    def block(self, size):
+        '''
+        Returns a NumPy array of the next size values, for callers that consume whole blocks at once.
+        Values already buffered for next() are not part of the block.
+        '''
+        if self.antithetic:
+            # random_sample can return 0, whose complement 1 would be an infinite exponential value, so 0 is taken as
+            # the smallest value it returns otherwise, 2**-53.
+            uniforms = numpy.maximum(self.randomState.random_sample(size), SMALLEST_UNIFORM)
+            return self.distribution.inverse(1 - uniforms)
+        return self.distribution.generate(self.randomState, size)
@@ -0,0 +1,155 @@
+'''
+Profiling
+
+This module measures where a simulation spends its time. A Profiler attached to a Controller counts, and if timing
+is True times, every event by type and every call into the parts of the engine the events use:
+    calendar  - schedule and pop of the event calendar
+    variates  - next of the random number streams
+    requests  - add and release of the RequestStore
+    monitor   - the record and increment methods of the Monitor
+    run       - the whole of resumeSimulation
+
+    profiler = Profiler(timing=True)
+    profiler.attach(controller)
+    controller.runSimulation(100)
+    profiler.detach(controller)
+    profiler.printReport()
+
+Attaching replaces the handlers, the calendar, the streams, the RequestStore and the Monitor of the Controller with
+instrumented versions, and detaching puts the originals back, so a Controller without a Profiler runs exactly as
+fast as before. Counting costs one extra Python call per instrumented call and timing two clock readings more, which
+inflates the measured times of cheap calls such as next; the counts are exact. A Controller must be detached before
+it is checkpointed.
+'''
+from __future__ import division #Required for floating point division.
+import timeit
+from EventCalendar import BIRTH, MONITOR
+
+# Streams of a Controller that are instrumented if it has them.
+STREAM_NAMES = ("interarrivalTimes", "serviceTimes", "monitorIntervals", "classStream")
+
+class Instrumented(object):
+    '''
+    Stands in for target: the instrumented methods are its own attributes and everything else is read from and written
+    to target.
+    '''
+    def __init__(self, target, methods):
+        self.__dict__["target"] = target
+        self.__dict__.update(methods)
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+    def __setattr__(self, name, value):
+        setattr(self.target, name, value)
+    def __len__(self):
+        return len(self.target)
+    def __iter__(self):
+        return iter(self.target)
+
+class Profiler:
+    '''
+    Counts (and times, if timing is True) the events and phases of the Controllers it is attached to. Counts and times
+    are kept by name, such as "event.birth" or "calendar.pop", and add up over runs and Controllers.
+    '''
+    def __init__(self, timing=False, clock=timeit.default_timer):
+        self.timing = timing
+        self.clock = clock
+        self.counts = {}
+        self.times = {}
+
+    def instrument(self, function, name):
+        '''
+        Returns function wrapped to count (and time) its calls under name. The wrapper's function attribute is
+        function.
+        '''
+        counts = self.counts
+        times = self.times
+        counts.setdefault(name, 0)
+        times.setdefault(name, 0.0)
+        if not self.timing:
+            def counted(*args):
+                counts[name] += 1
+                return function(*args)
+            counted.function = function
+            return counted
+        clock = self.clock
+        def timed(*args):
+            start = clock()
+            result = function(*args)
+            times[name] += clock() - start
+            counts[name] += 1
+            return result
+        timed.function = function
+        return timed
+
+    def instrumentObject(self, target, phase, methodNames):
+        return Instrumented(target, dict((methodName, self.instrument(getattr(target, methodName),
+                                                                      phase + "." + methodName))
+                                         for methodName in methodNames))
+
+    def attach(self, controller):
+        '''
+        Instruments controller. Attach before running the simulation.
+        '''
+        controller.handlers = [self.instrument(handler, "event." + getEventName(event)) if handler is not None
+                               else None for event, handler in enumerate(controller.handlers)]
+        controller.schedule = self.instrumentObject(controller.schedule, "calendar", ("schedule", "pop"))
+        for name in STREAM_NAMES:
+            if hasattr(controller, name):
+                setattr(controller, name, self.instrumentObject(getattr(controller, name), "variates", ("next",)))
+        controller.requests = self.instrumentObject(controller.requests, "requests", ("add", "release"))
+        monitor = controller.monitor
+        controller.monitor = self.instrumentObject(monitor, "monitor",
+                                                   [name for name in dir(monitor)
+                                                    if name.startswith("record") or name.startswith("increment")])
+        # An instance attribute, so runSimulation calls it too.
+        controller.resumeSimulation = self.instrument(controller.resumeSimulation, "run")
+
+    def detach(self, controller):
+        '''
+        Puts back the handlers and objects attach replaced.
+        '''
+        controller.handlers = [None if handler is None else handler.function for handler in controller.handlers]
+        for name in ("schedule", "requests", "monitor") + STREAM_NAMES:
+            value = getattr(controller, name, None)
+            if isinstance(value, Instrumented):
+                setattr(controller, name, value.target)
+        del controller.resumeSimulation
+
+    def getReport(self):
+        '''
+        Returns a list of (name, calls, seconds, microseconds per call) tuples sorted by name. The seconds are 0 without
+        timing. The time of an event includes the phases it calls, except calendar.pop, which the loop calls.
+        '''
+        report = []
+        for name in sorted(self.counts):
+            calls = self.counts[name]
+            seconds = self.times[name]
+            report.append((name, calls, seconds, seconds/calls*1e6 if calls else 0.0))
+        return report
+
+    def getEventsPerSecond(self):
+        '''
+        Returns the number of events per second of the profiled runs, or None without timing.
+        '''
+        if not self.timing or not self.times.get("run"):
+            return None
+        return sum(calls for name, calls in self.counts.items() if name.startswith("event."))/self.times["run"]
+
+    def printReport(self):
+        runTime = self.times.get("run", 0.0)
+        print "%-32s %12s %10s %10s %7s" % ("", "Calls", "Seconds", "us/Call", "% Run")
+        for name, calls, seconds, microseconds in self.getReport():
+            if calls == 0:
+                continue
+            share = "%6.1f%%" % (seconds/runTime*100) if runTime else ""
+            print "%-32s %12d %10.3f %10.3f %7s" % (name, calls, seconds, microseconds, share)
+        eventsPerSecond = self.getEventsPerSecond()
+        if eventsPerSecond is not None:
+            print "Events per Second: " + str(eventsPerSecond)
+
+def getEventName(event):
+    if event == BIRTH:
+        return "birth"
+    if event == MONITOR:
+        return "monitor"
+    return "death"
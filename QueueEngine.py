@@ -0,0 +1,792 @@
+'''
+QueueEngine
+
+This module defines a general queuing system simulator. Three classes are defined in this module: Request, Controller, and Monitor.
+
+The Request object represents a request which enters the system (gets born), waits in a queue, gets served, and leaves (dies).
+Each request object has a record of its birth time, time at which it was serviced, and time at which it died.
+The Controller keeps the times of the requests in the system in a RequestStore, which holds them in NumPy arrays and
+reuses the slots of dead requests, and RequestStore.getRequest gives a view of a stored request with the getters of a Request.
+
+The Controller object is what manages the requests. The controller puts new requests into the queue and services each request
+once it is at the front of the queue and a server is free.
+
+The Monitor object keeps statistics about the queuing system. The monitor gets information about the system when the controller
+sends it a snapshot of the system, a dead request, or (in time weighted mode) every change in the number of requests.
+
+The Controller is configured by its parameters rather than by copying it:
+    arrivalDistribution - distribution of the time between births (see NumberGenerator)
+    serviceDistribution - distribution of the service time of a request
+    capacity            - the largest number of requests that can be in the system, None for no limit.
+                          Requests born while the system is full are rejected.
+    servers             - the number of requests that can be served at the same time.
+    antithetic          - True to draw the antithetic interarrival and service times of the seed (see NumberGenerator).
+    trace               - a Trace.TraceSink to write the times of every request to, None for no trace.
+    discipline          - the order waiting requests are served in (see Disciplines), None for first come first served.
+    classProbabilities  - the probability of each class of requests, None for a single class.
+    windowLength        - the length of the windows the Monitor keeps transient statistics of (see
+                          Monitor.getWindowSeries), which needs timeWeighted. None for no windows.
+So M/M/1 is Controller(Exponential(arrivalRate), Exponential(serviceRate), ...), M/D/1/K is
+Controller(Exponential(arrivalRate), Deterministic(serviceTime), ..., capacity=K), and M/G/1 and G/G/1 use any other
+distributions. The MM1Queue, MM1KQueue and MD1KQueue modules are such configurations.
+
+By default incoming requests are served on a first-come first-serve basis. Nothing is simulated when this module is imported.
+'''
+from __future__ import division #Required for floating point division.
+from math import sqrt # Required to find variance
+from bisect import bisect_right
+from collections import deque # Required for the queue of waiting requests
+import numpy
+from EventCalendar import NextEventCalendar, HeapCalendar, BIRTH, MONITOR, DEATH, INFINITY # Required to schedule events
+from Statistics import RunningStatistics, TimeWeightedStatistics, WindowedStatistics, QuantileSketch, BatchMeans, WarmupDetector, REPORTED_QUANTILES, studentTQuantile # Required to keep statistics in constant memory
+from NumberGenerator import Exponential, Uniform, VariateStream, substream, ARRIVAL_STREAM, SERVICE_STREAM, MONITOR_STREAM, CLASS_STREAM # Required to generate random numbers
+
+# Systems with at most this many servers keep their events in a NextEventCalendar by default, larger ones in a heap.
+MAX_SERVERS_FOR_NEXT_EVENT_CALENDAR = 8
+
+# In sequential mode (see Controller.runSimulation) the precision is checked every this many events,
+MAX_EVENTS_BETWEEN_PRECISION_CHECKS = 10000
+# and only once the confidence interval is made of this many batch means.
+MIN_BATCHES_FOR_PRECISION = 30
+
+class Controller:
+    def __init__(self, arrivalDistribution, serviceDistribution, simulationTime, capacity=None, servers=1, seed=None,
+                 keepSamples=False, timeWeighted=False, calendar=None, antithetic=False, trace=None, discipline=None,
+                 classProbabilities=None, windowLength=None):
+        self.arrivalRate = 1/arrivalDistribution.mean()
+        self.serviceRate = 1/serviceDistribution.mean()
+        self.simulationTime = simulationTime
+        self.capacity = capacity
+        self.servers = servers
+        # Each event type draws from its own independent stream of the seed. Runs with the same seed and antithetic
+        # set to True and False are an antithetic pair (see NumberGenerator).
+        self.interarrivalTimes = VariateStream(arrivalDistribution, substream(seed, ARRIVAL_STREAM), antithetic=antithetic)
+        self.serviceTimes = VariateStream(serviceDistribution, substream(seed, SERVICE_STREAM), antithetic=antithetic)
+        self.monitorIntervals = VariateStream(Exponential(self.arrivalRate/2), substream(seed, MONITOR_STREAM))
+        self.time = 0
+        self.numEvents = 0 # Events executed so far.
+        # A request is of class i with probability classProbabilities[i]. Classes are numbered from 0.
+        self.numClasses = 1
+        extraFields = []
+        if classProbabilities is None and getattr(discipline, "needsClasses", False):
+            raise ValueError(discipline.__name__ + " needs classProbabilities")
+        if classProbabilities is not None:
+            self.numClasses = len(classProbabilities)
+            self.classStream = VariateStream(Uniform(), substream(seed, CLASS_STREAM))
+            self.cumulativeClassProbabilities = numpy.cumsum(classProbabilities[:-1]).tolist()
+            extraFields.append("classes")
+        # Disciplines that order requests by their service time need it when the request is queued, so it is drawn
+        # at birth and kept in the RequestStore.
+        self.demandsAtBirth = getattr(discipline, "needsServiceDemands", False)
+        if self.demandsAtBirth:
+            extraFields.append("serviceDemands")
+        # True if births have to draw a class or a service demand.
+        self.labelsRequests = bool(extraFields)
+        # The times of the requests in the system are kept in a RequestStore and requests are referred to by their
+        # slot in it.
+        self.requests = RequestStore(extraFields=extraFields)
+        # A queue of the slots of the requests waiting to be served. discipline is a class with the append, popleft
+        # and len methods of a deque, built from the RequestStore and number of classes (see Disciplines).
+        # The default is a deque, first come first served.
+        if discipline is None:
+            self.queue = deque()
+        else:
+            self.queue = discipline(self.requests, self.numClasses)
+        # beingServed[i] is the slot of the request being served by server i. None if server i is not serving a request.
+        self.beingServed = [None]*servers
+        self.numBeingServed = 0
+        # Stack of the servers that are not serving a request, so a free server is found in constant time.
+        # Lower numbered servers are on top and are used first.
+        self.idleServers = range(servers - 1, -1, -1)
+        if windowLength is not None and not timeWeighted:
+            raise ValueError("Windowed statistics need timeWeighted")
+        self.monitor = Monitor(keepSamples, servers, self.numClasses, windowLength) # Collects information about the state of the queue.
+        # If timeWeighted is True the monitor follows every change in the number of requests instead of taking
+        # snapshots at random times, and no Monitor events are scheduled.
+        self.timeWeighted = timeWeighted
+        # A Trace.TraceSink that receives the times of every dead or rejected request, or None.
+        self.trace = trace
+        # Schedule is an event calendar (see EventCalendar) of BIRTH, MONITOR and DEATH + server events.
+        # calendar is the class of calendar to use.
+        numEvents = DEATH + servers
+        if calendar is None:
+            if servers <= MAX_SERVERS_FOR_NEXT_EVENT_CALENDAR:
+                calendar = NextEventCalendar
+            else:
+                calendar = HeapCalendar
+        self.schedule = calendar(numEvents)
+        # handlers[event] executes event.
+        self.handlers = [None]*numEvents
+        self.handlers[BIRTH] = self.executeBirth
+        self.handlers[MONITOR] = self.executeMonitor
+        self.handlers[DEATH:] = [self.executeDeath]*servers
+
+    def runSimulation(self, monitorStartingTime=None, relativePrecision=None, confidence=0.95, maxEvents=None):
+        '''
+        Runs the simulation until simulationTime and records statistics from monitorStartingTime on. If
+        monitorStartingTime is None, the end of the warm-up period is detected from the queuing times of the dead
+        requests with MSER-5 (see Statistics.WarmupDetector) and monitoring starts when it is detected. If it is not
+        detected by half the simulationTime, monitoring starts then.
+
+        If relativePrecision is given the simulation stops as soon as the batch means confidence interval of the mean
+        queuing time has a half width of at most relativePrecision times the mean, e.g. 0.01 for +/-1% at the given
+        confidence. simulationTime and maxEvents (None for no limit) then cap the length of the run.
+        '''
+        self.startSimulation(monitorStartingTime)
+        self.resumeSimulation(relativePrecision, confidence, maxEvents)
+
+    def startSimulation(self, monitorStartingTime=None):
+        '''
+        Schedules the first events of a simulation without executing any (see runSimulation).
+        '''
+        #Add first Birth event to schedule
+        self.schedule.schedule(self.interarrivalTimes.next(), BIRTH)
+        if monitorStartingTime is None:
+            self.monitorStartingTime = INFINITY
+            self.warmupDetector = WarmupDetector(deadline=self.simulationTime/2)
+            if self.timeWeighted:
+                # Nothing is counted until startMonitoring restarts the statistics.
+                self.monitor.startTimeWeightedStatistics(INFINITY)
+        else:
+            self.startMonitoring(monitorStartingTime)
+
+    def resumeSimulation(self, relativePrecision=None, confidence=0.95, maxEvents=None):
+        '''
+        Executes events until simulationTime, or until the precision is reached (see runSimulation). A simulation that
+        stopped, for example one restored from a checkpoint (see Checkpoint), continues where it stopped, so
+        raising simulationTime and resuming gives the same events as one longer run. maxEvents counts the events
+        executed by this call.
+        '''
+        pop = self.schedule.pop
+        handlers = self.handlers
+        simulationTime = self.simulationTime
+        numEvents = self.numEvents
+        if relativePrecision is None and maxEvents is None:
+            while self.time < simulationTime:
+                #Get the next event from the schedule
+                self.time, event = pop()
+                handlers[event](event)
+                numEvents += 1
+        else:
+            maxEvents = INFINITY if maxEvents is None else numEvents + maxEvents
+            while self.time < simulationTime and numEvents < maxEvents:
+                checkpoint = min(numEvents + MAX_EVENTS_BETWEEN_PRECISION_CHECKS, maxEvents)
+                while self.time < simulationTime and numEvents < checkpoint:
+                    self.time, event = pop()
+                    handlers[event](event)
+                    numEvents += 1
+                if relativePrecision is not None and self.monitor.hasRelativePrecision(relativePrecision, confidence):
+                    break
+            self.monitor.setTargetPrecision(relativePrecision, confidence)
+        self.numEvents = numEvents
+        self.finishRun()
+
+    def finishRun(self):
+        '''
+        Tells the Monitor the number of events and the length of the monitored period when a run stops.
+        '''
+        self.monitor.numEvents = self.numEvents
+        if self.timeWeighted:
+            # Close the time averages at the current time, as no state change ends the last constant stretch if
+            # the last event was a rejected birth.
+            self.recordState()
+        # Count the part of the services still in progress that falls in the monitored period.
+        partialBusyTimes = [0.0]*self.servers
+        for server, slot in enumerate(self.beingServed):
+            if slot != None:
+                serviceTime = self.requests.serviceTimes.item(slot)
+                partialBusyTimes[server] = max(self.time - max(serviceTime, self.monitorStartingTime), 0.0)
+        self.monitor.setObservedTime(max(self.time - self.monitorStartingTime, 0.0), partialBusyTimes)
+
+    def startMonitoring(self, monitorStartingTime):
+        '''
+        Starts recording statistics at monitorStartingTime, which is the current time if the warm-up period was
+        detected automatically.
+        '''
+        self.monitorStartingTime = monitorStartingTime
+        self.warmupDetector = None
+        if self.timeWeighted:
+            self.monitor.startTimeWeightedStatistics(monitorStartingTime)
+            self.recordState()
+        else:
+            #Add first Monitor event to schedule.
+            self.schedule.schedule(monitorStartingTime, MONITOR)
+
+    def detectWarmup(self, queuingTime):
+        '''
+        Adds the queuing time of a request that just died to the warm-up detector and starts monitoring if the end of
+        the warm-up period is detected.
+        '''
+        if self.warmupDetector.add(queuingTime, self.time):
+            self.monitor.setWarmup(self.time, self.warmupDetector)
+            self.startMonitoring(self.time)
+
+    def executeEvent(self, event):
+        self.handlers[event](event)
+
+    def executeBirth(self, event):
+        #Schedule next birth
+        self.schedule.schedule(self.time + self.interarrivalTimes.next(), BIRTH)
+        if self.capacity is not None:
+            if self.time > self.monitorStartingTime:
+                self.monitor.incrementAttemptedRequests()
+            if len(self.queue) + self.numBeingServed == self.capacity:
+                if self.time > self.monitorStartingTime:
+                    self.monitor.incrementRejectedRequests()
+                if self.trace is not None:
+                    self.trace.recordRejection(self.time)
+                return
+        #Create new request and enqueue
+        slot = self.requests.add(self.time)
+        if self.labelsRequests:
+            self.labelRequest(slot)
+        self.queue.append(slot)
+        # If a server is free, dequeue the request, start serving request, and schedule death
+        if self.idleServers:
+            self.startService(self.idleServers.pop())
+        if self.timeWeighted:
+            self.recordState()
+
+    def executeDeath(self, event):
+        server = event - DEATH
+        slot = self.beingServed[server]
+        requests = self.requests
+        requests.deathTimes[slot] = self.time
+        if self.time > self.monitorStartingTime:
+            serviceTime = requests.serviceTimes.item(slot)
+            self.monitor.recordDeadTimes(requests.birthTimes.item(slot), serviceTime, self.time)
+            self.monitor.recordBusyTime(server, self.time - max(serviceTime, self.monitorStartingTime))
+            if self.numClasses > 1:
+                self.monitor.recordClassTimes(int(requests.classes.item(slot)), requests.birthTimes.item(slot),
+                                              serviceTime, self.time)
+        elif self.warmupDetector is not None:
+            self.detectWarmup(self.time - requests.birthTimes.item(slot))
+        if self.trace is not None:
+            self.trace.recordRequest(requests.birthTimes.item(slot), requests.serviceTimes.item(slot), self.time)
+        requests.release(slot)
+        self.beingServed[server] = None
+        self.numBeingServed -= 1
+        # Now the server is free. If queue is empty, the server becomes idle. Otherwise serve next request.
+        if len(self.queue) != 0:
+            self.startService(server)
+        else:
+            self.idleServers.append(server)
+        if self.timeWeighted:
+            self.recordState()
+
+    def executeMonitor(self, event):
+        requestsWaiting = len(self.queue)
+        self.monitor.recordSnapshot(requestsWaiting, requestsWaiting + self.numBeingServed)
+        #Schedule next monitor event.
+        self.schedule.schedule(self.time + self.monitorIntervals.next(), MONITOR)
+
+    def startService(self, server):
+        slot = self.queue.popleft()
+        self.requests.serviceTimes[slot] = self.time
+        self.beingServed[server] = slot
+        self.numBeingServed += 1
+        #Schedule a death
+        if self.demandsAtBirth:
+            self.schedule.schedule(self.time + self.requests.serviceDemands.item(slot), DEATH + server)
+        else:
+            self.schedule.schedule(self.time + self.serviceTimes.next(), DEATH + server)
+
+    def labelRequest(self, slot):
+        '''
+        Draws the class and, if the discipline needs it, the service time of the request born in slot.
+        '''
+        if self.numClasses > 1:
+            self.requests.classes[slot] = bisect_right(self.cumulativeClassProbabilities, self.classStream.next())
+        if self.demandsAtBirth:
+            self.requests.serviceDemands[slot] = self.serviceTimes.next()
+
+    def recordState(self):
+        requestsWaiting = len(self.queue)
+        self.monitor.recordStateChange(self.time, requestsWaiting, requestsWaiting + self.numBeingServed)
+
+class RequestStore:
+    '''
+    Keeps the birth, service and death times of the requests in the system in NumPy arrays (a struct of arrays)
+    instead of one object per request. A request is identified by its slot, the index of its times in the arrays.
+    Slots of dead requests are released and reused, so the memory used only depends on the largest number of requests
+    in the system at once. The arrays double in size when all slots are in use.
+
+    extraFields names further arrays to keep per request, such as the time a request entered a network (see Network).
+    '''
+    FIELDS = ("birthTimes", "serviceTimes", "deathTimes")
+
+    def __init__(self, initialCapacity=1024, extraFields=()):
+        self.fields = self.FIELDS + tuple(extraFields)
+        for field in self.fields:
+            setattr(self, field, numpy.zeros(initialCapacity))
+        # Stack of unused slots, lowest slot on top.
+        self.freeSlots = range(initialCapacity - 1, -1, -1)
+    def add(self, birthTime):
+        '''
+        Stores a new request born at birthTime and returns its slot.
+        '''
+        if not self.freeSlots:
+            self.grow()
+        slot = self.freeSlots.pop()
+        self.birthTimes[slot] = birthTime
+        return slot
+    def release(self, slot):
+        self.freeSlots.append(slot)
+    def grow(self):
+        capacity = len(self.birthTimes)
+        for field in self.fields:
+            setattr(self, field, numpy.concatenate([getattr(self, field), numpy.zeros(capacity)]))
+        self.freeSlots.extend(range(2*capacity - 1, capacity - 1, -1))
+    def getRequest(self, slot):
+        '''
+        Returns a RequestView of the request in slot, which has the getters of a Request.
+        '''
+        return RequestView(self, slot)
+    def __len__(self):
+        return len(self.birthTimes) - len(self.freeSlots)
+
+class RequestView(object):
+    __slots__ = ("store", "slot")
+    def __init__(self, store, slot):
+        self.store = store
+        self.slot = slot
+    @property
+    def birthTime(self):
+        return self.store.birthTimes.item(self.slot)
+    @property
+    def serviceTime(self):
+        return self.store.serviceTimes.item(self.slot)
+    @property
+    def deathTime(self):
+        return self.store.deathTimes.item(self.slot)
+    def setServiceTime(self, serviceTime):
+        self.store.serviceTimes[self.slot] = serviceTime
+    def setDeathTime(self, deathTime):
+        self.store.deathTimes[self.slot] = deathTime
+    def getWaitingTime(self):
+        return self.serviceTime - self.birthTime
+    def getQueuingTime(self):
+        return self.deathTime - self.birthTime
+
+class Request(object):
+    __slots__ = ("birthTime", "serviceTime", "deathTime")
+    def __init__(self, birthTime):
+        self.birthTime = birthTime
+    def setServiceTime(self, serviceTime):
+        self.serviceTime = serviceTime
+    def setDeathTime(self, deathTime):
+        self.deathTime = deathTime
+    def getWaitingTime(self):
+        return self.serviceTime - self.birthTime
+    def getQueuingTime(self):
+        return self.deathTime - self.birthTime
+
+class Monitor:
+    '''
+    Keeps running statistics of the snapshots and dead requests it is sent, so its memory does not grow with the
+    length of the simulation. If keepSamples is True the individual values are also kept in the requestsWaiting,
+    requestsInSystem, waitingTimes and queuingTimes lists.
+
+    Instead of snapshots the Monitor can be sent every change in the number of requests (see
+    startTimeWeightedStatistics), in which case the averages are exact time averages and the Monitor also knows
+    the fraction of time the system held k requests.
+
+    Attempted and rejected requests are only counted for systems with a finite capacity. With more than one class of
+    requests the waiting and queuing times of each class are also kept (see recordClassTimes). Given a windowLength, a
+    time weighted Monitor also keeps the averages of every window of that length (see getWindowSeries).
+    '''
+    def __init__(self, keepSamples=False, servers=1, numClasses=1, windowLength=None):
+        self.numSnapshots = 0
+        self.numRequests = 0
+        self.numWaitingRequests = 0 # Dead requests that had to wait before being served.
+        self.serverBusyTimes = [0.0]*servers
+        self.partialBusyTimes = [0.0]*servers
+        self.observedTime = 0.0
+        # Sum of the service times of the dead requests, a control variate (see VarianceReduction).
+        self.totalServiceTime = 0.0
+        # Batch means of the queuing times, for confidence intervals. They are not merged by merge.
+        self.queuingTimeBatches = BatchMeans()
+        # Set by setWarmup if the end of the warm-up period was detected automatically.
+        self.warmupCutoffTime = None
+        self.warmupDetectionTime = None
+        self.warmupObservations = None
+        # Number of events the Controller executed, and the precision asked for in sequential mode.
+        self.numEvents = 0
+        self.targetPrecision = None
+        self.confidence = 0.95
+        self.attemptedRequests = 0
+        self.rejectedRequests = 0
+        self.requestsWaitingStatistics = RunningStatistics()
+        self.requestsInSystemStatistics = RunningStatistics()
+        self.waitingTimeStatistics = RunningStatistics()
+        self.queuingTimeStatistics = RunningStatistics()
+        # Tail percentiles of the waiting and queuing times, within 1% of the true values.
+        self.waitingTimeQuantiles = QuantileSketch()
+        self.queuingTimeQuantiles = QuantileSketch()
+        self.numClasses = numClasses
+        self.classWaitingTimeStatistics = [RunningStatistics() for i in xrange(numClasses)]
+        self.classQueuingTimeStatistics = [RunningStatistics() for i in xrange(numClasses)]
+        # Statistics per window of windowLength, which hold the requests waiting and waiting times, and the requests in
+        # the system and queuing times.
+        self.windowLength = windowLength
+        self.requestsWaitingWindows = None
+        self.requestsInSystemWindows = None
+        self.keepSamples = keepSamples
+        self.timeWeighted = False
+        if keepSamples:
+            self.requestsWaiting = []
+            self.requestsInSystem = []
+            self.waitingTimes = []
+            self.queuingTimes = []
+    def startTimeWeightedStatistics(self, startingTime):
+        self.timeWeighted = True
+        self.requestsWaitingStatistics = TimeWeightedStatistics(startingTime)
+        self.requestsInSystemStatistics = TimeWeightedStatistics(startingTime)
+        if self.windowLength is not None:
+            self.requestsWaitingWindows = WindowedStatistics(self.windowLength, startingTime)
+            self.requestsInSystemWindows = WindowedStatistics(self.windowLength, startingTime)
+    def recordStateChange(self, time, requestsWaiting, requestsInSystem):
+        self.requestsWaitingStatistics.update(time, requestsWaiting)
+        self.requestsInSystemStatistics.update(time, requestsInSystem)
+        if self.requestsInSystemWindows is not None:
+            self.requestsWaitingWindows.update(time, requestsWaiting)
+            self.requestsInSystemWindows.update(time, requestsInSystem)
+    def getOccupancyDistribution(self):
+        '''
+        Returns a list whose k'th entry is the fraction of time k requests were in the system.
+        '''
+        return self.requestsInSystemStatistics.getDistribution()
+    def recordSnapshot(self, requestsWaiting, requestsInSystem):
+        self.numSnapshots += 1
+        self.requestsWaitingStatistics.add(requestsWaiting)
+        self.requestsInSystemStatistics.add(requestsInSystem)
+        if self.keepSamples:
+            self.requestsWaiting.append(requestsWaiting)
+            self.requestsInSystem.append(requestsInSystem)
+    def recordDeadRequest(self, request):
+        self.recordDeadTimes(request.birthTime, request.serviceTime, request.deathTime)
+    def recordDeadTimes(self, birthTime, serviceTime, deathTime):
+        '''
+        Records a dead request given its birth, service and death times.
+        '''
+        waitingTime = serviceTime - birthTime
+        queuingTime = deathTime - birthTime
+        self.numRequests += 1
+        self.totalServiceTime += deathTime - serviceTime
+        if waitingTime > 0:
+            self.numWaitingRequests += 1
+        self.waitingTimeStatistics.add(waitingTime)
+        self.queuingTimeStatistics.add(queuingTime)
+        self.waitingTimeQuantiles.add(waitingTime)
+        self.queuingTimeQuantiles.add(queuingTime)
+        self.queuingTimeBatches.add(queuingTime)
+        if self.requestsInSystemWindows is not None:
+            self.requestsWaitingWindows.add(deathTime, waitingTime)
+            self.requestsInSystemWindows.add(deathTime, queuingTime)
+        if self.keepSamples:
+            self.waitingTimes.append(waitingTime)
+            self.queuingTimes.append(queuingTime)
+    def recordDeadTimeArrays(self, birthTimes, serviceTimes, deathTimes):
+        '''
+        Records the dead requests whose times are in NumPy arrays at once. The statistics are those recordDeadTimes
+        would give, up to rounding. Windows (see windowLength) are not updated.
+        '''
+        waitingTimes = serviceTimes - birthTimes
+        queuingTimes = deathTimes - birthTimes
+        self.numRequests += len(queuingTimes)
+        self.numWaitingRequests += int(numpy.count_nonzero(waitingTimes > 0))
+        self.totalServiceTime += float((deathTimes - serviceTimes).sum())
+        for statistics in (self.waitingTimeStatistics, self.waitingTimeQuantiles):
+            statistics.addValues(waitingTimes)
+        for statistics in (self.queuingTimeStatistics, self.queuingTimeQuantiles, self.queuingTimeBatches):
+            statistics.addValues(queuingTimes)
+        if self.keepSamples:
+            self.waitingTimes.extend(waitingTimes.tolist())
+            self.queuingTimes.extend(queuingTimes.tolist())
+    def recordSnapshotArrays(self, requestsWaiting, requestsInSystem):
+        '''
+        Records the snapshots whose values are in NumPy arrays at once, as recordSnapshot would up to rounding.
+        '''
+        self.numSnapshots += len(requestsWaiting)
+        self.requestsWaitingStatistics.addValues(requestsWaiting.astype(float))
+        self.requestsInSystemStatistics.addValues(requestsInSystem.astype(float))
+        if self.keepSamples:
+            self.requestsWaiting.extend(requestsWaiting.tolist())
+            self.requestsInSystem.extend(requestsInSystem.tolist())
+    def recordStateChangeArrays(self, times, requestsWaiting, requestsInSystem):
+        '''
+        Records the changes of the number of requests whose times and values are in NumPy arrays at once, as
+        recordStateChange would up to rounding.
+        '''
+        self.requestsWaitingStatistics.updateSeries(times, requestsWaiting)
+        self.requestsInSystemStatistics.updateSeries(times, requestsInSystem)
+    def recordClassTimes(self, requestClass, birthTime, serviceTime, deathTime):
+        '''
+        Records the waiting and queuing times of a dead request of requestClass, in addition to recordDeadTimes.
+        '''
+        self.classWaitingTimeStatistics[requestClass].add(serviceTime - birthTime)
+        self.classQueuingTimeStatistics[requestClass].add(deathTime - birthTime)
+
+    # The getters of the report quantities return None when nothing they average was monitored, for example when
+    # the simulation ended before monitoring started.
+    def hasObservedState(self):
+        if self.timeWeighted:
+            return self.requestsInSystemStatistics.duration > 0
+        return self.numSnapshots > 0
+    def getMeanOfServiceTime(self):
+        return self.totalServiceTime/self.numRequests if self.numRequests else None
+    def getMeanOfRequestsWaiting(self):
+        return self.requestsWaitingStatistics.getMean() if self.hasObservedState() else None
+    def getMeanOfRequestsInSystem(self):
+        return self.requestsInSystemStatistics.getMean() if self.hasObservedState() else None
+    def getStandardDeviationOfRequestsInSystem(self):
+        return self.requestsInSystemStatistics.getStandardDeviation() if self.hasObservedState() else None
+    def getMeanOfWaitingTime(self):
+        return self.waitingTimeStatistics.getMean() if self.waitingTimeStatistics.count else None
+    def getMeanOfQueuingTime(self):
+        return self.queuingTimeStatistics.getMean() if self.queuingTimeStatistics.count else None
+    def getStandardDeviationOfQueuingTime(self):
+        return self.queuingTimeStatistics.getStandardDeviation() if self.queuingTimeStatistics.count else None
+    def getWindowSeries(self):
+        '''
+        Returns a list with a dictionary for every window (see windowLength) of the averages of the report quantities
+        over the window: windowStart, averageRequestsWaiting, averageRequestsInSystem, and numRequests,
+        averageWaitingTime and averageQueuingTime of the requests that died in it (None if none did).
+        '''
+        series = []
+        for windowStart, requestsWaiting, requestsInSystem, waitingTimes, queuingTimes in zip(
+                self.requestsInSystemWindows.getWindowStarts(), self.requestsWaitingWindows.getMeans(),
+                self.requestsInSystemWindows.getMeans(), self.requestsWaitingWindows.valueStatistics,
+                self.requestsInSystemWindows.valueStatistics):
+            series.append({"windowStart": windowStart,
+                           "averageRequestsWaiting": requestsWaiting,
+                           "averageRequestsInSystem": requestsInSystem,
+                           "numRequests": queuingTimes.count,
+                           "averageWaitingTime": waitingTimes.getMean() if waitingTimes.count else None,
+                           "averageQueuingTime": queuingTimes.getMean() if queuingTimes.count else None})
+        return series
+    def getClassMeansOfWaitingTime(self):
+        return [statistics.getMean() for statistics in self.classWaitingTimeStatistics]
+    def getClassMeansOfQueuingTime(self):
+        return [statistics.getMean() for statistics in self.classQueuingTimeStatistics]
+
+    def setWarmup(self, detectionTime, warmupDetector):
+        '''
+        Records the end of the warm-up period found by warmupDetector, which monitoring starts from at detectionTime.
+        '''
+        self.warmupCutoffTime = warmupDetector.cutoffTime
+        self.warmupDetectionTime = detectionTime
+        self.warmupObservations = warmupDetector.batchMeans.getNumObservations()
+        self.warmupTruncatedObservations = warmupDetector.truncatedObservations
+    def getQueuingTimeConfidenceInterval(self, confidence=0.95):
+        '''
+        Returns (mean, halfWidth, numBatches) of the batch means confidence interval of the queuing time, or None if
+        too few requests have died.
+        '''
+        return self.queuingTimeBatches.getConfidenceInterval(confidence)
+    def getRelativePrecision(self, confidence=0.95):
+        '''
+        Returns the half width of the queuing time confidence interval relative to the mean queuing time, or None if
+        there are too few batches.
+        '''
+        interval = self.getQueuingTimeConfidenceInterval(confidence)
+        if interval is None or interval[0] == 0:
+            return None
+        return interval[1]/interval[0]
+    def hasRelativePrecision(self, relativePrecision, confidence=0.95):
+        '''
+        Returns True if the queuing time confidence interval, made of at least MIN_BATCHES_FOR_PRECISION batch means,
+        is within relativePrecision of the mean.
+        '''
+        interval = self.getQueuingTimeConfidenceInterval(confidence)
+        if interval is None or interval[2] < MIN_BATCHES_FOR_PRECISION:
+            return False
+        mean, halfWidth, numBatches = interval
+        return halfWidth <= relativePrecision*mean
+    def setTargetPrecision(self, relativePrecision, confidence):
+        self.targetPrecision = relativePrecision
+        self.confidence = confidence
+    def getEffectiveSampleSize(self):
+        '''
+        Returns the number of independent queuing times that would estimate the mean queuing time as precisely as the
+        correlated ones recorded: the variance of one queuing time over the batch means variance of their mean.
+        '''
+        interval = self.getQueuingTimeConfidenceInterval()
+        if interval is None or interval[1] == 0:
+            return None
+        mean, halfWidth, numBatches = interval
+        standardError = halfWidth/studentTQuantile(0.975, numBatches - 1)
+        return self.queuingTimeStatistics.getVariance()/standardError**2
+
+    def recordBusyTime(self, server, busyTime):
+        self.serverBusyTimes[server] += busyTime
+    def setObservedTime(self, observedTime, partialBusyTimes=None):
+        '''
+        Sets the length of the monitored period. partialBusyTimes are the busy times of the services still in progress
+        at its end; they replace those of an earlier call, so a resumed simulation does not count them twice.
+        '''
+        self.observedTime = observedTime
+        if partialBusyTimes is not None:
+            self.partialBusyTimes = partialBusyTimes
+    def getBusyTimes(self):
+        return [busyTime + partialBusyTime
+                for busyTime, partialBusyTime in zip(self.serverBusyTimes, self.partialBusyTimes)]
+    def getServerUtilizations(self):
+        '''
+        Returns a list whose i'th entry is the fraction of the monitored time server i was serving a request, or None
+        if no time was monitored.
+        '''
+        if self.observedTime <= 0:
+            return None
+        return [busyTime/self.observedTime for busyTime in self.getBusyTimes()]
+    def getAverageServerUtilization(self):
+        if self.observedTime <= 0:
+            return None
+        return sum(self.getBusyTimes())/(self.observedTime*len(self.serverBusyTimes))
+    def getWaitingProbability(self):
+        '''
+        Returns the fraction of dead requests that had to wait for a server (the Erlang C probability for M/M/c).
+        '''
+        return self.numWaitingRequests/self.numRequests if self.numRequests else None
+
+    def incrementAttemptedRequests(self):
+        self.attemptedRequests += 1
+    def incrementRejectedRequests(self):
+        self.rejectedRequests += 1
+    def getRejectionProbability(self):
+        return self.rejectedRequests/ self.attemptedRequests if self.attemptedRequests else None
+    def getStandardDeviationOfRequestResult(self):
+        if self.attemptedRequests == 0:
+            return None
+        mean = self.getRejectionProbability()
+        variance = (self.rejectedRequests*(0 - mean)**2 + (self.attemptedRequests - self.rejectedRequests)*(1 - mean)**2)/self.attemptedRequests
+        standardDeviation = sqrt(variance)
+        return standardDeviation
+
+    def merge(self, other):
+        '''
+        Adds the statistics recorded by other, for example the Monitor of another replication, to this Monitor.
+        Samples are only merged if both Monitors keep them.
+        '''
+        self.numSnapshots += other.numSnapshots
+        self.numRequests += other.numRequests
+        self.numWaitingRequests += other.numWaitingRequests
+        self.serverBusyTimes = [busyTime + otherBusyTime
+                                for busyTime, otherBusyTime in zip(self.getBusyTimes(), other.getBusyTimes())]
+        self.partialBusyTimes = [0.0]*len(self.serverBusyTimes)
+        self.observedTime += other.observedTime
+        self.attemptedRequests += other.attemptedRequests
+        self.rejectedRequests += other.rejectedRequests
+        self.requestsWaitingStatistics.merge(other.requestsWaitingStatistics)
+        self.requestsInSystemStatistics.merge(other.requestsInSystemStatistics)
+        self.waitingTimeStatistics.merge(other.waitingTimeStatistics)
+        self.queuingTimeStatistics.merge(other.queuingTimeStatistics)
+        self.waitingTimeQuantiles.merge(other.waitingTimeQuantiles)
+        self.queuingTimeQuantiles.merge(other.queuingTimeQuantiles)
+        for statistics, otherStatistics in zip(self.classWaitingTimeStatistics + self.classQueuingTimeStatistics,
+                                               other.classWaitingTimeStatistics + other.classQueuingTimeStatistics):
+            statistics.merge(otherStatistics)
+        if self.requestsInSystemWindows is not None and other.requestsInSystemWindows is not None:
+            self.requestsWaitingWindows.merge(other.requestsWaitingWindows)
+            self.requestsInSystemWindows.merge(other.requestsInSystemWindows)
+        self.totalServiceTime += other.totalServiceTime
+        self.numEvents += other.numEvents
+        self.keepSamples = self.keepSamples and other.keepSamples
+        if self.keepSamples:
+            self.requestsWaiting.extend(other.requestsWaiting)
+            self.requestsInSystem.extend(other.requestsInSystem)
+            self.waitingTimes.extend(other.waitingTimes)
+            self.queuingTimes.extend(other.queuingTimes)
+    def getSummary(self):
+        '''
+        Returns the report quantities as a dictionary, small enough to send between processes.
+        '''
+        summary = {"averageRequestsWaiting": self.getMeanOfRequestsWaiting(),
+                   "averageRequestsInSystem": self.getMeanOfRequestsInSystem(),
+                   "standardDeviationOfRequestsInSystem": self.getStandardDeviationOfRequestsInSystem(),
+                   "averageWaitingTime": self.getMeanOfWaitingTime(),
+                   "averageQueuingTime": self.getMeanOfQueuingTime(),
+                   "standardDeviationOfQueuingTime": self.getStandardDeviationOfQueuingTime(),
+                   "averageServiceTime": self.getMeanOfServiceTime(),
+                   "waitingProbability": self.getWaitingProbability(),
+                   "averageServerUtilization": self.getAverageServerUtilization()}
+        for q, waitingTime, queuingTime in zip(REPORTED_QUANTILES, self.waitingTimeQuantiles.getQuantiles(),
+                                               self.queuingTimeQuantiles.getQuantiles()):
+            summary["waitingTimePercentile" + str(q*100)] = waitingTime
+            summary["queuingTimePercentile" + str(q*100)] = queuingTime
+        if self.numClasses > 1:
+            for i, (waitingTime, queuingTime) in enumerate(zip(self.getClassMeansOfWaitingTime(),
+                                                               self.getClassMeansOfQueuingTime())):
+                summary["averageWaitingTimeClass%d" % i] = waitingTime
+                summary["averageQueuingTimeClass%d" % i] = queuingTime
+        if self.attemptedRequests > 0:
+            summary["rejectionProbability"] = self.getRejectionProbability()
+        if self.warmupCutoffTime is not None:
+            summary["warmupCutoffTime"] = self.warmupCutoffTime
+            summary["warmupDetectionTime"] = self.warmupDetectionTime
+        if self.targetPrecision is not None:
+            summary["relativePrecision"] = self.getRelativePrecision(self.confidence)
+            summary["numEvents"] = self.numEvents
+        return summary
+    def formatPercentiles(self, sketch):
+        return ", ".join("p" + str(q*100) + " = " + str(value)
+                         for q, value in zip(REPORTED_QUANTILES, sketch.getQuantiles()))
+    def printReport(self):
+        if not self.timeWeighted:
+            print "Number of Snapshots Taken: " + str(self.numSnapshots)
+        print "Average Requests Waiting: "  + str(self.getMeanOfRequestsWaiting())
+        print "Average Requests In System: "  + str(self.getMeanOfRequestsInSystem())
+        print "Standard Deviation of Requests In System: " + str(self.getStandardDeviationOfRequestsInSystem())
+        print
+        print "Number of Dead Requests: " + str(self.numRequests)
+        print "Average Waiting Time: "  + str(self.getMeanOfWaitingTime())
+        print "Average Queuing Time: "  + str(self.getMeanOfQueuingTime())
+        print "Standard Deviation of Queuing Time: " + str(self.getStandardDeviationOfQueuingTime())
+        print "Waiting Time Percentiles: " + self.formatPercentiles(self.waitingTimeQuantiles)
+        print "Queuing Time Percentiles: " + self.formatPercentiles(self.queuingTimeQuantiles)
+        print "Probability of Waiting: " + str(self.getWaitingProbability())
+        if self.numClasses > 1:
+            for i, (waitingStatistics, queuingStatistics) in enumerate(zip(self.classWaitingTimeStatistics,
+                                                                           self.classQueuingTimeStatistics)):
+                print "Class " + str(i) + ": " + str(queuingStatistics.count) + " Dead Requests, Average Waiting Time " + str(waitingStatistics.getMean()) + ", Average Queuing Time " + str(queuingStatistics.getMean())
+        interval = self.getQueuingTimeConfidenceInterval()
+        if interval is not None:
+            mean, halfWidth, numBatches = interval
+            print "Queuing Time 95% Confidence Interval (" + str(numBatches) + " batch means): " + str(mean) + " +/- " + str(halfWidth)
+            print "Effective Sample Size: " + str(self.getEffectiveSampleSize())
+        if self.warmupCutoffTime is not None:
+            if self.warmupTruncatedObservations is None:
+                print "Warm-up Cutoff Time (no end found by MSER-5, half the simulation time): " + str(self.warmupCutoffTime)
+                print "Dead Requests Before Cutoff: " + str(self.warmupObservations)
+            else:
+                print "Warm-up Cutoff Time (MSER-5): " + str(self.warmupCutoffTime) + ", detected at " + str(self.warmupDetectionTime)
+                print "Dead Requests Before Detection: " + str(self.warmupObservations) + " (" + str(self.warmupTruncatedObservations) + " truncated by MSER-5)"
+        if self.targetPrecision is not None:
+            print "Queuing Time Relative Precision: " + str(self.getRelativePrecision(self.confidence)) + " (target " + str(self.targetPrecision) + " at " + str(self.confidence) + " confidence)"
+        print "Number of Events: " + str(self.numEvents)
+        print
+        utilizations = self.getServerUtilizations()
+        print "Average Server Utilization: " + str(self.getAverageServerUtilization())
+        if utilizations is not None and len(utilizations) > 1:
+            print "Least and Most Utilized Servers: " + str(min(utilizations)) + ", " + str(max(utilizations))
+        if self.attemptedRequests > 0:
+            print
+            print "Number of Requests Who Tried to Enter: " + str(self.attemptedRequests)
+            print "Standard Deviation of Requests who were successful: " + str(self.getStandardDeviationOfRequestResult())
+            print "Rejection Probability: " + str(self.getRejectionProbability())
+        if self.timeWeighted:
+            print
+            print "Occupancy Distribution (fraction of time with k requests in system):"
+            for k, fraction in enumerate(self.getOccupancyDistribution()):
+                print "    " + str(k) + ": " + str(fraction)
+        if self.requestsInSystemWindows is not None:
+            print
+            print "Window Start  Requests Waiting  Requests In System  Dead Requests  Waiting Time  Queuing Time"
+            for window in self.getWindowSeries():
+                print "%12g  %16s  %18s  %13d  %12s  %12s" % tuple(
+                    window[name] if name in ("windowStart", "numRequests") else formatWindowValue(window[name])
+                    for name in ("windowStart", "averageRequestsWaiting", "averageRequestsInSystem", "numRequests",
+                                 "averageWaitingTime", "averageQueuingTime"))
+
+def formatWindowValue(value):
+    return "-" if value is None else "%.6g" % value
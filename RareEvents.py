@@ -0,0 +1,117 @@
+'''
+RareEvents
+
+This module estimates small blocking probabilities of the M/M/1/K queue (MM1KQueue with any capacity) by importance
+sampling. Counting rejected births, as the Monitor does, needs about 100/B births to estimate a blocking probability
+B to +/-10%, which is out of reach for the 1e-6 to 1e-9 targets of a capacity plan.
+
+The estimate is regenerative. A cycle starts with a birth into the empty system and ends when the system is empty
+again, and the blocking probability is the mean number of rejected births per cycle over the mean number of births
+per cycle. Only the numerator is rare, since rejections only happen in the cycles that fill the system. It is
+estimated by simulating each cycle with the arrival and service rates swapped until the system is full or empty,
+which makes filling the system likely, and with the true rates from then on. Each rejection count is weighted by the
+likelihood ratio of the path up to that point. The total rate of events is the same under both sets of rates, so the
+ratio only depends on the jumps: every step up multiplies it by rho and every step down by 1/rho, and a path that
+fills the system from one request has K - 1 more steps up than down, so its ratio is rho**(K - 1) whatever the path.
+The estimate is unbiased, and its relative error stays bounded however large K is, so the number of cycles needed for
+a given precision does not grow as B shrinks. The denominator is estimated from cycles at the true rates.
+
+Only the embedded jump chain is simulated, as the blocking probability does not depend on the holding times, and the
+cycles are simulated side by side as NumPy arrays.
+'''
+from __future__ import division #Required for floating point division.
+from collections import namedtuple
+from math import sqrt
+import numpy
+from NumberGenerator import substream
+from Statistics import normalQuantile
+
+BlockingEstimate = namedtuple("BlockingEstimate", ["probability", "halfWidth", "relativeError", "numCycles",
+                                                   "numEvents"])
+
+# Cycles simulated at a time when a relative precision is the target.
+CYCLES_PER_ROUND = 10000
+
+def simulateCycles(upProbability, capacity, numCycles, randomState, startLevel=1, stopAtCapacity=False):
+    '''
+    Simulates numCycles paths of the jump chain of M/M/1/K, which goes up with probability upProbability, from
+    startLevel requests until the system is empty, or full if stopAtCapacity is True. Returns (final levels, births,
+    rejected births, events) with the births and rejected births of every path.
+    '''
+    levels = numpy.full(numCycles, startLevel, dtype=int)
+    births = numpy.zeros(numCycles, dtype=int)
+    rejections = numpy.zeros(numCycles, dtype=int)
+    active = numpy.arange(numCycles)
+    if stopAtCapacity:
+        active = active[levels[active] < capacity]
+    numEvents = 0
+    while len(active):
+        numEvents += len(active)
+        current = levels[active]
+        up = randomState.random_sample(len(active)) < upProbability
+        births[active] += up
+        rejections[active] += up & (current == capacity)
+        current = numpy.where(up, numpy.minimum(current + 1, capacity), current - 1)
+        levels[active] = current
+        if stopAtCapacity:
+            active = active[(current > 0) & (current < capacity)]
+        else:
+            active = active[current > 0]
+    return levels, births, rejections, numEvents
+
+def estimateBlockingProbability(arrivalRate, averageServiceTime, capacity, numCycles=100000, seed=None,
+                                confidence=0.95, relativePrecision=None, maxCycles=10**7):
+    '''
+    Returns a BlockingEstimate of the probability that a birth into M/M/1/K is rejected: the probability, the half
+    width of its confidence interval, the relative error (standard error over the estimate), and the numbers of cycles
+    and simulated events used for each of the two means. If relativePrecision is given, cycles are added
+    CYCLES_PER_ROUND at a time until the half width is at most relativePrecision times the probability, or maxCycles
+    have been used; otherwise numCycles are used. The load must be below 1, as blocking is not rare otherwise.
+    '''
+    load = arrivalRate*averageServiceTime
+    if load >= 1:
+        raise ValueError("Blocking is not rare at load %s; count rejections instead" % load)
+    upProbability = load/(1 + load)
+    likelihoodRatio = load**(capacity - 1)
+    weighted = substream(seed, 0)
+    plain = substream(seed, 1)
+    z = normalQuantile((1 + confidence)/2)
+    sums = numpy.zeros(4) # Sums of the weighted rejections, their squares, the births and their squares.
+    cycles = 0
+    events = 0
+    while True:
+        size = CYCLES_PER_ROUND if relativePrecision is not None else numCycles
+        # Cycles with swapped rates until the system is full or empty, continued at the true rates if it is full.
+        levels, births, rejections, numEvents = simulateCycles(1 - upProbability, capacity, size, weighted,
+                                                               stopAtCapacity=True)
+        events += numEvents
+        full = numpy.count_nonzero(levels == capacity)
+        levels, births, rejections, numEvents = simulateCycles(upProbability, capacity, full, weighted,
+                                                               startLevel=capacity)
+        events += numEvents
+        weightedRejections = likelihoodRatio*rejections
+        # The births of plain cycles, counting the birth that starts each cycle.
+        levels, births, plainRejections, numEvents = simulateCycles(upProbability, capacity, size, plain)
+        events += numEvents
+        births += 1
+        sums += [weightedRejections.sum(), numpy.dot(weightedRejections, weightedRejections), births.sum(),
+                 numpy.dot(births, births)]
+        cycles += size
+        rejectionMean = sums[0]/cycles
+        birthMean = sums[2]/cycles
+        rejectionVariance = max(sums[1]/cycles - rejectionMean**2, 0.0)/cycles
+        birthVariance = max(sums[3]/cycles - birthMean**2, 0.0)/cycles
+        probability = rejectionMean/birthMean
+        # Delta method for the ratio of the two independent means.
+        relativeError = sqrt(rejectionVariance/rejectionMean**2 + birthVariance/birthMean**2) if rejectionMean > 0 \
+            else float("inf")
+        if relativePrecision is None or z*relativeError <= relativePrecision or cycles >= maxCycles:
+            return BlockingEstimate(probability, z*relativeError*probability, relativeError, cycles, events)
+
+def getBruteForceEvents(blockingProbability, relativeError):
+    '''
+    Returns roughly the number of births a plain simulation needs to estimate blocking with the given relative error
+    (standard error over the estimate): the rejected births are about Poisson, so about 1/relativeError**2 of them have
+    to be seen. Correlation between successive births only raises the number.
+    '''
+    return 1/(blockingProbability*relativeError**2)
@@ -0,0 +1,145 @@
+'''
+Replay
+
+This module drives the simulator with recorded interarrival and service times instead of random ones, so that
+questions like "what if service were 20% faster" can be answered for real traffic:
+
+    arrivals = Recorded(CsvSource("requests.csv", "timestamp"), timestamps=True)
+    services = Recorded(CsvSource("requests.csv", "duration"), scale=1/1.2)
+    controller = QueueEngine.Controller(arrivals, services, simulationTime)
+
+A Recorded distribution can be used wherever the Controller takes a distribution. It hands out the values of its
+source in order (the random number stream it is given is not used), multiplied by scale. The values are read a chunk
+at a time, so a log of any size is replayed in constant memory:
+    CsvSource    - one column of a text file, read chunkSize lines at a time
+    BinarySource - an array of numbers (or one field of an array of records) in a binary file, memory mapped
+'''
+from __future__ import division #Required for floating point division.
+import itertools
+import numpy
+
+# Number of values read from a source at a time.
+DEFAULT_CHUNK_SIZE = 65536
+
+class CsvSource:
+    '''
+    The values in column of the delimited text file at path. column is a column number or the name of a column in
+    the header line. header tells whether the file starts with a header line, which it must if column is a name.
+    '''
+    def __init__(self, path, column=0, delimiter=",", chunkSize=DEFAULT_CHUNK_SIZE, header=None):
+        self.path = path
+        self.column = column
+        self.header = not isinstance(column, int) if header is None else header
+        self.delimiter = delimiter
+        self.chunkSize = chunkSize
+    def getChunks(self):
+        '''
+        Yields the values as NumPy arrays of at most chunkSize values.
+        '''
+        with open(self.path) as csvFile:
+            column = self.column
+            if self.header:
+                names = [name.strip() for name in csvFile.readline().split(self.delimiter)]
+                if not isinstance(column, int):
+                    column = names.index(column)
+            delimiter = self.delimiter
+            while True:
+                lines = list(itertools.islice(csvFile, self.chunkSize))
+                if not lines:
+                    return
+                yield numpy.array([float(line.split(delimiter)[column]) for line in lines if line.strip()])
+
+class BinarySource:
+    '''
+    The values in the binary file at path, an array of dtype, or field of an array of records of dtype
+    (for example a Trace file with dtype=Trace.TRACE_DTYPE and field="birthTime"). The file is memory mapped.
+    '''
+    def __init__(self, path, dtype="<f8", field=None, chunkSize=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.dtype = numpy.dtype(dtype)
+        self.field = field
+        self.chunkSize = chunkSize
+    def getChunks(self):
+        values = numpy.memmap(self.path, dtype=self.dtype, mode="r")
+        if self.field is not None:
+            values = values[self.field]
+        for start in xrange(0, len(values), self.chunkSize):
+            yield numpy.array(values[start:start + self.chunkSize], dtype=float)
+
+class Recorded:
+    '''
+    Distribution whose values are the values of source (see CsvSource and BinarySource) in order, multiplied by
+    scale. If timestamps is True the source holds times, such as arrival times, and the values are the differences
+    between successive times, starting with 0 for the first. When the source runs out it starts again from the
+    beginning if loop is True and raises ValueError otherwise; times then restart the mean interval after the last one
+    rather than at the same time. mean is the mean value, which is computed with a
+    pass over the source if it is not given. A Recorded distribution keeps its place in the source, so every
+    Controller needs its own.
+    '''
+    def __init__(self, source, scale=1.0, timestamps=False, loop=False, mean=None):
+        self.source = source
+        self.scale = scale
+        self.timestamps = timestamps
+        self.loop = loop
+        self.meanValue = mean
+        self.restart()
+    def restart(self):
+        self.chunks = self.source.getChunks()
+        self.pending = numpy.zeros(0)
+        self.lastTime = None
+        self.firstInterval = 0.0 # The difference of the first time from the time before it, if timestamps is True.
+    def mean(self):
+        if self.meanValue is None:
+            count = 0
+            total = 0.0
+            first = last = None
+            for chunk in self.source.getChunks():
+                if len(chunk) == 0:
+                    continue
+                if first is None:
+                    first = chunk[0]
+                last = chunk[-1]
+                count += len(chunk)
+                total += chunk.sum()
+            if count == 0:
+                raise ValueError("The source has no values")
+            if self.timestamps:
+                # The count - 1 differences of the times, ignoring the leading 0.
+                self.meanValue = self.scale*(last - first)/max(count - 1, 1)
+            else:
+                self.meanValue = self.scale*total/count
+        return self.meanValue
+    def nextChunk(self):
+        for chunk in self.chunks:
+            if len(chunk) == 0:
+                continue
+            if self.timestamps:
+                previous = chunk[0] - self.firstInterval if self.lastTime is None else self.lastTime
+                self.lastTime = chunk[-1]
+                chunk = numpy.diff(numpy.concatenate([[previous], chunk]))
+            return self.scale*chunk
+        return None
+    def generate(self, randomState, size):
+        '''
+        Returns the next size values, or fewer if the source runs out (a VariateStream asks again for more).
+        '''
+        parts = [self.pending]
+        available = len(self.pending)
+        restarted = False
+        while available < size:
+            chunk = self.nextChunk()
+            if chunk is None:
+                if available > 0:
+                    break
+                if not self.loop or restarted:
+                    raise ValueError("All the recorded values have been used")
+                self.restart()
+                if self.timestamps:
+                    self.firstInterval = self.mean()/self.scale
+                restarted = True
+                continue
+            parts.append(chunk)
+            available += len(chunk)
+        values = numpy.concatenate(parts)
+        self.pending = values[size:]
+        return values[:size]
@@ -0,0 +1,107 @@
+'''
+Replications
+
+This module runs independent replications of a simulation and combines them into confidence intervals.
+
+A single Controller run gives one point estimate of each report quantity. runReplications runs numReplications
+Controllers, each with its own seed, across a pool of worker processes. Each worker sends back only the Monitor
+summary of its run, and the summaries are combined into the mean, standard deviation and Student t confidence
+interval of every report quantity.
+'''
+from __future__ import division #Required for floating point division.
+from math import sqrt
+from multiprocessing import Pool
+from Statistics import confidenceInterval
+
+def runReplication(task):
+    '''
+    Runs one replication and returns its Monitor summary. task is a (controllerClass, arguments,
+    monitorStartingTime, seed, options) tuple so that it can be sent to a worker process. options are keyword arguments
+    of the controller.
+    '''
+    controllerClass, arguments, monitorStartingTime, seed, options = task
+    controller = controllerClass(*arguments, seed=seed, **options)
+    controller.runSimulation(monitorStartingTime)
+    return controller.monitor.getSummary()
+
+def runTasks(tasks, processes=None):
+    '''
+    Runs the replications described by tasks (see runReplication) and returns their Monitor summaries in order.
+    processes is the number of worker processes, by default one per core. With processes=1 the replications run in
+    this process.
+    '''
+    if processes == 1:
+        return map(runReplication, tasks)
+    pool = Pool(processes)
+    try:
+        # Replications are long compared to the cost of handing out a task, so they are handed out one at a time
+        # to keep every core busy until the end.
+        return pool.map(runReplication, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+def runReplications(controllerClass, arguments, monitorStartingTime, numReplications, seed=0, processes=None,
+                    options={}):
+    '''
+    Runs numReplications replications of controllerClass(*arguments, **options) with seeds seed, seed + 1, ... and
+    returns a ReplicationSummary. processes is the number of worker processes, by default one per core. With
+    processes=1 the replications run in this process.
+    '''
+    tasks = [(controllerClass, arguments, monitorStartingTime, seed + i, options) for i in range(numReplications)]
+    return ReplicationSummary(runTasks(tasks, processes))
+
+class ReplicationSummary:
+    '''
+    Combines the Monitor summaries of independent replications. A quantity is combined over the replications that
+    have a value for it, as the summary of a replication that monitored nothing has None for its quantities, and
+    only the quantities every summary has are reported.
+    '''
+    def __init__(self, summaries, confidence=0.95):
+        self.summaries = list(summaries)
+        self.numReplications = len(self.summaries)
+        self.confidence = confidence
+    def getNames(self):
+        if not self.summaries:
+            return []
+        return sorted(set(self.summaries[0]).intersection(*self.summaries[1:]))
+    def getValues(self, name):
+        return [summary[name] for summary in self.summaries if summary.get(name) is not None]
+    def getMean(self, name):
+        '''
+        Returns the mean of the values of quantity name, or None if no replication has one.
+        '''
+        values = self.getValues(name)
+        if not values:
+            return None
+        return sum(values)/len(values)
+    def getStandardDeviation(self, name):
+        '''
+        Returns the sample standard deviation of the values of quantity name, or None if there are fewer than 2.
+        '''
+        values = self.getValues(name)
+        if len(values) < 2:
+            return None
+        mean = sum(values)/len(values)
+        squaredDifferences = [(x - mean)**2 for x in values]
+        return sqrt(sum(squaredDifferences)/(len(values) - 1))
+    def getConfidenceInterval(self, name):
+        '''
+        Returns (lower, upper) of the Student t confidence interval of the mean of quantity name, or None if there
+        are fewer than 2 values.
+        '''
+        standardDeviation = self.getStandardDeviation(name)
+        if standardDeviation is None:
+            return None
+        return confidenceInterval(self.getMean(name), standardDeviation, len(self.getValues(name)), self.confidence)
+    def printReport(self):
+        print "Number of Replications: " + str(self.numReplications)
+        for name in self.getNames():
+            interval = self.getConfidenceInterval(name)
+            if interval is None:
+                print "%s: %s (%d values, no confidence interval)" % (name, self.getMean(name),
+                                                                     len(self.getValues(name)))
+                continue
+            lower, upper = interval
+            print "%s: %s (standard deviation %s, %d%% confidence interval [%s, %s])" % (
+                name, self.getMean(name), self.getStandardDeviation(name), round(self.confidence*100), lower, upper)
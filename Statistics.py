@@ -0,0 +1,457 @@
+'''
+Statistics
+
+Helper functions for turning simulation output into estimates with confidence intervals.
+'''
+from __future__ import division #Required for floating point division.
+from math import sqrt, log, tan, pi, ceil
+import numpy
+
+def normalQuantile(p):
+    '''
+    Returns the value z such that a standard normal random variable is below z with probability p.
+    Uses Acklam's rational approximation, which has a relative error below 1.2e-9.
+    '''
+    a = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+    b = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01)
+    c = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+    d = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+    if p < 0.02425:
+        q = sqrt(-2*log(p))
+        return (((((c[0]*q + c[1])*q + c[2])*q + c[3])*q + c[4])*q + c[5]) / \
+               ((((d[0]*q + d[1])*q + d[2])*q + d[3])*q + 1)
+    if p > 1 - 0.02425:
+        return -normalQuantile(1 - p)
+    q = p - 0.5
+    r = q*q
+    return (((((a[0]*r + a[1])*r + a[2])*r + a[3])*r + a[4])*r + a[5])*q / \
+           (((((b[0]*r + b[1])*r + b[2])*r + b[3])*r + b[4])*r + 1)
+
+def studentTQuantile(p, degreesOfFreedom):
+    '''
+    Returns the p quantile of Student's t distribution. The values for 1 and 2 degrees of freedom are exact, the
+    others use the Cornish-Fisher expansion around the normal quantile (Abramowitz and Stegun 26.7.5), which is
+    accurate to about 4e-3 at 3 degrees of freedom and improves quickly as the degrees of freedom grow.
+    '''
+    n = degreesOfFreedom
+    if n == 1:
+        return tan(pi*(p - 0.5))
+    if n == 2:
+        return (2*p - 1)/sqrt(2*p*(1 - p))
+    z = normalQuantile(p)
+    z2 = z*z
+    g1 = (z2 + 1)*z/4
+    g2 = ((5*z2 + 16)*z2 + 3)*z/96
+    g3 = (((3*z2 + 19)*z2 + 17)*z2 - 15)*z/384
+    g4 = ((((79*z2 + 776)*z2 + 1482)*z2 - 1920)*z2 - 945)*z/92160
+    return z + g1/n + g2/n**2 + g3/n**3 + g4/n**4
+
+def confidenceInterval(mean, standardDeviation, numSamples, confidence=0.95):
+    '''
+    Returns the (lower, upper) Student t confidence interval for the mean of numSamples independent samples with the
+    given sample mean and sample standard deviation.
+    '''
+    halfWidth = studentTQuantile((1 + confidence)/2, numSamples - 1)*standardDeviation/sqrt(numSamples)
+    return (mean - halfWidth, mean + halfWidth)
+
+class RunningStatistics:
+    '''
+    Keeps the count, mean, variance, minimum and maximum of a stream of values in constant memory. The mean and
+    variance are updated with Welford's algorithm, which avoids the cancellation of the sum of squares formula.
+    Two RunningStatistics can be merged, for example to combine the same statistic from several replications.
+    '''
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sumOfSquaredDifferences = 0.0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+    def add(self, value):
+        self.count += 1
+        difference = value - self.mean
+        self.mean += difference/self.count
+        self.sumOfSquaredDifferences += difference*(value - self.mean)
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+    def addValues(self, values):
+        '''
+        Adds the values of a NumPy array at once.
+        '''
+        if len(values) == 0:
+            return
+        other = RunningStatistics()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.sumOfSquaredDifferences = float(((values - other.mean)**2).sum())
+        other.minimum = float(values.min())
+        other.maximum = float(values.max())
+        self.merge(other)
+    def merge(self, other):
+        '''
+        Adds the values summarized by other to this RunningStatistics (Chan et al.'s parallel update).
+        '''
+        count = self.count + other.count
+        if count == 0:
+            return
+        difference = other.mean - self.mean
+        self.sumOfSquaredDifferences += other.sumOfSquaredDifferences + difference**2*self.count*other.count/count
+        self.mean += difference*other.count/count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+    def getMean(self):
+        return self.mean
+    def getVariance(self):
+        '''
+        Returns the variance of the values, dividing by their number like the Monitor always has.
+        '''
+        return self.sumOfSquaredDifferences/self.count
+    def getSampleVariance(self):
+        return self.sumOfSquaredDifferences/(self.count - 1)
+    def getStandardDeviation(self):
+        return sqrt(self.getVariance())
+
+class TimeWeightedStatistics:
+    '''
+    Keeps the time average, time weighted variance and time-at-level histogram of an integer valued quantity, such as
+    the number of requests in the system, that changes at discrete times. Only time after startTime is counted.
+    '''
+    def __init__(self, startTime=0):
+        self.startTime = startTime
+        self.lastTime = startTime
+        self.level = 0
+        self.duration = 0.0
+        self.area = 0.0
+        self.squaredArea = 0.0
+        self.timeAtLevel = [] # timeAtLevel[k] is the time spent with the quantity equal to k.
+    def update(self, time, level):
+        '''
+        Records that the quantity changed to level at time.
+        '''
+        if time > self.lastTime:
+            duration = time - self.lastTime
+            self.duration += duration
+            self.area += self.level*duration
+            self.squaredArea += self.level*self.level*duration
+            while len(self.timeAtLevel) <= self.level:
+                self.timeAtLevel.append(0.0)
+            self.timeAtLevel[self.level] += duration
+            self.lastTime = time
+        self.level = level
+    def updateSeries(self, times, levels):
+        '''
+        Records the changes of the quantity to levels[i] at times[i], for NumPy arrays of non-decreasing times. The
+        result is the same as calling update for each change.
+        '''
+        if len(times) == 0:
+            return
+        times = numpy.maximum(times, self.lastTime)
+        durations = numpy.diff(numpy.concatenate([[self.lastTime], times]))
+        previousLevels = numpy.concatenate([[self.level], levels[:-1]]).astype(int)
+        self.duration += durations.sum()
+        self.area += numpy.dot(previousLevels, durations)
+        self.squaredArea += numpy.dot(previousLevels*previousLevels, durations)
+        timeAtLevel = numpy.bincount(previousLevels, weights=durations).tolist()
+        while len(self.timeAtLevel) < len(timeAtLevel):
+            self.timeAtLevel.append(0.0)
+        for level, duration in enumerate(timeAtLevel):
+            self.timeAtLevel[level] += duration
+        self.lastTime = float(times[-1])
+        self.level = int(levels[-1])
+    def merge(self, other):
+        '''
+        Adds the time recorded by other, as if its observation period followed this one.
+        '''
+        self.duration += other.duration
+        self.area += other.area
+        self.squaredArea += other.squaredArea
+        while len(self.timeAtLevel) < len(other.timeAtLevel):
+            self.timeAtLevel.append(0.0)
+        for level, duration in enumerate(other.timeAtLevel):
+            self.timeAtLevel[level] += duration
+    def getMean(self):
+        return self.area/self.duration
+    def getVariance(self):
+        return self.squaredArea/self.duration - self.getMean()**2
+    def getStandardDeviation(self):
+        return sqrt(max(self.getVariance(), 0.0))
+    def getDistribution(self):
+        '''
+        Returns a list whose k'th entry is the fraction of time the quantity was equal to k.
+        '''
+        return [duration/self.duration for duration in self.timeAtLevel]
+
+class WindowedStatistics:
+    '''
+    Splits time from startTime into windows of windowLength, such as 5 minutes, and keeps for every window the time
+    average of a quantity that changes at discrete times (see TimeWeightedStatistics) and the RunningStatistics of the
+    values added during it. Steady state averages hide the peaks of time varying load; the windows show them.
+    '''
+    def __init__(self, windowLength, startTime=0):
+        self.windowLength = windowLength
+        self.startTime = startTime
+        self.lastTime = startTime
+        self.level = 0
+        self.areas = [] # areas[i] is the integral of the quantity over window i,
+        self.durations = [] # durations[i] the time of window i observed so far,
+        self.valueStatistics = [] # and valueStatistics[i] the values added during window i.
+    def getWindow(self, time):
+        window = int((time - self.startTime)//self.windowLength)
+        while len(self.areas) <= window:
+            self.areas.append(0.0)
+            self.durations.append(0.0)
+            self.valueStatistics.append(RunningStatistics())
+        return window
+    def update(self, time, level):
+        '''
+        Records that the quantity changed to level at time.
+        '''
+        if time <= self.lastTime:
+            self.level = level
+            return
+        window = self.getWindow(self.lastTime)
+        while True:
+            end = min(time, self.startTime + (window + 1)*self.windowLength)
+            self.areas[window] += self.level*(end - self.lastTime)
+            self.durations[window] += end - self.lastTime
+            self.lastTime = end
+            if end == time:
+                break
+            window += 1
+            self.getWindow(self.startTime + (window + 0.5)*self.windowLength)
+        self.level = level
+    def add(self, time, value):
+        '''
+        Adds value to the statistics of the window containing time.
+        '''
+        if time >= self.startTime:
+            self.valueStatistics[self.getWindow(time)].add(value)
+    def merge(self, other):
+        '''
+        Adds the windows of other, for example another replication of the same transient, window by window.
+        '''
+        for i in xrange(len(other.areas)):
+            self.getWindow(self.startTime + (i + 0.5)*self.windowLength)
+            self.areas[i] += other.areas[i]
+            self.durations[i] += other.durations[i]
+            self.valueStatistics[i].merge(other.valueStatistics[i])
+    def getWindowStarts(self):
+        return [self.startTime + i*self.windowLength for i in xrange(len(self.areas))]
+    def getMeans(self):
+        '''
+        Returns the time average of the quantity in every window, None for windows not observed.
+        '''
+        return [area/duration if duration > 0 else None for area, duration in zip(self.areas, self.durations)]
+
+# Percentiles included in reports.
+REPORTED_QUANTILES = (0.5, 0.95, 0.99, 0.999)
+
+class QuantileSketch:
+    '''
+    Estimates quantiles of a stream of non-negative values in bounded memory, in the style of DDSketch.
+
+    Values are counted in buckets whose boundaries grow geometrically by gamma = (1 + a)/(1 - a), where a is
+    relativeAccuracy, and a quantile is reported as the midpoint of its bucket. Every estimate x of the q quantile
+    therefore satisfies |x - v| <= a*v, where v is the value of rank floor(q*(count - 1)) among the values added
+    (values at or below zeroThreshold are counted as 0 and reported exactly). The bound holds for any q whose value is
+    above the buckets merged away when more than maxBuckets buckets are needed, which only happens for a value range
+    wider than gamma**maxBuckets (a factor of about 1e17 with the defaults), and only affects the smallest values.
+
+    Sketches with the same relativeAccuracy can be merged, and the merged sketch has the same error bound.
+    '''
+    def __init__(self, relativeAccuracy=0.01, maxBuckets=2048, zeroThreshold=1e-12):
+        self.relativeAccuracy = relativeAccuracy
+        self.gamma = (1 + relativeAccuracy)/(1 - relativeAccuracy)
+        self.logGamma = log(self.gamma)
+        self.maxBuckets = maxBuckets
+        self.zeroThreshold = zeroThreshold
+        self.count = 0
+        self.zeroCount = 0
+        self.buckets = {} # Bucket i counts the values in (gamma**(i - 1), gamma**i].
+    def add(self, value):
+        self.count += 1
+        if value <= self.zeroThreshold:
+            self.zeroCount += 1
+            return
+        index = int(ceil(log(value)/self.logGamma))
+        buckets = self.buckets
+        if index in buckets:
+            buckets[index] += 1
+        else:
+            buckets[index] = 1
+            if len(buckets) > self.maxBuckets:
+                self.collapse()
+    def addValues(self, values):
+        '''
+        Adds the values of a NumPy array at once.
+        '''
+        self.count += len(values)
+        positive = values[values > self.zeroThreshold]
+        self.zeroCount += len(values) - len(positive)
+        indices, counts = numpy.unique(numpy.ceil(numpy.log(positive)/self.logGamma).astype(int), return_counts=True)
+        buckets = self.buckets
+        for index, count in zip(indices.tolist(), counts.tolist()):
+            buckets[index] = buckets.get(index, 0) + count
+        if len(buckets) > self.maxBuckets:
+            self.collapse()
+    def collapse(self):
+        # Fold the lowest buckets into one so the number of buckets stays at maxBuckets.
+        indices = sorted(self.buckets)
+        excess = len(indices) - self.maxBuckets
+        for index in indices[:excess]:
+            self.buckets[indices[excess]] += self.buckets.pop(index)
+    def merge(self, other):
+        if other.relativeAccuracy != self.relativeAccuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        self.count += other.count
+        self.zeroCount += other.zeroCount
+        for index, count in other.buckets.iteritems():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        if len(self.buckets) > self.maxBuckets:
+            self.collapse()
+    def getQuantile(self, q):
+        '''
+        Returns an estimate of the q quantile (0 <= q <= 1) of the values added.
+        '''
+        rank = int(q*(self.count - 1))
+        cumulative = self.zeroCount
+        if rank < cumulative:
+            return 0.0
+        for index in sorted(self.buckets):
+            cumulative += self.buckets[index]
+            if cumulative > rank:
+                return 2*self.gamma**index/(self.gamma + 1)
+    def getQuantiles(self, quantiles=REPORTED_QUANTILES):
+        return [self.getQuantile(q) for q in quantiles]
+
+class BatchMeans:
+    '''
+    Keeps the means of consecutive non-overlapping batches of a stream of correlated observations, such as the queuing
+    times of successive requests, in bounded memory. Batches start with batchSize observations; when maxBatches batches
+    are full, neighbouring batches are averaged in pairs and the batch size doubles.
+
+    Batch means are far less correlated than the observations themselves, so they give a valid confidence interval
+    for the mean of the stream (the method of non-overlapping batch means).
+    '''
+    def __init__(self, batchSize=5, maxBatches=1024):
+        self.batchSize = batchSize
+        self.maxBatches = maxBatches
+        self.means = []
+        self.currentSum = 0.0
+        self.currentCount = 0
+    def add(self, value):
+        self.currentSum += value
+        self.currentCount += 1
+        if self.currentCount == self.batchSize:
+            self.means.append(self.currentSum/self.batchSize)
+            self.currentSum = 0.0
+            self.currentCount = 0
+            if len(self.means) == self.maxBatches:
+                means = self.means
+                self.means = [(means[i] + means[i + 1])/2 for i in range(0, len(means), 2)]
+                self.batchSize *= 2
+    def addValues(self, values):
+        '''
+        Adds the values of a NumPy array in order, as add would.
+        '''
+        position = 0
+        while position < len(values):
+            if self.currentCount > 0 or len(values) - position < self.batchSize:
+                # Complete the current batch.
+                end = min(position + self.batchSize - self.currentCount, len(values))
+                for value in values[position:end].tolist():
+                    self.add(value)
+                position = end
+                continue
+            # Whole batches, up to the next pairing.
+            numBatches = min((len(values) - position)//self.batchSize, self.maxBatches - len(self.means))
+            end = position + numBatches*self.batchSize
+            self.means.extend(values[position:end].reshape(numBatches, self.batchSize).mean(axis=1).tolist())
+            position = end
+            if len(self.means) == self.maxBatches:
+                means = self.means
+                self.means = [(means[i] + means[i + 1])/2 for i in range(0, len(means), 2)]
+                self.batchSize *= 2
+    def getNumObservations(self):
+        '''
+        Returns the number of observations in full batches.
+        '''
+        return len(self.means)*self.batchSize
+    def getConfidenceInterval(self, confidence=0.95, numBatches=30, skipBatches=0):
+        '''
+        Returns (mean, halfWidth, numBatches) of the batch means confidence interval after the first skipBatches
+        batches. The batches are regrouped into at most numBatches equal batches, dropping the oldest leftover ones.
+        Returns None if there are fewer than 2 batches.
+        '''
+        means = numpy.asarray(self.means[skipBatches:])
+        groupSize = max(len(means)//numBatches, 1)
+        numGroups = len(means)//groupSize
+        if numGroups < 2:
+            return None
+        groups = means[len(means) - numGroups*groupSize:].reshape(numGroups, groupSize).mean(axis=1)
+        mean = groups.mean()
+        halfWidth = studentTQuantile((1 + confidence)/2, numGroups - 1)*groups.std(ddof=1)/sqrt(numGroups)
+        return mean, halfWidth, numGroups
+
+def mser(values, minRemaining=5):
+    '''
+    Returns the truncation point d chosen by the MSER rule (White, 1997): the number of initial values to discard
+    that minimizes the standard error of the mean of the rest, sum((values[i] - mean)**2 for i >= d)/(n - d)**2.
+    At least minRemaining values are kept. Applied to means of batches of 5 observations this is MSER-5. The rule
+    is only trusted when d is less than half the number of values.
+    '''
+    values = numpy.asarray(values, dtype=float)
+    n = len(values)
+    remaining = numpy.arange(n, 0, -1, dtype=float) # n - d
+    sums = numpy.cumsum(values[::-1])[::-1]
+    squaredSums = numpy.cumsum((values*values)[::-1])[::-1]
+    squaredErrors = squaredSums - sums*sums/remaining
+    statistics = squaredErrors/remaining**2
+    return int(numpy.argmin(statistics[:max(n - minRemaining + 1, 1)]))
+
+class WarmupDetector:
+    '''
+    Detects the end of the initial transient of a stream of observations with MSER-5. Observations are kept as batch
+    means in a bounded BatchMeans buffer, and MSER is run each time the number of observations doubles from
+    5*minBatches. The warm-up is over when MSER truncates less than half of the batches, since a truncation point in the
+    second half means the transient is still going on; truncatedObservations is then the number of observations MSER
+    considers part of the transient and cutoffTime the time of the last of them (0 if there are none).
+
+    If no end is detected by deadline, the warm-up is taken to end at the first observation from then on:
+    truncatedObservations stays None and cutoffTime is the time of that observation.
+    '''
+    def __init__(self, minBatches=64, maxBatches=1024, deadline=float("inf")):
+        self.batchMeans = BatchMeans(5, maxBatches)
+        self.batchEndTimes = [] # The time of the last observation of every batch.
+        self.nextCheck = 5*minBatches
+        self.deadline = deadline
+        self.truncatedObservations = None
+        self.cutoffTime = None
+    def add(self, value, time=0.0):
+        '''
+        Adds an observation made at time and returns True if the end of the warm-up has just been detected.
+        '''
+        batchMeans = self.batchMeans
+        batchSize = batchMeans.batchSize
+        batchMeans.add(value)
+        if batchMeans.currentCount == 0:
+            self.batchEndTimes.append(time)
+            if batchMeans.batchSize != batchSize:
+                # The batches were averaged in pairs, so a pair ends when its second batch does.
+                self.batchEndTimes = self.batchEndTimes[1::2]
+            if self.cutoffTime is None and batchMeans.getNumObservations() >= self.nextCheck:
+                self.nextCheck *= 2
+                truncation = mser(batchMeans.means)
+                if truncation < len(batchMeans.means)//2:
+                    self.truncatedObservations = truncation*batchMeans.batchSize
+                    self.cutoffTime = self.batchEndTimes[truncation - 1] if truncation else 0.0
+                    return True
+        if self.cutoffTime is None and time >= self.deadline:
+            self.cutoffTime = time
+            return True
+        return False
@@ -0,0 +1,169 @@
+'''
+Sweep
+
+This module runs the simulator over every point of a grid of arrival rates, average service times and capacities.
+
+Instead of copying the Controller(...), runSimulation(...), printReport() block once per parameter choice, runSweep
+takes the grid, hands the points out to a pool of worker processes and returns the Monitor summary of every point as
+columns (one NumPy array per quantity), which can also be written to a CSV file.
+
+The summary of every point is cached on disk under a hash of its parameters, seed and the source code of the simulator,
+which is this module and every module of the package it imports, directly or not. Running a sweep again only
+simulates the points that were added to the grid, and changing any of those modules invalidates the whole cache.
+'''
+from __future__ import division #Required for floating point division.
+import ast
+import hashlib
+import itertools
+import json
+import os
+from multiprocessing import Pool
+import numpy
+import QueueEngine
+from NumberGenerator import Exponential, Deterministic
+
+DEFAULT_CACHE_DIRECTORY = ".sweepcache"
+
+# The module whose imports determine the simulation results.
+SWEEP_MODULE = "Sweep.py"
+
+def getSimulationModules(directory):
+    '''
+    Returns the sorted file names of SWEEP_MODULE and the modules in directory it imports, directly or not.
+    '''
+    modules = set()
+    pending = [SWEEP_MODULE]
+    while pending:
+        name = pending.pop()
+        if name in modules:
+            continue
+        modules.add(name)
+        with open(os.path.join(directory, name), "rb") as sourceFile:
+            tree = ast.parse(sourceFile.read(), name)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                imported = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module is not None:
+                imported = [node.module]
+            else:
+                continue
+            for module in imported:
+                fileName = module.split(".")[0] + ".py"
+                if os.path.exists(os.path.join(directory, fileName)):
+                    pending.append(fileName)
+    return sorted(modules)
+
+def getCodeVersion(directory=None):
+    '''
+    Returns a hash of the source code of the simulation modules in directory, by default the directory of this module.
+    '''
+    if directory is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for name in getSimulationModules(directory):
+        digest.update(name)
+        with open(os.path.join(directory, name), "rb") as sourceFile:
+            digest.update(sourceFile.read())
+    return digest.hexdigest()
+
+def getPointKey(point, codeVersion):
+    '''
+    Returns the name under which the summary of point is cached.
+    '''
+    description = json.dumps([sorted(point.items()), codeVersion])
+    return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+def runPoint(point):
+    '''
+    Simulates one grid point and returns its Monitor summary. point is a dictionary of the point's parameters.
+    '''
+    if point["serviceType"] == "D":
+        serviceDistribution = Deterministic(point["averageServiceTime"])
+    else:
+        serviceDistribution = Exponential(1/point["averageServiceTime"])
+    controller = QueueEngine.Controller(Exponential(point["arrivalRate"]), serviceDistribution, point["simulationTime"],
+                                        capacity=point["capacity"], servers=point["servers"], seed=point["seed"],
+                                        timeWeighted=True)
+    controller.runSimulation(point["monitorStartingTime"])
+    return controller.monitor.getSummary()
+
+def runSweep(arrivalRates, averageServiceTimes, capacities, simulationTime, monitorStartingTime, seed=0, servers=1,
+             serviceType="M", cacheDirectory=DEFAULT_CACHE_DIRECTORY, outputFile=None, processes=None):
+    '''
+    Simulates every combination of arrivalRates, averageServiceTimes and capacities (None for no limit) with
+    exponential interarrival times and exponential (serviceType "M") or deterministic (serviceType "D") service times.
+    Points with a cached summary are not simulated again; pass cacheDirectory=None to disable the cache.
+
+    Returns a dictionary from column name to NumPy array with one entry per point: the parameters arrivalRate,
+    averageServiceTime and capacity (NaN for no limit) followed by the Monitor summary quantities (NaN where a point
+    does not have a quantity). If outputFile is given the columns are also written to it as CSV.
+    '''
+    points = []
+    for arrivalRate, averageServiceTime, capacity in itertools.product(arrivalRates, averageServiceTimes, capacities):
+        points.append({"arrivalRate": arrivalRate, "averageServiceTime": averageServiceTime, "capacity": capacity,
+                       "servers": servers, "serviceType": serviceType, "simulationTime": simulationTime,
+                       "monitorStartingTime": monitorStartingTime, "seed": seed})
+
+    summaries = [None]*len(points)
+    codeVersion = getCodeVersion()
+    keys = [getPointKey(point, codeVersion) for point in points]
+    if cacheDirectory is not None:
+        if not os.path.isdir(cacheDirectory):
+            os.makedirs(cacheDirectory)
+        for i, key in enumerate(keys):
+            path = os.path.join(cacheDirectory, key + ".json")
+            if os.path.exists(path):
+                with open(path) as cacheFile:
+                    summaries[i] = json.load(cacheFile)
+
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    if missing:
+        if processes == 1:
+            results = map(runPoint, [points[i] for i in missing])
+        else:
+            pool = Pool(processes)
+            try:
+                results = pool.map(runPoint, [points[i] for i in missing], chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+        for i, summary in zip(missing, results):
+            summaries[i] = summary
+            if cacheDirectory is not None:
+                with open(os.path.join(cacheDirectory, keys[i] + ".json"), "w") as cacheFile:
+                    json.dump(summary, cacheFile)
+
+    columns = makeColumns(points, summaries)
+    if outputFile is not None:
+        writeColumns(outputFile, columns)
+    return columns
+
+# Parameters included as columns in the sweep results, in order.
+PARAMETER_COLUMNS = ["arrivalRate", "averageServiceTime", "capacity"]
+
+def makeColumns(points, summaries):
+    names = sorted(set(name for summary in summaries for name in summary))
+    columns = {}
+    for name in PARAMETER_COLUMNS:
+        columns[name] = numpy.array([numpy.nan if point[name] is None else point[name] for point in points], dtype=float)
+    for name in names:
+        columns[name] = numpy.array([summary.get(name, numpy.nan) for summary in summaries], dtype=float)
+    return columns
+
+def getColumnNames(columns):
+    return PARAMETER_COLUMNS + sorted(name for name in columns if name not in PARAMETER_COLUMNS)
+
+def writeColumns(path, columns):
+    '''
+    Writes columns to path as CSV with a header line of column names.
+    '''
+    names = getColumnNames(columns)
+    table = numpy.column_stack([columns[name] for name in names])
+    numpy.savetxt(path, table, delimiter=",", header=",".join(names), comments="")
+
+def readColumns(path):
+    '''
+    Reads columns written by writeColumns.
+    '''
+    table = numpy.genfromtxt(path, delimiter=",", names=True)
+    return dict((name, numpy.atleast_1d(table[name])) for name in table.dtype.names)
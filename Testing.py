@@ -3,6 +3,777 @@ Created on Feb 14, 2013
 
 @author: adrielklein
 '''
+from __future__ import division
+import math
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from StringIO import StringIO
 
+import numpy
 
+import MM1Queue
+import MM1KQueue
+import MD1KQueue
+import NumberGenerator
+import QueueEngine
+import Analytic
+import Sweep
+from Checkpoint import saveCheckpoint, loadCheckpoint, forkCheckpoint
+from Replay import Recorded, CsvSource, BinarySource
+from Network import Network, Station
+from Arrivals import NonHomogeneousPoisson, piecewiseConstant
+from RareEvents import estimateBlockingProbability
+import CompiledEngine
+from Profiling import Profiler, Instrumented
+from Disciplines import LifoQueue, PriorityQueue, ShortestJobFirstQueue, ProcessorSharingController
+from Trace import TraceSink, readTrace, analyzeTrace, getQueueLengthSeries, getThroughput
+from EventCalendar import NextEventCalendar, HeapCalendar, CalendarQueue
+from Analytic import erlangB, erlangC
+from NumberGenerator import Exponential, Deterministic, Erlang, VariateStream, substream
+from VarianceReduction import compareConfigurations, controlVariateEstimate, getHalfWidth
+from LindleyQueue import simulateLindley, lindleyWaitingTimes
+from Replications import runReplications, ReplicationSummary
+from Statistics import studentTQuantile, RunningStatistics, TimeWeightedStatistics, QuantileSketch, BatchMeans, WarmupDetector, mser
 
+def getReport(reporter):
+    '''
+    Returns what reporter.printReport() prints.
+    '''
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        reporter.printReport()
+        return sys.stdout.getvalue()
+    finally:
+        sys.stdout = stdout
+
+class LindleyQueueTest(unittest.TestCase):
+    def testAgreesWithEventDrivenController(self):
+        controller = MM1Queue.Controller(50, 0.015, 2100, seed=1)
+        controller.runSimulation(100)
+        monitor = controller.monitor
+        eventDrivenWaitingTime = monitor.waitingTimeStatistics.getMean()
+        eventDrivenQueuingTime = monitor.queuingTimeStatistics.getMean()
+        eventDrivenRequestsInSystem = monitor.requestsInSystemStatistics.getMean()
+
+        summary = simulateLindley(50, 0.015, monitor.numRequests, warmupRequests=5000, seed=2)
+        self.assertAlmostEqual(summary.getAverageWaitingTime()/eventDrivenWaitingTime, 1, delta=0.1)
+        self.assertAlmostEqual(summary.getAverageQueuingTime()/eventDrivenQueuingTime, 1, delta=0.1)
+        self.assertAlmostEqual(summary.getAverageRequestsInSystem()/eventDrivenRequestsInSystem, 1, delta=0.1)
+        # Both should be close to the M/M/1 waiting time rho/(mu - lambda) = 0.045.
+        self.assertAlmostEqual(summary.getAverageWaitingTime(), 0.045, delta=0.0045)
+
+    def testRecursionCarriesAcrossBlocks(self):
+        randomState = numpy.random.RandomState(2)
+        serviceTimes = randomState.standard_exponential(1000) * 0.9
+        interarrivalTimes = randomState.standard_exponential(1000)
+        expected = [0.0]
+        for n in range(1, 1000):
+            expected.append(max(0, expected[-1] + serviceTimes[n-1] - interarrivalTimes[n]))
+        first = lindleyWaitingTimes(0, 0, serviceTimes[:400], interarrivalTimes[:400])
+        second = lindleyWaitingTimes(first[-1], serviceTimes[399], serviceTimes[400:], interarrivalTimes[400:])
+        numpy.testing.assert_allclose(numpy.concatenate([first, second]), expected, atol=1e-9)
+
+class ReplicationsTest(unittest.TestCase):
+    def testConfidenceIntervalCoversTheory(self):
+        summary = runReplications(MM1Queue.Controller, (50, 0.01, 300), 50, 8, seed=10, processes=2)
+        self.assertEqual(summary.numReplications, 8)
+        lower, upper = summary.getConfidenceInterval("averageQueuingTime")
+        # M/M/1 queuing time is 1/(mu - lambda) = 0.02.
+        self.assertTrue(lower < 0.02 < upper)
+
+    def testOneReplicationHasNoInterval(self):
+        summary = runReplications(MM1Queue.Controller, (50, 0.01, 50), 10, 1, processes=1)
+        self.assertIsNone(summary.getConfidenceInterval("averageQueuingTime"))
+        self.assertIsNotNone(summary.getMean("averageQueuingTime"))
+        self.assertIn("no confidence interval", getReport(summary))
+
+    def testUnmonitoredValuesAreDropped(self):
+        summary = runReplications(MM1Queue.Controller, (50, 0.01, 5), 10, 3, processes=1)
+        self.assertIsNone(summary.getMean("averageQueuingTime"))
+        self.assertIn("Number of Replications: 3", getReport(summary))
+        summary = ReplicationSummary([{"a": 1.0, "b": 2.0}, {"a": None, "b": 4.0}, {"a": 3.0}])
+        self.assertEqual(summary.getNames(), ["a"])
+        self.assertEqual(summary.getMean("a"), 2.0)
+        self.assertAlmostEqual(summary.getStandardDeviation("a"), math.sqrt(2))
+
+    def testStudentTQuantile(self):
+        self.assertAlmostEqual(studentTQuantile(0.975, 1), 12.706, places=3)
+        self.assertAlmostEqual(studentTQuantile(0.975, 5), 2.5706, places=3)
+        self.assertAlmostEqual(studentTQuantile(0.975, 30), 2.042, places=3)
+
+class RunningStatisticsTest(unittest.TestCase):
+    def testMergedStatisticsMatchNumpy(self):
+        values = numpy.random.RandomState(4).lognormal(0, 1, 1000)
+        first = RunningStatistics()
+        second = RunningStatistics()
+        for value in values[:300]:
+            first.add(value)
+        for value in values[300:]:
+            second.add(value)
+        first.merge(second)
+        self.assertEqual(first.count, 1000)
+        self.assertAlmostEqual(first.getMean(), values.mean())
+        self.assertAlmostEqual(first.getVariance(), values.var())
+        self.assertEqual(first.minimum, values.min())
+        self.assertEqual(first.maximum, values.max())
+
+    def testMonitorKeepsSamplesOnlyWhenAsked(self):
+        controller = MM1Queue.Controller(50, 0.015, 50, seed=5)
+        controller.runSimulation(10)
+        self.assertFalse(hasattr(controller.monitor, "waitingTimes"))
+        controller = MM1Queue.Controller(50, 0.015, 50, seed=5, keepSamples=True)
+        controller.runSimulation(10)
+        monitor = controller.monitor
+        self.assertEqual(len(monitor.waitingTimes), monitor.numRequests)
+        self.assertAlmostEqual(sum(monitor.waitingTimes)/monitor.numRequests, monitor.waitingTimeStatistics.getMean())
+
+class TimeWeightedMonitorTest(unittest.TestCase):
+    def testOccupancyDistributionIsGeometric(self):
+        controller = MM1Queue.Controller(50, 0.01, 2100, seed=6, timeWeighted=True)
+        controller.runSimulation(100)
+        monitor = controller.monitor
+        self.assertEqual(monitor.numSnapshots, 0)
+        # M/M/1 with rho = 0.5: P(N = k) = 0.5**(k + 1) and the mean number in system is 1.
+        distribution = monitor.getOccupancyDistribution()
+        for k in range(4):
+            self.assertAlmostEqual(distribution[k], 0.5**(k + 1), delta=0.01)
+        self.assertAlmostEqual(sum(distribution), 1)
+        self.assertAlmostEqual(monitor.requestsInSystemStatistics.getMean(), 1, delta=0.05)
+        self.assertAlmostEqual(monitor.requestsWaitingStatistics.getMean(), 0.5, delta=0.05)
+
+    def testTimeWeightedStatisticsIgnoreTimeBeforeStart(self):
+        statistics = TimeWeightedStatistics(10)
+        statistics.update(5, 3)
+        statistics.update(12, 1)
+        statistics.update(16, 0)
+        # Level 3 from 10 to 12 and level 1 from 12 to 16.
+        self.assertEqual(statistics.duration, 6)
+        self.assertAlmostEqual(statistics.getMean(), 10/6)
+        self.assertEqual(statistics.getDistribution(), [0, 4/6, 0, 2/6])
+
+    def testAveragesCoverWholeMonitoredPeriod(self):
+        # This run ends with a rejected birth, which changes no state.
+        controller = MM1KQueue.Controller(80, 0.02, 30, seed=7, timeWeighted=True)
+        controller.runSimulation(5)
+        monitor = controller.monitor
+        self.assertAlmostEqual(monitor.requestsInSystemStatistics.duration, monitor.observedTime, places=12)
+
+class QuantileSketchTest(unittest.TestCase):
+    def testMergedSketchIsWithinRelativeAccuracy(self):
+        values = numpy.random.RandomState(7).lognormal(0, 2, 20000)
+        values[:5000] = 0
+        first = QuantileSketch()
+        second = QuantileSketch()
+        for value in values[:8000]:
+            first.add(value)
+        for value in values[8000:]:
+            second.add(value)
+        first.merge(second)
+        values.sort()
+        for q in (0, 0.1, 0.5, 0.95, 0.99, 0.999, 1):
+            exact = values[int(q*(len(values) - 1))]
+            self.assertTrue(abs(first.getQuantile(q) - exact) <= 0.01*exact)
+
+    def testQueuingTimePercentilesMatchTheory(self):
+        controller = MM1Queue.Controller(50, 0.01, 2100, seed=8, timeWeighted=True)
+        controller.runSimulation(100)
+        sketch = controller.monitor.queuingTimeQuantiles
+        # M/M/1 queuing times are exponential with rate mu - lambda = 50.
+        for q in (0.5, 0.95, 0.99):
+            self.assertAlmostEqual(sketch.getQuantile(q)/(-math.log(1 - q)/50), 1, delta=0.05)
+
+class QueueEngineTest(unittest.TestCase):
+    def testFiniteCapacityRejectionProbability(self):
+        controller = MM1KQueue.Controller(60, 0.02, 2100, seed=9, timeWeighted=True)
+        controller.runSimulation(100)
+        # M/M/1/5 with rho = 1.2 rejects with probability rho**5*(1 - rho)/(1 - rho**6).
+        rho = 1.2
+        self.assertAlmostEqual(controller.monitor.getRejectionProbability(), rho**5*(1 - rho)/(1 - rho**6), delta=0.01)
+        self.assertEqual(len(controller.monitor.getOccupancyDistribution()), MM1KQueue.CAPACITY + 1)
+
+    def testGeneralServiceMatchesPollaczekKhinchine(self):
+        # M/G/1 with Erlang-2 service: Wq = lambda*E[S**2]/(2*(1 - rho)) with E[S**2] = 1.5*E[S]**2.
+        controller = QueueEngine.Controller(Exponential(50), Erlang(2, 2/0.014), 2100, seed=10)
+        controller.runSimulation(100)
+        rho = 50*0.014
+        self.assertAlmostEqual(controller.monitor.getMeanOfWaitingTime()/(50*1.5*0.014**2/(2*(1 - rho))), 1, delta=0.1)
+
+    def testShimsImportWithoutSimulating(self):
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            for module in (MM1Queue, MM1KQueue, MD1KQueue):
+                reload(module)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(output, "")
+
+    def testShimsMatchEngine(self):
+        for module, serviceDistribution, capacity in ((MM1Queue, Exponential(1/0.015), None),
+                                                      (MM1KQueue, Exponential(1/0.015), MM1KQueue.CAPACITY),
+                                                      (MD1KQueue, Deterministic(0.015), MD1KQueue.CAPACITY)):
+            shim = module.Controller(60, 0.015, 300, seed=13)
+            shim.runSimulation(20)
+            engine = QueueEngine.Controller(Exponential(60), serviceDistribution, 300, capacity=capacity, seed=13)
+            engine.runSimulation(20)
+            self.assertEqual(shim.monitor.getSummary(), engine.monitor.getSummary())
+
+    def testRunThatMonitorsNothing(self):
+        for timeWeighted in (False, True):
+            controller = QueueEngine.Controller(Exponential(50), Exponential(100), 10, capacity=5, seed=14,
+                                                timeWeighted=timeWeighted)
+            controller.runSimulation(20)
+            monitor = controller.monitor
+            summary = monitor.getSummary()
+            for name in ("averageRequestsInSystem", "averageQueuingTime", "averageServiceTime", "waitingProbability",
+                         "averageServerUtilization"):
+                self.assertIsNone(summary[name])
+            self.assertIsNone(monitor.getRejectionProbability())
+            self.assertEqual(Analytic.getRelativeErrors(summary, Analytic.solve("M/M/1/K", 50, 0.01, capacity=5)), {})
+
+class MultiServerTest(unittest.TestCase):
+    def testWaitingProbabilityMatchesErlangC(self):
+        controller = QueueEngine.Controller(Exponential(8), Exponential(1), 5100, servers=10, seed=11)
+        controller.runSimulation(100)
+        monitor = controller.monitor
+        self.assertAlmostEqual(monitor.getWaitingProbability(), erlangC(10, 8), delta=0.03)
+        self.assertAlmostEqual(monitor.getAverageServerUtilization(), 0.8, delta=0.02)
+        self.assertEqual(len(monitor.getServerUtilizations()), 10)
+
+    def testRejectionProbabilityMatchesErlangB(self):
+        controller = QueueEngine.Controller(Exponential(8), Exponential(1), 5100, capacity=10, servers=10, seed=12)
+        controller.runSimulation(100)
+        self.assertAlmostEqual(controller.monitor.getRejectionProbability(), erlangB(10, 8), delta=0.015)
+        self.assertEqual(controller.monitor.getWaitingProbability(), 0)
+
+class AnalyticTest(unittest.TestCase):
+    def testClosedForms(self):
+        solution = Analytic.solve("M/M/1", 50, 0.015)
+        self.assertAlmostEqual(solution.requestsInSystem, 0.75/0.25)
+        self.assertAlmostEqual(solution.waitingTime, 0.045)
+        # A large capacity or a single server reduces to the simpler models.
+        self.assertAlmostEqual(Analytic.solve("M/M/1/K", 50, 0.015, 200).queuingTime, solution.queuingTime)
+        self.assertAlmostEqual(Analytic.solve("M/D/1/K", 50, 0.015, 200).waitingTime,
+                               Analytic.solve("M/D/1", 50, 0.015).waitingTime)
+        self.assertAlmostEqual(Analytic.solve("M/M/c/K", 8, 1, 10, 10).rejectionProbability, erlangB(10, 8))
+        self.assertAlmostEqual(Analytic.solve("M/M/c", 8, 1, servers=10).waitingProbability, erlangC(10, 8))
+        self.assertRaises(ValueError, Analytic.solve, "M/M/1", 60, 0.02)
+
+    def testDeterministicServiceMatchesSimulation(self):
+        controller = MD1KQueue.Controller(60, 0.015, 2100, seed=13, timeWeighted=True)
+        controller.runSimulation(100)
+        errors = Analytic.getRelativeErrors(controller.monitor.getSummary(), Analytic.solve("M/D/1/K", 60, 0.015, 5))
+        self.assertEqual(len(errors), 7)
+        for name, error in errors.items():
+            self.assertTrue(abs(error) < 0.05, name)
+
+class SweepTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testAddedPointsAreTheOnlyOnesSimulated(self):
+        cacheDirectory = os.path.join(self.directory, "cache")
+        first = Sweep.runSweep([50], [0.01, 0.015], [None], 60, 10, cacheDirectory=cacheDirectory, processes=1)
+        self.assertEqual(len(os.listdir(cacheDirectory)), 2)
+        outputFile = os.path.join(self.directory, "sweep.csv")
+        second = Sweep.runSweep([50, 60], [0.01, 0.015], [None], 60, 10, cacheDirectory=cacheDirectory,
+                                outputFile=outputFile, processes=2)
+        self.assertEqual(len(os.listdir(cacheDirectory)), 4)
+        numpy.testing.assert_array_equal(second["averageQueuingTime"][:2], first["averageQueuingTime"])
+        written = Sweep.readColumns(outputFile)
+        numpy.testing.assert_array_equal(written["arrivalRate"], [50, 50, 60, 60])
+        numpy.testing.assert_allclose(written["averageQueuingTime"], second["averageQueuingTime"])
+
+    def testCapacityColumn(self):
+        columns = Sweep.runSweep([60], [0.02], [None, 5], 60, 10, cacheDirectory=None, processes=1)
+        self.assertTrue(numpy.isnan(columns["capacity"][0]))
+        self.assertTrue(numpy.isnan(columns["rejectionProbability"][0]))
+        self.assertTrue(columns["rejectionProbability"][1] > 0)
+
+    def testChangingAnImportedModuleInvalidatesCache(self):
+        source = os.path.dirname(os.path.abspath(Sweep.__file__))
+        modules = Sweep.getSimulationModules(source)
+        self.assertIn("EventCalendar.py", modules)
+        self.assertIn("Sweep.py", modules)
+        for name in modules:
+            shutil.copy(os.path.join(source, name), self.directory)
+        point = {"arrivalRate": 50, "averageServiceTime": 0.015}
+        key = Sweep.getPointKey(point, Sweep.getCodeVersion(self.directory))
+        with open(os.path.join(self.directory, "EventCalendar.py"), "a") as sourceFile:
+            sourceFile.write("\n")
+        self.assertNotEqual(Sweep.getPointKey(point, Sweep.getCodeVersion(self.directory)), key)
+
+class EventCalendarTest(unittest.TestCase):
+    def testCalendarsPopInTimeOrder(self):
+        for calendarClass in (NextEventCalendar, HeapCalendar, CalendarQueue):
+            calendar = calendarClass(500)
+            randomState = numpy.random.RandomState(14)
+            popped = []
+            for event in range(500):
+                calendar.schedule(randomState.uniform(0, 10), event)
+            # Hold model: keep rescheduling the earliest event so the calendar resizes and wraps around.
+            for i in range(5000):
+                time, event = calendar.pop()
+                popped.append(time)
+                calendar.schedule(time + randomState.exponential(1), event)
+            while len(calendar) > 0:
+                popped.append(calendar.pop()[0])
+            self.assertEqual(len(popped), 5500)
+            self.assertEqual(popped, sorted(popped))
+
+    def testCalendarsGiveTheSameSimulation(self):
+        summaries = []
+        for calendarClass in (NextEventCalendar, HeapCalendar, CalendarQueue):
+            controller = QueueEngine.Controller(Exponential(8), Exponential(1), 200, servers=3, seed=15,
+                                                calendar=calendarClass)
+            controller.runSimulation(10)
+            summaries.append(controller.monitor.getSummary())
+        self.assertEqual(summaries[0], summaries[1])
+        self.assertEqual(summaries[0], summaries[2])
+
+class RequestStoreTest(unittest.TestCase):
+    def testSlotsAreReusedAndStoreGrows(self):
+        store = QueueEngine.RequestStore(initialCapacity=2)
+        first = store.add(1.0)
+        second = store.add(2.0)
+        third = store.add(3.0)
+        self.assertEqual(len(store.birthTimes), 4)
+        self.assertEqual(len(store), 3)
+        request = store.getRequest(second)
+        request.setServiceTime(2.5)
+        request.setDeathTime(4.0)
+        self.assertEqual(request.getWaitingTime(), 0.5)
+        self.assertEqual(request.getQueuingTime(), 2.0)
+        store.release(second)
+        self.assertEqual(store.add(5.0), second)
+        self.assertEqual(store.getRequest(third).birthTime, 3.0)
+        self.assertEqual(store.getRequest(first).birthTime, 1.0)
+
+class WarmupTest(unittest.TestCase):
+    def testMserTruncatesTransient(self):
+        randomState = numpy.random.RandomState(3)
+        values = randomState.normal(0, 1, 2000)
+        values[:200] += numpy.linspace(20, 0, 200)
+        self.assertAlmostEqual(mser(values), 200, delta=20)
+        self.assertEqual(mser(randomState.normal(0, 1, 2000)) < 100, True)
+
+    def testBatchMeansIntervalCoversIndependentMean(self):
+        batchMeans = BatchMeans()
+        for value in numpy.random.RandomState(4).exponential(1.0, 100000):
+            batchMeans.add(value)
+        mean, halfWidth, numBatches = batchMeans.getConfidenceInterval()
+        self.assertEqual(numBatches >= 30, True)
+        self.assertLess(abs(mean - 1), 3*halfWidth)
+
+    def testDetectedWarmupGivesIntervalCoveringTheory(self):
+        controller = MM1Queue.Controller(50, 0.015, 2000, seed=5, timeWeighted=True)
+        controller.runSimulation()
+        monitor = controller.monitor
+        self.assertLess(0, monitor.warmupCutoffTime)
+        self.assertLess(monitor.warmupCutoffTime, 500)
+        mean, halfWidth, numBatches = monitor.getQueuingTimeConfidenceInterval()
+        self.assertLess(abs(mean - Analytic.solve("M/M/1", 50, 0.015).queuingTime), 1.5*halfWidth)
+        self.assertLess(monitor.getEffectiveSampleSize(), monitor.queuingTimeStatistics.count)
+        self.assertIn("warmupCutoffTime", monitor.getSummary())
+
+    def testDetectsTransientLongerThanBatchBuffer(self):
+        values = numpy.random.RandomState(0).normal(0, 0.1, 50000)
+        values[:2000] += numpy.linspace(10, 0, 2000)
+        detector = WarmupDetector(minBatches=16, maxBatches=64)
+        detected = [i for i, value in enumerate(values) if detector.add(value, float(i))]
+        # The batches have been paired several times before the transient is over.
+        self.assertEqual(len(detected), 1)
+        self.assertGreater(detected[0], 2000)
+        self.assertGreater(detector.batchMeans.batchSize, 5*4)
+        self.assertAlmostEqual(detector.cutoffTime, 2000, delta=200)
+        self.assertEqual(detector.cutoffTime, detector.truncatedObservations - 1)
+
+    def testHighLoadStartsMonitoring(self):
+        controller = MM1Queue.Controller(66, 0.015, 2000, seed=3)
+        controller.runSimulation()
+        monitor = controller.monitor
+        self.assertGreater(monitor.numRequests, 0)
+        self.assertIsNotNone(monitor.warmupTruncatedObservations)
+        self.assertLess(monitor.warmupCutoffTime, monitor.warmupDetectionTime)
+        self.assertIn("averageQueuingTime", monitor.getSummary())
+
+    def testMonitoringStartsAtHalfTimeWithoutDetection(self):
+        controller = MM1Queue.Controller(66, 0.015, 100, seed=3)
+        controller.runSimulation()
+        monitor = controller.monitor
+        self.assertIsNone(monitor.warmupTruncatedObservations)
+        self.assertGreaterEqual(monitor.warmupCutoffTime, 50)
+        self.assertGreater(monitor.numRequests, 0)
+
+class SequentialStoppingTest(unittest.TestCase):
+    def testStopsWhenPrecisionIsReached(self):
+        controller = MM1Queue.Controller(50, 0.01, 10**6, seed=6)
+        controller.runSimulation(100, relativePrecision=0.05)
+        monitor = controller.monitor
+        self.assertLess(controller.time, 10**6)
+        self.assertLessEqual(monitor.getRelativePrecision(), 0.05)
+        summary = monitor.getSummary()
+        self.assertEqual(summary["numEvents"], monitor.numEvents)
+        self.assertLess(abs(summary["averageQueuingTime"]/Analytic.solve("M/M/1", 50, 0.01).queuingTime - 1), 0.15)
+
+    def testEventCapStopsUnreachablePrecision(self):
+        controller = MM1Queue.Controller(50, 0.01, 10**6, seed=7)
+        controller.runSimulation(10, relativePrecision=1e-6, maxEvents=25000)
+        self.assertEqual(controller.monitor.numEvents, 25000)
+        self.assertLess(1e-6, controller.monitor.getRelativePrecision())
+
+class VarianceReductionTest(unittest.TestCase):
+    def testAntitheticStreamUsesComplementaryUniforms(self):
+        distribution = Exponential(2.0)
+        values = VariateStream(distribution, substream(1, 0)).block(1000)
+        antitheticValues = VariateStream(distribution, substream(1, 0), antithetic=True).block(1000)
+        numpy.testing.assert_allclose(numpy.exp(-2*values) + numpy.exp(-2*antitheticValues), 1)
+        self.assertRaises(ValueError, VariateStream, Erlang(2, 1.0), substream(1, 0), antithetic=True)
+
+    def testAntitheticExponentialValueSkipsZeroDraw(self):
+        class Draws:
+            def __init__(self, values):
+                self.values = list(values)
+            def uniform(self, low, high):
+                return self.values.pop(0)
+        generator = NumberGenerator.random
+        NumberGenerator.random = Draws([0.0, 0.5])
+        try:
+            self.assertAlmostEqual(NumberGenerator.exponentialValue(2.0, antithetic=True), math.log(2)/2)
+        finally:
+            NumberGenerator.random = generator
+
+    def testAntitheticStreamSkipsZeroUniform(self):
+        class ZeroState:
+            def random_sample(self, size):
+                return numpy.zeros(size)
+        values = VariateStream(Exponential(2.0), ZeroState(), antithetic=True).block(3)
+        self.assertTrue(numpy.all(numpy.isfinite(values)))
+        numpy.testing.assert_allclose(values, 53*math.log(2)/2)
+
+    def testControlVariateRemovesCorrelatedNoise(self):
+        randomState = numpy.random.RandomState(8)
+        controls = randomState.normal(1, 1, 200)
+        values = 3 + 2*(controls - 1) + randomState.normal(0, 0.1, 200)
+        mean, halfWidth, coefficient = controlVariateEstimate(values, controls, 1)
+        self.assertAlmostEqual(coefficient, 2, delta=0.05)
+        self.assertLess(abs(mean - 3), halfWidth*3)
+        self.assertLess(halfWidth, 0.05)
+
+    def testCommonRandomNumbersNarrowDifferenceInterval(self):
+        arguments = (40, 0.015, 60)
+        otherArguments = (40, 0.0125, 60)
+        independent = compareConfigurations(MM1Queue.Controller, arguments, otherArguments, 10, 8,
+                                            commonRandomNumbers=False, processes=1)
+        common = compareConfigurations(MM1Queue.Controller, arguments, otherArguments, 10, 8, processes=1)
+        self.assertLess(getHalfWidth(common, "averageQueuingTime"), getHalfWidth(independent, "averageQueuingTime"))
+        self.assertLess(common.getMean("averageQueuingTime"), 0)
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "checkpoint.npz")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testRestoredSimulationContinuesExactly(self):
+        for controllerClass, options in [(MM1Queue.Controller, {"timeWeighted": True}), (MM1KQueue.Controller, {})]:
+            uninterrupted = controllerClass(60, 0.015, 200, seed=3, **options)
+            uninterrupted.runSimulation(50)
+            paused = controllerClass(60, 0.015, 120, seed=3, **options)
+            paused.runSimulation(50)
+            saveCheckpoint(paused, self.path)
+            restored = controllerClass(60, 0.015, 200, seed=4, **options)
+            loadCheckpoint(restored, self.path)
+            restored.resumeSimulation()
+            self.assertEqual(restored.time, uninterrupted.time)
+            self.assertEqual(restored.monitor.getSummary(), uninterrupted.monitor.getSummary())
+
+    def testForksDiverge(self):
+        controller = MM1Queue.Controller(60, 0.015, 50, seed=3)
+        controller.runSimulation(10)
+        saveCheckpoint(controller, self.path)
+        results = []
+        for seed in (1, 2):
+            branch = MM1Queue.Controller(60, 0.015, 100, seed=seed)
+            forkCheckpoint(branch, self.path, seed)
+            branch.resumeSimulation()
+            self.assertLess(controller.monitor.numRequests, branch.monitor.numRequests)
+            results.append(branch.monitor.getMeanOfQueuingTime())
+        self.assertNotEqual(results[0], results[1])
+        self.assertRaises(ValueError, loadCheckpoint, QueueEngine.Controller(Exponential(60), Exponential(60), 100,
+                                                                              servers=2), self.path)
+
+class TraceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "requests.trace")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testAnalyzerRebuildsMonitor(self):
+        sink = TraceSink(self.path, bufferSize=1000)
+        controller = MM1KQueue.Controller(60, 0.015, 300, seed=3, timeWeighted=True, trace=sink)
+        controller.runSimulation(50)
+        sink.close(controller)
+        records = readTrace(self.path)
+        monitor = analyzeTrace(records, 50, controller.time, capacity=MM1KQueue.CAPACITY)
+        expected = controller.monitor.getSummary()
+        summary = monitor.getSummary()
+        self.assertEqual(sorted(summary), sorted(expected))
+        for name in expected:
+            self.assertAlmostEqual(summary[name], expected[name], delta=1e-9*abs(expected[name]))
+
+        times, lengths = getQueueLengthSeries(records)
+        self.assertEqual(lengths.min(), 0)
+        self.assertEqual(lengths.max(), MM1KQueue.CAPACITY)
+        windowStarts, throughputs = getThroughput(records, 50)
+        self.assertEqual(len(windowStarts), int(math.ceil(controller.time/50)))
+        self.assertAlmostEqual(throughputs.sum()*50, numpy.isfinite(records["deathTime"]).sum())
+        rejections = records[~numpy.isfinite(records["deathTime"])]
+        self.assertGreater(len(rejections), 0)
+        for noDeaths in (rejections, records[:0]):
+            windowStarts, throughputs = getThroughput(noDeaths, 50)
+            numpy.testing.assert_array_equal(throughputs, [0.0])
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        randomState = numpy.random.RandomState(9)
+        self.arrivalTimes = numpy.cumsum(randomState.exponential(1/60, 50000))
+        self.serviceTimes = randomState.exponential(0.015, 50000)
+        self.csvPath = os.path.join(self.directory, "requests.csv")
+        with open(self.csvPath, "w") as csvFile:
+            csvFile.write("timestamp,duration\n")
+            for arrivalTime, serviceTime in zip(self.arrivalTimes, self.serviceTimes):
+                csvFile.write("%r,%r\n" % (arrivalTime, serviceTime))
+        self.binaryPath = os.path.join(self.directory, "durations.bin")
+        self.serviceTimes.tofile(self.binaryPath)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testSourcesAgree(self):
+        fromCsv = Recorded(CsvSource(self.csvPath, "duration", chunkSize=1000))
+        fromBinary = Recorded(BinarySource(self.binaryPath, chunkSize=777), scale=0.5)
+        numpy.testing.assert_array_equal(fromCsv.generate(None, 2500), self.serviceTimes[:2500])
+        numpy.testing.assert_array_equal(fromBinary.generate(None, 2500), self.serviceTimes[:2500]/2)
+        arrivals = Recorded(CsvSource(self.csvPath, 0, chunkSize=1000, header=True), timestamps=True)
+        interarrivalTimes = numpy.concatenate([arrivals.generate(None, 1500), arrivals.generate(None, 1500)])
+        numpy.testing.assert_allclose(numpy.cumsum(interarrivalTimes), self.arrivalTimes[:3000] - self.arrivalTimes[0])
+        self.assertAlmostEqual(arrivals.mean(), 1/60, delta=0.001)
+
+    def testLoopedTimestampsKeepMeanInterval(self):
+        path = os.path.join(self.directory, "times.csv")
+        with open(path, "w") as csvFile:
+            csvFile.write("0\n1\n3\n6\n")
+        arrivals = Recorded(CsvSource(path, chunkSize=3), timestamps=True, loop=True)
+        # generate stops at the end of the source, and the next call starts the next loop.
+        values = numpy.concatenate([arrivals.generate(None, 4) for i in xrange(3)])
+        numpy.testing.assert_array_equal(values, [0, 1, 2, 3, 2, 1, 2, 3, 2, 1, 2, 3])
+
+    def testReplayDrivesEngine(self):
+        results = []
+        for scale in (1, 1/1.2):
+            controller = QueueEngine.Controller(Recorded(CsvSource(self.csvPath, "timestamp"), timestamps=True),
+                                                Recorded(BinarySource(self.binaryPath), scale=scale), 700)
+            controller.runSimulation(50)
+            results.append(controller.monitor.getMeanOfQueuingTime())
+        self.assertLess(results[1], results[0]/1.5)
+        controller = QueueEngine.Controller(Exponential(60), Recorded(BinarySource(self.binaryPath)), 10**6)
+        self.assertRaises(ValueError, controller.runSimulation, 0)
+
+class NetworkTest(unittest.TestCase):
+    def testMatchesJacksonProductForm(self):
+        routing = [[0, 1.0, 0], [0.1, 0, 0.5], [0, 0.6, 0]]
+        averageServiceTimes = [0.01, 0.009, 0.005]
+        servers = [2, 1, 1]
+        stations = [Station(Exponential(1/averageServiceTime), servers=c)
+                    for averageServiceTime, c in zip(averageServiceTimes, servers)]
+        network = Network(stations, [50, 0, 0], routing, 800, seed=2)
+        network.runSimulation(50)
+        solutions, sojournTime = Analytic.jacksonNetwork([50, 0, 0], routing, averageServiceTimes, servers)
+        self.assertAlmostEqual(network.getSummary()["averageSojournTime"]/sojournTime, 1, delta=0.1)
+        for station, solution in zip(network.stations, solutions):
+            self.assertAlmostEqual(station.monitor.getAverageServerUtilization()/solution.utilization, 1, delta=0.03)
+            self.assertAlmostEqual(station.monitor.getMeanOfRequestsInSystem()/solution.requestsInSystem, 1, delta=0.15)
+
+    def testFullStationLosesRequests(self):
+        stations = [Station(Exponential(100)), Station(Exponential(50), capacity=2)]
+        network = Network(stations, [40, 0], [[0, 1], [0, 0]], 300, seed=3)
+        network.runSimulation(20)
+        # The second station is an M/M/1/2 queue with Poisson arrivals (Burke's theorem).
+        blocking = Analytic.solve("M/M/1/K", 40, 0.02, capacity=2).rejectionProbability
+        self.assertAlmostEqual(network.getSummary()["lossProbability"], blocking, delta=0.03)
+
+    def testRunThatMonitorsNothing(self):
+        network = Network([Station(Exponential(100))], [40], [[0]], 5, seed=4)
+        network.runSimulation(10)
+        summary = network.getSummary()
+        for name in ("averageSojournTime", "throughput", "averageRequestsInNetwork", "lossProbability"):
+            self.assertIsNone(summary[name])
+        self.assertIn("Station", getReport(network))
+
+class DisciplinesTest(unittest.TestCase):
+    def runQueue(self, **options):
+        controller = QueueEngine.Controller(Exponential(60), Exponential(1/0.014), 1500, seed=5, timeWeighted=True,
+                                            **options)
+        controller.runSimulation(100)
+        return controller.monitor
+
+    def testPriorityClassesMatchCobham(self):
+        monitor = self.runQueue(discipline=PriorityQueue, classProbabilities=[0.25, 0.75])
+        exact = Analytic.priorityQueue([15, 45], [0.014, 0.014], [2*0.014**2]*2)
+        summary = monitor.getSummary()
+        for i in xrange(2):
+            self.assertAlmostEqual(summary["averageWaitingTimeClass%d" % i]/exact[i], 1, delta=0.1)
+        # The classes share the same servers, so the overall mean is the FIFO one (conservation law).
+        self.assertAlmostEqual(summary["averageWaitingTime"]/Analytic.solve("M/M/1", 60, 0.014).waitingTime, 1,
+                               delta=0.1)
+
+    def testPriorityQueueNeedsClasses(self):
+        self.assertRaises(ValueError, QueueEngine.Controller, Exponential(60), Exponential(100), 10,
+                          discipline=PriorityQueue)
+        queue = PriorityQueue(QueueEngine.RequestStore(), 2)
+        self.assertRaises(IndexError, queue.popleft)
+        self.assertEqual(len(queue), 0)
+
+    def testLifoAndShortestJobFirst(self):
+        fifo = self.runQueue().getSummary()
+        lifo = self.runQueue(discipline=LifoQueue).getSummary()
+        shortestFirst = self.runQueue(discipline=ShortestJobFirstQueue).getSummary()
+        self.assertAlmostEqual(lifo["averageWaitingTime"]/fifo["averageWaitingTime"], 1, delta=0.1)
+        self.assertGreater(lifo["waitingTimePercentile99.0"], fifo["waitingTimePercentile99.0"])
+        self.assertLess(shortestFirst["averageWaitingTime"], 0.7*fifo["averageWaitingTime"])
+        # The discipline does not change the number of requests in service.
+        self.assertAlmostEqual(shortestFirst["averageServerUtilization"], fifo["averageServerUtilization"], delta=0.03)
+
+    def testProcessorSharing(self):
+        # The mean sojourn time of M/G/1-PS is insensitive to the service distribution: Ts/(1 - rho).
+        controller = ProcessorSharingController(Exponential(60), Deterministic(0.012), 1500, seed=6, timeWeighted=True)
+        controller.runSimulation(100)
+        summary = controller.monitor.getSummary()
+        self.assertAlmostEqual(summary["averageQueuingTime"]/(0.012/(1 - 0.72)), 1, delta=0.1)
+        self.assertAlmostEqual(summary["averageServerUtilization"], 0.72, delta=0.02)
+        self.assertAlmostEqual(summary["averageServiceTime"], 0.012)
+
+class ProfilingTest(unittest.TestCase):
+    def testCountsEventsWithoutChangingResults(self):
+        plain = MM1KQueue.Controller(60, 0.015, 100, seed=2, timeWeighted=True)
+        plain.runSimulation(10)
+        controller = MM1KQueue.Controller(60, 0.015, 100, seed=2, timeWeighted=True)
+        profiler = Profiler(timing=True)
+        profiler.attach(controller)
+        controller.runSimulation(10)
+        profiler.detach(controller)
+        self.assertEqual(controller.monitor.getSummary(), plain.monitor.getSummary())
+        counts = profiler.counts
+        self.assertEqual(counts["event.birth"] + counts["event.death"], controller.numEvents)
+        self.assertEqual(counts["calendar.pop"], controller.numEvents)
+        self.assertEqual(counts["monitor.incrementRejectedRequests"], controller.monitor.rejectedRequests)
+        self.assertEqual(counts["requests.add"] - counts["requests.release"],
+                         controller.numBeingServed + len(controller.queue))
+        self.assertGreater(profiler.times["run"], profiler.times["event.death"])
+        self.assertFalse(isinstance(controller.monitor, Instrumented) or isinstance(controller.schedule, Instrumented))
+
+class ArrivalsTest(unittest.TestCase):
+    def getArrivalTimes(self, arrivals, numArrivals):
+        stream = VariateStream(arrivals, substream(1, 0))
+        return numpy.cumsum([stream.next() for i in xrange(numArrivals)])
+
+    def testThinningFollowsRate(self):
+        rate = lambda t: 50 + 30*numpy.sin(2*numpy.pi*t/100)
+        arrivals = NonHomogeneousPoisson(rate, numpy.linspace(0, 100, 21), period=100)
+        times = self.getArrivalTimes(arrivals, 200000)
+        self.assertGreater(arrivals.getAcceptanceRate(), 0.9)
+        self.assertAlmostEqual(arrivals.mean(), 1/50)
+        counts, edges = numpy.histogram(numpy.mod(times, 100), bins=4, range=(0, 100))
+        for count, start in zip(counts, edges):
+            grid = numpy.linspace(start, start + 25, 101)
+            expected = times[-1]/100*numpy.trapz(rate(grid), grid)
+            self.assertAlmostEqual(count/expected, 1, delta=0.02)
+        self.assertRaises(ValueError, NonHomogeneousPoisson(rate, [0, 50, 100], 100, [60, 60]).generate,
+                          numpy.random.RandomState(1), 1000)
+
+    def testPiecewiseConstantRateNeedsNoThinning(self):
+        arrivals = piecewiseConstant([0, 10, 20], [10, 50], period=20)
+        times = self.getArrivalTimes(arrivals, 100000)
+        self.assertEqual(arrivals.getAcceptanceRate(), 1)
+        phases = numpy.mod(times, 20)
+        periods = times[-1]/20
+        self.assertAlmostEqual(numpy.count_nonzero(phases < 10)/(periods*100), 1, delta=0.03)
+        self.assertAlmostEqual(numpy.count_nonzero(phases >= 10)/(periods*500), 1, delta=0.03)
+
+    def testWindowsShowThePeaks(self):
+        arrivals = piecewiseConstant([0, 50, 100], [20, 90], period=100)
+        controller = QueueEngine.Controller(arrivals, Exponential(100), 1000, seed=2, timeWeighted=True,
+                                            windowLength=50)
+        controller.runSimulation(0)
+        monitor = controller.monitor
+        windows = monitor.getWindowSeries()[:20]
+        quiet = [window["averageRequestsInSystem"] for window in windows[0::2]]
+        busy = [window["averageRequestsInSystem"] for window in windows[1::2]]
+        self.assertLess(max(quiet), min(busy))
+        self.assertAlmostEqual(numpy.mean(busy)/Analytic.solve("M/M/1", 90, 0.01).requestsInSystem, 1, delta=0.3)
+        self.assertAlmostEqual(numpy.mean(quiet + busy), monitor.getMeanOfRequestsInSystem(), delta=0.05)
+        self.assertEqual(sum(window["numRequests"] for window in monitor.getWindowSeries()), monitor.numRequests)
+        self.assertRaises(ValueError, QueueEngine.Controller, arrivals, Exponential(100), 10, windowLength=5)
+
+class RareEventsTest(unittest.TestCase):
+    def testImportanceSamplingMatchesClosedForm(self):
+        for arrivalRate, capacity in ((0.5, 20), (0.7, 40), (0.5, 1)):
+            exact = Analytic.solve("M/M/1/K", arrivalRate, 1.0, capacity=capacity).rejectionProbability
+            estimate = estimateBlockingProbability(arrivalRate, 1.0, capacity, seed=3, relativePrecision=0.02)
+            self.assertLessEqual(estimate.halfWidth, 0.02*estimate.probability)
+            self.assertAlmostEqual(estimate.probability/exact, 1, delta=0.03)
+        # Blocking of about 1e-7 from a few million jumps, where counting rejections needs about 1e9 births.
+        self.assertLess(estimate.numEvents, 10**7)
+        self.assertRaises(ValueError, estimateBlockingProbability, 1.0, 1.0, 10)
+
+class CompiledEngineTest(unittest.TestCase):
+    def assertSameRun(self, controller, other):
+        self.assertEqual(controller.time, other.time)
+        self.assertEqual(controller.numEvents, other.numEvents)
+        self.assertEqual(controller.monitor.numRequests, other.monitor.numRequests)
+        self.assertEqual(controller.monitor.rejectedRequests, other.monitor.rejectedRequests)
+        self.assertEqual(controller.monitor.serverBusyTimes, other.monitor.serverBusyTimes)
+        summary = controller.monitor.getSummary()
+        otherSummary = other.monitor.getSummary()
+        self.assertEqual(sorted(summary), sorted(otherSummary))
+        for name, value in summary.items():
+            self.assertAlmostEqual(otherSummary[name], value, delta=1e-9*abs(value))
+
+    def testKernelReproducesController(self):
+        for options in ({"capacity": 10, "servers": 3, "timeWeighted": True}, {"keepSamples": True}):
+            for serviceDistribution in (Exponential(1/0.015), Deterministic(0.015)):
+                makeController = lambda: QueueEngine.Controller(Exponential(150), serviceDistribution, 100, seed=4,
+                                                                **options)
+                controller = makeController()
+                controller.runSimulation(10)
+                kernelController = makeController()
+                CompiledEngine.runSimulation(kernelController, 10, jit=False)
+                self.assertSameRun(controller, kernelController)
+                # Both continue from the state the other engine left.
+                controller.simulationTime = kernelController.simulationTime = 150
+                CompiledEngine.resumeSimulation(controller, jit=False)
+                kernelController.resumeSimulation()
+                self.assertSameRun(controller, kernelController)
+
+    def testFallsBackToController(self):
+        controller = QueueEngine.Controller(Exponential(60), Exponential(100), 50, seed=1,
+                                            discipline=LifoQueue)
+        self.assertFalse(CompiledEngine.isSupported(controller))
+        CompiledEngine.runSimulation(controller, 5, jit=False)
+        self.assertGreater(controller.monitor.numRequests, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+'''
+Trace
+
+This module writes the timeline of every request of a simulation to a binary file and analyzes it afterwards.
+
+A TraceSink given to the Controller (Controller(..., trace=TraceSink(path))) receives the birth, service and death
+time of every request as it dies and the birth time of every rejected request. The records are collected in a
+bounded buffer and appended to a memory mapped file whenever the buffer is full, so tracing needs constant memory
+however long the run. The file is a plain array of TRACE_DTYPE records in the order the requests left the system:
+    birthTime, serviceTime, deathTime   - a request that was served
+    birthTime, NaN, NaN                 - a request rejected because the system was full
+    birthTime, serviceTime or inf, inf  - a request still in the system when the sink was closed
+
+readTrace maps the file back into memory, and the analysis functions work on whole arrays with NumPy:
+    analyzeTrace          - rebuilds the Monitor statistics (in time weighted mode) of any monitored period
+    getQueueLengthSeries  - the number of requests waiting or in the system after every change
+    getThroughput         - the number of deaths per time window
+'''
+from __future__ import division #Required for floating point division.
+import os
+import numpy
+from QueueEngine import Monitor
+
+TRACE_DTYPE = numpy.dtype([("birthTime", "<f8"), ("serviceTime", "<f8"), ("deathTime", "<f8")])
+
+# Number of records a TraceSink collects before appending them to its file.
+DEFAULT_BUFFER_SIZE = 65536
+
+NAN = float("nan")
+INFINITY = float("inf")
+
+class TraceSink:
+    '''
+    Appends request records to the file at path, which is created or truncated. Records are buffered bufferSize at
+    a time. close must be called to write the last records.
+    '''
+    def __init__(self, path, bufferSize=DEFAULT_BUFFER_SIZE):
+        self.path = path
+        self.bufferSize = bufferSize
+        self.buffer = []
+        self.numRecords = 0 # Records written to the file.
+        self.records = None # Memory map of the file, which has room for len(self.records) records.
+        open(path, "wb").close()
+    def recordRequest(self, birthTime, serviceTime, deathTime):
+        self.buffer.append((birthTime, serviceTime, deathTime))
+        if len(self.buffer) == self.bufferSize:
+            self.flush()
+    def recordRejection(self, birthTime):
+        self.recordRequest(birthTime, NAN, NAN)
+    def flush(self):
+        '''
+        Appends the buffered records to the file, doubling its size when it is full.
+        '''
+        if not self.buffer:
+            return
+        block = numpy.array(self.buffer, dtype=TRACE_DTYPE)
+        end = self.numRecords + len(block)
+        if self.records is None or end > len(self.records):
+            self.resize(max(end, 2*self.numRecords))
+        self.records[self.numRecords:end] = block
+        self.numRecords = end
+        self.buffer = []
+    def resize(self, capacity):
+        if self.records is not None:
+            self.records.flush()
+            del self.records
+        with open(self.path, "r+b") as traceFile:
+            traceFile.truncate(capacity*TRACE_DTYPE.itemsize)
+        self.records = numpy.memmap(self.path, dtype=TRACE_DTYPE, mode="r+", shape=(capacity,))
+    def close(self, controller=None):
+        '''
+        Writes the buffered records and trims the file to them. If controller is given the requests still in its
+        system are recorded first, so that the queue length series of the trace is complete.
+        '''
+        if controller is not None:
+            requests = controller.requests
+            for slot in controller.beingServed:
+                if slot is not None:
+                    self.recordRequest(requests.birthTimes.item(slot), requests.serviceTimes.item(slot), INFINITY)
+            for slot in controller.queue:
+                self.recordRequest(requests.birthTimes.item(slot), INFINITY, INFINITY)
+        self.flush()
+        if self.records is not None:
+            self.records.flush()
+            self.records = None
+        with open(self.path, "r+b") as traceFile:
+            traceFile.truncate(self.numRecords*TRACE_DTYPE.itemsize)
+
+def readTrace(path):
+    '''
+    Returns the records of the trace file at path as a read only memory mapped array of TRACE_DTYPE.
+    '''
+    if os.path.getsize(path) == 0:
+        return numpy.zeros(0, dtype=TRACE_DTYPE)
+    return numpy.memmap(path, dtype=TRACE_DTYPE, mode="r")
+
+def getQueueLengthSeries(records, waiting=False):
+    '''
+    Returns (times, lengths): the number of requests in the system (or waiting for a server if waiting is True)
+    changes to lengths[i] at times[i]. Rejected requests are not counted.
+    '''
+    accepted = records[~numpy.isnan(records["deathTime"])]
+    leaveTimes = accepted["serviceTime"] if waiting else accepted["deathTime"]
+    leaveTimes = leaveTimes[numpy.isfinite(leaveTimes)]
+    times = numpy.concatenate([accepted["birthTime"], leaveTimes])
+    changes = numpy.concatenate([numpy.ones(len(accepted), dtype=int), -numpy.ones(len(leaveTimes), dtype=int)])
+    # Stable sort with the births first, so a request served at its birth time never counts as -1 requests.
+    order = numpy.argsort(times, kind="mergesort")
+    return times[order], numpy.cumsum(changes[order])
+
+def getThroughput(records, windowLength, startTime=0.0, endTime=None):
+    '''
+    Returns (windowStarts, throughputs): the number of deaths per unit of time in each window of windowLength from
+    startTime to endTime (by default the last death). A trace without deaths has a single window of throughput 0.
+    '''
+    deathTimes = records["deathTime"]
+    deathTimes = deathTimes[numpy.isfinite(deathTimes)]
+    if endTime is None:
+        endTime = deathTimes.max() if len(deathTimes) else startTime
+    numWindows = max(int(numpy.ceil((endTime - startTime)/windowLength)), 1)
+    windowStarts = startTime + windowLength*numpy.arange(numWindows + 1, dtype=float)
+    counts, edges = numpy.histogram(deathTimes, bins=windowStarts)
+    return windowStarts[:-1], counts/windowLength
+
+def analyzeTrace(records, monitorStartingTime, endTime=None, servers=1, capacity=None):
+    '''
+    Returns a Monitor with the statistics a time weighted Monitor would have recorded from monitorStartingTime to
+    endTime (by default the last time in the trace) for a system with the given number of servers. Attempted and
+    rejected requests are counted if a capacity is given. The busy time of the servers is split evenly between them,
+    since the trace does not say which server served a request.
+    '''
+    birthTimes = records["birthTime"]
+    serviceTimes = records["serviceTime"]
+    deathTimes = records["deathTime"]
+    if endTime is None:
+        times = numpy.concatenate([birthTimes, deathTimes[numpy.isfinite(deathTimes)]])
+        endTime = times.max()
+    monitor = Monitor(servers=servers)
+
+    monitor.startTimeWeightedStatistics(monitorStartingTime)
+    for statistics, waiting in ((monitor.requestsWaitingStatistics, True), (monitor.requestsInSystemStatistics, False)):
+        times, lengths = getQueueLengthSeries(records, waiting)
+        inPeriod = times <= endTime
+        statistics.updateSeries(times[inPeriod], lengths[inPeriod])
+        statistics.update(endTime, statistics.level)
+
+    dead = (deathTimes > monitorStartingTime) & (deathTimes <= endTime)
+    monitor.recordDeadTimeArrays(birthTimes[dead], serviceTimes[dead], deathTimes[dead])
+
+    served = numpy.isfinite(serviceTimes)
+    busyTimes = (numpy.minimum(deathTimes[served], endTime) -
+                 numpy.maximum(serviceTimes[served], monitorStartingTime)).clip(0)
+    monitor.serverBusyTimes = [float(busyTimes.sum())/servers]*servers
+    monitor.setObservedTime(endTime - monitorStartingTime)
+
+    if capacity is not None:
+        born = (birthTimes > monitorStartingTime) & (birthTimes <= endTime)
+        monitor.attemptedRequests = int(numpy.count_nonzero(born))
+        monitor.rejectedRequests = int(numpy.count_nonzero(born & numpy.isnan(deathTimes)))
+    return monitor
@@ -0,0 +1,87 @@
+'''
+VarianceReduction
+
+This module gives narrower confidence intervals for the same number of simulated events than independent replications.
+
+compareConfigurations - common random numbers. Both configurations of a comparison run with the same seeds, so the
+                        arrivals of replication i are the same in both and the service times of both are drawn from
+                        the same uniform values. The noise common to both cancels in their difference.
+runAntitheticReplications - antithetic variates. Every seed runs twice, once with the uniform values u and once with
+                        1 - u (see NumberGenerator), and the mean of each negatively correlated pair is one observation.
+getControlVariateInterval - control variates. A quantity whose mean is known, such as the average service time,
+                        is regressed out of the estimate of another quantity it is correlated with.
+
+Benchmark.benchmarkVarianceReduction measures the gain of each technique.
+'''
+from __future__ import division #Required for floating point division.
+from math import sqrt
+import numpy
+from Replications import ReplicationSummary, runTasks
+from Statistics import studentTQuantile
+
+def compareConfigurations(controllerClass, arguments, otherArguments, monitorStartingTime, numReplications, seed=0,
+                          commonRandomNumbers=True, processes=None):
+    '''
+    Runs numReplications replications of controllerClass(*arguments) and of controllerClass(*otherArguments) and
+    returns a ReplicationSummary of the differences other - first of every report quantity both have. With
+    commonRandomNumbers=False the second configuration gets its own seeds, as independent replications would.
+    '''
+    otherSeed = seed if commonRandomNumbers else seed + numReplications
+    tasks = [(controllerClass, arguments, monitorStartingTime, seed + i, {}) for i in range(numReplications)]
+    tasks += [(controllerClass, otherArguments, monitorStartingTime, otherSeed + i, {}) for i in range(numReplications)]
+    summaries = runTasks(tasks, processes)
+    differences = []
+    for summary, otherSummary in zip(summaries[:numReplications], summaries[numReplications:]):
+        names = [name for name in set(summary) & set(otherSummary)
+                 if summary[name] is not None and otherSummary[name] is not None]
+        differences.append(dict((name, otherSummary[name] - summary[name]) for name in names))
+    return ReplicationSummary(differences)
+
+def runAntitheticReplications(controllerClass, arguments, monitorStartingTime, numPairs, seed=0, processes=None):
+    '''
+    Runs numPairs antithetic pairs of replications of controllerClass(*arguments) with seeds seed, seed + 1, ... and
+    returns a ReplicationSummary of the pair means. The distributions must have an inverse method.
+    '''
+    tasks = []
+    for i in range(numPairs):
+        tasks.append((controllerClass, arguments, monitorStartingTime, seed + i, {}))
+        tasks.append((controllerClass, arguments, monitorStartingTime, seed + i, {"antithetic": True}))
+    summaries = runTasks(tasks, processes)
+    pairMeans = []
+    for summary, antitheticSummary in zip(summaries[0::2], summaries[1::2]):
+        names = [name for name in set(summary) & set(antitheticSummary)
+                 if summary[name] is not None and antitheticSummary[name] is not None]
+        pairMeans.append(dict((name, (summary[name] + antitheticSummary[name])/2) for name in names))
+    return ReplicationSummary(pairMeans)
+
+def controlVariateEstimate(values, controls, expectedControl, confidence=0.95):
+    '''
+    Returns (mean, halfWidth, coefficient) of the control variate estimate of the mean of values, which are
+    observations paired with controls whose mean is known to be expectedControl:
+    mean(values - coefficient*(controls - expectedControl)), with the coefficient that minimizes its variance
+    estimated from the same observations.
+    '''
+    values = numpy.asarray(values, dtype=float)
+    controls = numpy.asarray(controls, dtype=float)
+    n = len(values)
+    if n < 3:
+        raise ValueError("A control variate estimate needs at least 3 observations")
+    controlDeviations = controls - controls.mean()
+    coefficient = numpy.dot(controlDeviations, values - values.mean())/numpy.dot(controlDeviations, controlDeviations)
+    adjusted = values - coefficient*(controls - expectedControl)
+    # One degree of freedom is used by the estimated coefficient.
+    halfWidth = studentTQuantile((1 + confidence)/2, n - 2)*adjusted.std(ddof=1)/sqrt(n)
+    return adjusted.mean(), halfWidth, coefficient
+
+def getControlVariateInterval(summary, name, controlName, expectedControl):
+    '''
+    Returns (mean, halfWidth, coefficient) of the control variate estimate of quantity name of the ReplicationSummary
+    summary, using quantity controlName with known mean expectedControl, for example
+    getControlVariateInterval(summary, "averageQueuingTime", "averageServiceTime", averageServiceTime).
+    '''
+    return controlVariateEstimate(summary.getValues(name), summary.getValues(controlName), expectedControl,
+                                  summary.confidence)
+
+def getHalfWidth(summary, name):
+    lower, upper = summary.getConfidenceInterval(name)
+    return (upper - lower)/2